@@ -13,7 +13,20 @@ from google.adk.models.lite_llm import LiteLlm
 import os
 
 from app.config import get_settings
-from app.adk_tools import get_departures, search_rail_stops, get_next_departures, get_route_stops
+from app.tool_executor import offloaded
+from app.adk_tools import (
+    find_nearest_stations,
+    get_departure_board,
+    get_departures,
+    get_next_departures,
+    get_od_matrix,
+    get_reachable_stations,
+    get_route_stops,
+    get_service_frequency,
+    get_trip_geometry,
+    plan_journey,
+    search_rail_stops,
+)
 
 settings = get_settings()
 
@@ -48,17 +61,47 @@ Available tools:
 - get_departures: Find trains between two specific stations
 - get_next_departures: Get upcoming departures from a station (no destination needed)
 - get_route_stops: Get all stops along a specific train trip
+- plan_journey: Plan a journey with changes between trains when there is no direct train
+- get_departure_board: Page through a station's departures, continuing past midnight
+- get_od_matrix: Compare direct trains between many origin and destination stations in one call
+- get_service_frequency: How often trains run from a station or between two stations, per hour and day type
+- get_trip_geometry: Get a train's path (encoded polyline) for showing it on a map
+- find_nearest_stations: Find the railway stations closest to a coordinate
+- get_reachable_stations: Every station reachable from a station within a travel time
 
 When users ask about trains or routes:
 1. Use search_rail_stops to find station names if needed
 2. Use get_departures for point-to-point queries
 3. Use get_next_departures when user asks "what trains leave from X" without destination
 4. Use get_route_stops to show all stops on a specific train
-5. Provide clear, concise answers with relevant details
+5. Use plan_journey when get_departures finds no direct train or the user asks about connections
+6. Use get_departure_board for late-evening departures or when the user asks for more; pass next_cursor for the next page
+7. Use get_od_matrix when the user compares several origins or destinations at once
+8. Use get_service_frequency for "how often" / "how many trains per hour" questions instead of counting departures
+9. Use get_trip_geometry when the user wants to see a train's route on a map
+10. Use find_nearest_stations when the user gives a position instead of a station name
+11. Use get_reachable_stations for "where can I get to within N hours" questions
+12. Provide clear, concise answers with relevant details
 
 Always be helpful and provide accurate information based on the tool results.
 If you cannot find information, suggest alternative queries or time windows.
     """,
-    tools=[search_rail_stops, get_departures, get_next_departures, get_route_stops],
+    # Tools run on the tool thread pool, never blocking the event loop
+    tools=[
+        offloaded(tool)
+        for tool in (
+            search_rail_stops,
+            get_departures,
+            get_next_departures,
+            get_route_stops,
+            plan_journey,
+            get_departure_board,
+            get_od_matrix,
+            get_service_frequency,
+            get_trip_geometry,
+            find_nearest_stations,
+            get_reachable_stations,
+        )
+    ],
 )
 
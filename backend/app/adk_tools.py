@@ -9,10 +9,26 @@ from typing import List, Optional
 from google.adk.tools.tool_context import ToolContext
 from sqlalchemy.orm import Session
 
-from sqlalchemy import text
-
-from .query_planner import active_services, departures_between, search_stops
+from .gtfs_time import format_gtfs_time, time_to_seconds
+from .query_planner import (
+    active_services,
+    departures_between,
+    next_departures,
+    od_matrix,
+    resolve_station,
+    route_stops,
+    search_stops,
+)
 from .db import SessionLocal
+from .departure_board import board_page
+from .journey_planner import get_journey_planner
+from .reachability import reachable_stations
+from .service_frequency import has_frequency_tables, od_frequency, resolve_day_type, station_frequency
+from .shape_geometry import has_shape_geometries, trip_geometry
+from .spatial_index import get_spatial_index
+
+# Upper bound on limit_rows of the departure tools, as on the departures endpoint
+MAX_DEPARTURE_ROWS = 200
 
 
 def search_rail_stops(
@@ -31,7 +47,8 @@ def search_rail_stops(
         tool_context: ADK tool context providing database session access.
 
     Returns:
-        A list of dictionaries with 'stop_id' and 'stop_name' keys.
+        A list of dictionaries with 'stop_id' and 'stop_name' keys, one per station
+        (platforms of the same station are grouped under the station's id).
         Example: [{"stop_id": "740000002", "stop_name": "Stockholm Central"}]
     """
     # Get session from context or create a new one
@@ -78,7 +95,7 @@ def get_departures(
         destination_name: The destination station name (e.g., "Göteborg Central").
         travel_date: Optional date in YYYY-MM-DD format (default: today).
         after_time: Optional time filter in HH:MM format (e.g., "14:00").
-        limit_rows: Maximum number of departures to return (default: 50).
+        limit_rows: Maximum number of departures to return (default: 50, max: 200).
         tool_context: ADK tool context providing database session access.
 
     Returns:
@@ -120,7 +137,7 @@ def get_departures(
             destination_name=destination_name,
             travel_date=parsed_date,
             after_time=parsed_time,
-            limit_rows=limit_rows,
+            limit_rows=min(max(limit_rows, 1), MAX_DEPARTURE_ROWS),
         )
 
         if not tables:
@@ -164,7 +181,7 @@ def get_next_departures(
         station_name: The station name (e.g., "Stockholm Central").
         travel_date: Optional date in YYYY-MM-DD format (default: today).
         after_time: Optional time filter in HH:MM format (e.g., "14:00").
-        limit_rows: Maximum number of departures to return (default: 20).
+        limit_rows: Maximum number of departures to return (default: 20, max: 200).
         tool_context: ADK tool context providing database session access.
 
     Returns:
@@ -180,11 +197,11 @@ def get_next_departures(
 
     try:
         # Find station
-        stations = search_stops(session, station_name, limit=3)
-        if not stations:
+        station = resolve_station(session, station_name)
+        if station is None:
             return {"departures": [], "error": f"Station '{station_name}' not found"}
 
-        station_ids = [s["stop_id"] for s in stations]
+        station_ids = station.stop_ids
 
         # Parse date if provided
         parsed_date = None
@@ -203,55 +220,22 @@ def get_next_departures(
             except (ValueError, AttributeError):
                 return {"departures": [], "error": f"Invalid time format: {after_time}"}
 
-        # Get active services for date
-        services = active_services(session, parsed_date) if parsed_date else None
-        if parsed_date and not services:
-            return {"departures": [], "message": "No services available on the specified date"}
-
-        # Build query
-        params = {
-            "station_ids": tuple(station_ids),
-            "limit_rows": limit_rows,
-        }
-        time_clause = ""
-        if parsed_time:
-            params["after_time"] = parsed_time.strftime("%H:%M:%S")
-            time_clause = "AND st.departure_time >= :after_time"
-
-        service_clause = ""
-        if services is not None:
-            params["services"] = tuple(services)
-            service_clause = "AND t.service_id IN :services"
-
-        sql = text(
-            f"""
-            SELECT
-                st.departure_time AS departure,
-                s.stop_name AS station_name,
-                r.agency_name,
-                r.route_short_name,
-                t.trip_id,
-                t.route_id,
-                t.trip_headsign
-            FROM stop_times_rail st
-            JOIN trips_rail t ON t.trip_id = st.trip_id
-            JOIN routes_rail_with_agency r ON r.route_id = t.route_id
-            JOIN stops_rail s ON s.stop_id = st.stop_id
-            WHERE st.stop_id IN :station_ids
-              {time_clause}
-              {service_clause}
-            ORDER BY st.departure_time
-            LIMIT :limit_rows
-            """
+        rows = next_departures(
+            session,
+            station_ids,
+            parsed_date,
+            time_to_seconds(parsed_time) if parsed_time else None,
+            min(max(limit_rows, 1), MAX_DEPARTURE_ROWS),
         )
-
-        rows = session.execute(sql, params).mappings().all()
-        departures = [dict(row) for row in rows]
+        if not rows and parsed_date and not active_services(session, parsed_date):
+            return {"departures": [], "message": "No services available on the specified date"}
+        departures = [{**row, "departure": format_gtfs_time(row["departure"])} for row in rows]
 
         result = {
             "departures": departures,
             "count": len(departures),
-            "station": station_name,
+            "station": station.name,
+            "station_id": station.station_id,
         }
 
         # Store result in tool context
@@ -291,26 +275,18 @@ def get_route_stops(
         use_existing = False
 
     try:
-        sql = text(
-            """
-            SELECT
-                st.stop_sequence,
-                s.stop_name,
-                st.arrival_time,
-                st.departure_time,
-                st.stop_id
-            FROM stop_times_rail st
-            JOIN stops_rail s ON s.stop_id = st.stop_id
-            WHERE st.trip_id = :trip_id
-            ORDER BY st.stop_sequence
-            """
-        )
-
-        rows = session.execute(sql, {"trip_id": trip_id}).mappings().all()
+        rows = route_stops(session, trip_id)
         if not rows:
             return {"stops": [], "error": f"Trip '{trip_id}' not found"}
 
-        stops = [dict(row) for row in rows]
+        stops = [
+            {
+                **row,
+                "arrival_time": format_gtfs_time(row["arrival_time"]),
+                "departure_time": format_gtfs_time(row["departure_time"]),
+            }
+            for row in rows
+        ]
 
         result = {
             "stops": stops,
@@ -328,3 +304,609 @@ def get_route_stops(
     finally:
         if not use_existing:
             session.close()
+
+
+def plan_journey(
+    origin_name: str,
+    destination_name: str,
+    travel_date: Optional[str] = None,
+    after_time: Optional[str] = None,
+    max_transfers: int = 4,
+    limit: int = 3,
+    tool_context: ToolContext = None,
+) -> dict:
+    """Plan a train journey between two stations, changing trains if needed.
+
+    Use this tool when the user asks how to get from one station to another and
+    there may be no direct train, or asks for connections/changes. Each journey
+    lists its legs (one per train) with the station where to change.
+
+    Args:
+        origin_name: The origin station name (e.g., "Kiruna").
+        destination_name: The destination station name (e.g., "Malmö Central").
+        travel_date: Optional date in YYYY-MM-DD format (default: today).
+        after_time: Optional earliest departure time in HH:MM format (e.g., "14:00").
+        max_transfers: Maximum number of changes between trains (default: 4).
+        limit: Maximum number of journeys to return (default: 3).
+        tool_context: ADK tool context providing database session access.
+
+    Returns:
+        A dictionary with a 'journeys' list. Each journey has departure, arrival,
+        transfers and 'legs' (trip_id, route_short_name, agency_name, from_stop_name,
+        to_stop_name, departure, arrival).
+    """
+    # Get session from context or create a new one
+    if tool_context and "session" in tool_context.state:
+        session: Session = tool_context.state["session"]
+        use_existing = True
+    else:
+        session = SessionLocal()
+        use_existing = False
+
+    try:
+        origin = resolve_station(session, origin_name)
+        if origin is None:
+            return {"journeys": [], "error": f"Station '{origin_name}' not found"}
+        destination = resolve_station(session, destination_name)
+        if destination is None:
+            return {"journeys": [], "error": f"Station '{destination_name}' not found"}
+
+        parsed_date = date.today()
+        if travel_date:
+            try:
+                parsed_date = date.fromisoformat(travel_date)
+            except ValueError:
+                return {"journeys": [], "error": f"Invalid date format: {travel_date}"}
+
+        parsed_time = time(0, 0)
+        if after_time:
+            try:
+                hour, minute = map(int, after_time.split(":"))
+                parsed_time = time(hour, minute)
+            except (ValueError, AttributeError):
+                return {"journeys": [], "error": f"Invalid time format: {after_time}"}
+
+        planner = get_journey_planner(session)
+        if planner is None:
+            return {"journeys": [], "error": "Journey planning is not available for this database"}
+        if not active_services(session, parsed_date):
+            return {"journeys": [], "message": "No services available on the specified date"}
+
+        running = planner.timetable.running_on(parsed_date, lambda: active_services(session, parsed_date))
+        found = planner.next_journeys(
+            origin.stop_ids,
+            destination.stop_ids,
+            time_to_seconds(parsed_time),
+            running,
+            max_transfers=max_transfers,
+            limit=limit,
+        )
+        journeys = [
+            {
+                "departure": format_gtfs_time(journey.departure),
+                "arrival": format_gtfs_time(journey.arrival),
+                "transfers": journey.transfers,
+                "legs": [
+                    {
+                        "trip_id": leg.trip_id,
+                        "route_id": leg.route_id,
+                        "route_short_name": leg.route_short_name,
+                        "agency_name": leg.agency_name,
+                        "from_stop_name": leg.from_stop_name,
+                        "to_stop_name": leg.to_stop_name,
+                        "departure": format_gtfs_time(leg.departure),
+                        "arrival": format_gtfs_time(leg.arrival),
+                    }
+                    for leg in journey.legs
+                ],
+            }
+            for journey in found
+        ]
+
+        result = {
+            "journeys": journeys,
+            "count": len(journeys),
+            "origin": origin.name,
+            "destination": destination.name,
+        }
+        if not journeys:
+            result["message"] = "No journey found; try another time or allow more transfers"
+
+        # Store result in tool context
+        if tool_context:
+            if "tool_results" not in tool_context.state:
+                tool_context.state["tool_results"] = []
+            tool_context.state["tool_results"].append(result)
+
+        return result
+    finally:
+        if not use_existing:
+            session.close()
+
+
+def get_departure_board(
+    station_name: str,
+    travel_date: Optional[str] = None,
+    after_time: Optional[str] = None,
+    limit_rows: int = 20,
+    cursor: Optional[str] = None,
+    tool_context: ToolContext = None,
+) -> dict:
+    """Get a page of the departure board of a railway station, continuing past midnight.
+
+    Use this tool when the user wants to see departures from a station page by page,
+    e.g. "show me more" after a first list, or late in the evening when the next
+    trains leave after midnight. Pass the 'next_cursor' of a previous result as
+    'cursor' to get the following page.
+
+    Args:
+        station_name: The station name (e.g., "Stockholm Central"); ignored with a cursor.
+        travel_date: Optional date in YYYY-MM-DD format (default: today); ignored with a cursor.
+        after_time: Optional time in HH:MM format (default: 00:00); ignored with a cursor.
+        limit_rows: Maximum number of departures per page (default: 20, max: 200).
+        cursor: Optional 'next_cursor' from the previous page.
+        tool_context: ADK tool context providing database session access.
+
+    Returns:
+        A dictionary with a 'departures' list (each with date, departure, service_date,
+        station_name, agency_name, route_short_name, trip_id, trip_headsign) and
+        'next_cursor' (null when there are no more departures).
+    """
+    # Get session from context or create a new one
+    if tool_context and "session" in tool_context.state:
+        session: Session = tool_context.state["session"]
+        use_existing = True
+    else:
+        session = SessionLocal()
+        use_existing = False
+
+    try:
+        parsed_date = date.today()
+        if travel_date:
+            try:
+                parsed_date = date.fromisoformat(travel_date)
+            except ValueError:
+                return {"departures": [], "error": f"Invalid date format: {travel_date}"}
+
+        parsed_time = None
+        if after_time:
+            try:
+                hour, minute = map(int, after_time.split(":"))
+                parsed_time = time(hour, minute)
+            except (ValueError, AttributeError):
+                return {"departures": [], "error": f"Invalid time format: {after_time}"}
+
+        try:
+            page = board_page(
+                session, station_name, parsed_date, parsed_time, min(max(limit_rows, 1), MAX_DEPARTURE_ROWS), cursor
+            )
+        except ValueError:
+            return {"departures": [], "error": "Invalid cursor; start again without one"}
+        if page is None:
+            return {"departures": [], "error": f"Station '{station_name}' not found"}
+
+        result = {
+            "departures": page.rows,
+            "count": len(page.rows),
+            "station": page.station.name,
+            "station_id": page.station.station_id,
+            "next_cursor": page.next_cursor,
+        }
+
+        # Store result in tool context
+        if tool_context:
+            if "tool_results" not in tool_context.state:
+                tool_context.state["tool_results"] = []
+            tool_context.state["tool_results"].append(result)
+
+        return result
+    finally:
+        if not use_existing:
+            session.close()
+
+
+def get_od_matrix(
+    origin_names: List[str],
+    destination_names: Optional[List[str]] = None,
+    travel_date: Optional[str] = None,
+    after_time: Optional[str] = None,
+    before_time: Optional[str] = None,
+    tool_context: ToolContext = None,
+) -> dict:
+    """Compare direct train connections between many stations at once.
+
+    Use this tool when the user asks about several origins and/or destinations in
+    one question, e.g. "earliest arrival between all of these stations tomorrow
+    morning" or "which of these cities can I reach directly from Stockholm and
+    Uppsala". One call answers the whole matrix.
+
+    Args:
+        origin_names: Origin station names (e.g., ["Stockholm Central", "Uppsala"]).
+        destination_names: Destination station names (default: the origins).
+        travel_date: Optional date in YYYY-MM-DD format (default: today).
+        after_time: Optional earliest departure in HH:MM format (default: 00:00).
+        before_time: Optional latest departure in HH:MM format (default: end of the service day).
+        tool_context: ADK tool context providing database session access.
+
+    Returns:
+        A dictionary with a 'matrix' list, one entry per pair with a direct train:
+        origin, destination, first_departure, earliest_arrival, travel_minutes
+        (fastest trip) and trips (number of direct trains in the window).
+    """
+    # Get session from context or create a new one
+    if tool_context and "session" in tool_context.state:
+        session: Session = tool_context.state["session"]
+        use_existing = True
+    else:
+        session = SessionLocal()
+        use_existing = False
+
+    try:
+        parsed_date = date.today()
+        if travel_date:
+            try:
+                parsed_date = date.fromisoformat(travel_date)
+            except ValueError:
+                return {"matrix": [], "error": f"Invalid date format: {travel_date}"}
+
+        window = []
+        for value in (after_time, before_time):
+            parsed = None
+            if value:
+                try:
+                    hour, minute = map(int, value.split(":"))
+                    parsed = time(hour, minute)
+                except (ValueError, AttributeError):
+                    return {"matrix": [], "error": f"Invalid time format: {value}"}
+            window.append(parsed)
+
+        matrix = od_matrix(session, origin_names, destination_names or origin_names, parsed_date, *window)
+        names = {station.station_id: station.name for station in matrix["origins"] + matrix["destinations"]}
+        cells = [
+            {
+                "origin": names[cell["origin_id"]],
+                "destination": names[cell["destination_id"]],
+                "first_departure": format_gtfs_time(cell["first_departure"]),
+                "earliest_arrival": format_gtfs_time(cell["earliest_arrival"]),
+                "travel_minutes": round(cell["travel_seconds"] / 60),
+                "trips": cell["trips"],
+            }
+            for cell in matrix["cells"]
+        ]
+        result = {"matrix": cells, "count": len(cells), "travel_date": parsed_date.isoformat()}
+        if matrix["unresolved"]:
+            result["unresolved"] = matrix["unresolved"]
+
+        # Store result in tool context
+        if tool_context:
+            if "tool_results" not in tool_context.state:
+                tool_context.state["tool_results"] = []
+            tool_context.state["tool_results"].append(result)
+
+        return result
+    finally:
+        if not use_existing:
+            session.close()
+
+
+# Routes listed per station by get_service_frequency, busiest first
+MAX_FREQUENCY_ROUTES = 20
+
+
+def _minutes(seconds: Optional[int]) -> Optional[int]:
+    return None if seconds is None else round(seconds / 60)
+
+
+def get_service_frequency(
+    origin_name: str,
+    destination_name: Optional[str] = None,
+    day: str = "weekday",
+    after_time: Optional[str] = None,
+    before_time: Optional[str] = None,
+    tool_context: ToolContext = None,
+) -> dict:
+    """Tell how often trains run from a station, or between two stations.
+
+    Use this tool for "how often" questions, e.g. "how often do trains run between
+    Stockholm and Uppsala on Saturdays" or "how many trains leave Lund per hour in the
+    morning". It answers from precomputed per-hour aggregates for a typical day, so
+    never count departure lists for these questions.
+
+    Args:
+        origin_name: The (origin) station name (e.g., "Stockholm Central").
+        destination_name: Optional destination; without it, all departures from the origin are counted.
+        day: "weekday", "saturday", "sunday", a weekday name or a YYYY-MM-DD date (default: weekday).
+        after_time: Optional start of the time window in HH:MM format (e.g., "06:00").
+        before_time: Optional end of the time window in HH:MM format (e.g., "10:00").
+        tool_context: ADK tool context providing database session access.
+
+    Returns:
+        A dictionary with trips (or departures), per-hour counts ('hourly'), headways
+        in minutes (min/median/max) and, with a destination, the first and last
+        departure and fastest travel time. With only an origin, 'routes' breaks the
+        departures down per route and terminus.
+    """
+    # Get session from context or create a new one
+    if tool_context and "session" in tool_context.state:
+        session: Session = tool_context.state["session"]
+        use_existing = True
+    else:
+        session = SessionLocal()
+        use_existing = False
+
+    try:
+        try:
+            day_type = resolve_day_type(day)
+        except ValueError as exc:
+            return {"error": str(exc)}
+
+        window = []
+        for value in (after_time, before_time):
+            parsed = None
+            if value:
+                try:
+                    hour, minute = map(int, value.split(":"))
+                    parsed = time_to_seconds(time(hour, minute))
+                except (ValueError, AttributeError):
+                    return {"error": f"Invalid time format: {value}"}
+            window.append(parsed)
+        after, before = window[0] or 0, window[1]
+
+        if not has_frequency_tables(session):
+            return {"error": "Service frequency is not available for this database; re-run ingestion"}
+
+        if destination_name:
+            found = od_frequency(session, origin_name, destination_name, day_type, after, before)
+            if found is None:
+                return {"error": f"Station '{origin_name}' or '{destination_name}' not found"}
+            result = {
+                "origin": found["origin"].name,
+                "destination": found["destination"].name,
+                "trips": found["trips"],
+                "first_departure": format_gtfs_time(found["first_departure"]),
+                "last_departure": format_gtfs_time(found["last_departure"]),
+                "fastest_minutes": _minutes(found["fastest_seconds"]),
+                "headway_min_minutes": _minutes(found["headway_min"]),
+                "headway_median_minutes": _minutes(found["headway_median"]),
+                "headway_max_minutes": _minutes(found["headway_max"]),
+            }
+        else:
+            found = station_frequency(session, origin_name, day_type, after, before)
+            if found is None:
+                return {"error": f"Station '{origin_name}' not found"}
+            result = {
+                "station": found["station"].name,
+                "departures": found["departures"],
+                "routes": [
+                    {
+                        "route_short_name": route["route_short_name"],
+                        "agency_name": route["agency_name"],
+                        "terminus": route["terminus"],
+                        "departures": route["departures"],
+                        "busiest_hour_departures": route["busiest_hour_departures"],
+                        "headway_min_minutes": _minutes(route["headway_min"]),
+                        "headway_max_minutes": _minutes(route["headway_max"]),
+                    }
+                    for route in found["routes"][:MAX_FREQUENCY_ROUTES]
+                ],
+                "route_count": len(found["routes"]),
+            }
+
+        result.update(
+            day_type=day_type,
+            based_on_date=found["service_date"].isoformat() if found["service_date"] else None,
+            hourly={f"{hour:02d}:00": count for hour, count in found["hourly"].items()},
+        )
+
+        # Store result in tool context
+        if tool_context:
+            if "tool_results" not in tool_context.state:
+                tool_context.state["tool_results"] = []
+            tool_context.state["tool_results"].append(result)
+
+        return result
+    finally:
+        if not use_existing:
+            session.close()
+
+
+def get_trip_geometry(
+    trip_id: str,
+    zoom: Optional[int] = None,
+    tool_context: ToolContext = None,
+) -> dict:
+    """Get the path of a train trip for drawing it on a map.
+
+    Use this tool when the user wants to see a train's route on a map. The path is
+    an encoded polyline simplified for the map zoom level; pass it on to the map
+    rather than describing it.
+
+    Args:
+        trip_id: The trip ID (e.g., from departure results).
+        zoom: Optional web map zoom level (e.g., 6 for all of Sweden, 12 for a city;
+            default: fit the whole trip).
+        tool_context: ADK tool context providing database session access.
+
+    Returns:
+        A dictionary with 'polyline' (Google encoded, precision 5), 'points',
+        'tolerance_m' (simplification in metres) and 'bbox' ([west, south, east, north]).
+    """
+    # Get session from context or create a new one
+    if tool_context and "session" in tool_context.state:
+        session: Session = tool_context.state["session"]
+        use_existing = True
+    else:
+        session = SessionLocal()
+        use_existing = False
+
+    try:
+        if not has_shape_geometries(session):
+            return {"error": "Trip geometries are not available for this database; re-run ingestion"}
+        geometry = trip_geometry(session, trip_id, zoom)
+        if geometry is None:
+            return {"error": f"No geometry for trip '{trip_id}'"}
+
+        result = dict(geometry)
+
+        # Store result in tool context
+        if tool_context:
+            if "tool_results" not in tool_context.state:
+                tool_context.state["tool_results"] = []
+            tool_context.state["tool_results"].append(result)
+
+        return result
+    finally:
+        if not use_existing:
+            session.close()
+
+
+def find_nearest_stations(
+    latitude: float,
+    longitude: float,
+    limit: int = 5,
+    max_distance_km: Optional[float] = None,
+    tool_context: ToolContext = None,
+) -> dict:
+    """Find the railway stations closest to a coordinate.
+
+    Use this tool when the user gives a position (e.g., "where is the closest train
+    station to 59.33, 18.06?") rather than a station name.
+
+    Args:
+        latitude: Latitude in decimal degrees (WGS84).
+        longitude: Longitude in decimal degrees (WGS84).
+        limit: Maximum number of stations to return (default: 5, max: 50).
+        max_distance_km: Optional search radius in kilometres.
+        tool_context: ADK tool context providing database session access.
+
+    Returns:
+        A dictionary with 'stations', nearest first, each with the station name,
+        position, 'distance_km' and daily 'departures'.
+    """
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return {"error": f"Invalid coordinate: {latitude}, {longitude}"}
+
+    # Get session from context or create a new one
+    if tool_context and "session" in tool_context.state:
+        session: Session = tool_context.state["session"]
+        use_existing = True
+    else:
+        session = SessionLocal()
+        use_existing = False
+
+    try:
+        nearest = get_spatial_index(session).nearest(latitude, longitude, min(max(limit, 1), 50), max_distance_km)
+        if not nearest:
+            return {"error": "No railway stations found near this position"}
+
+        result = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "stations": [
+                {
+                    "station_id": placed.station.station_id,
+                    "name": placed.station.name,
+                    "lat": placed.lat,
+                    "lon": placed.lon,
+                    "distance_km": round(placed.distance_km, 2),
+                    "departures": placed.station.departures,
+                }
+                for placed in nearest
+            ],
+        }
+
+        # Store result in tool context
+        if tool_context:
+            if "tool_results" not in tool_context.state:
+                tool_context.state["tool_results"] = []
+            tool_context.state["tool_results"].append(result)
+
+        return result
+    finally:
+        if not use_existing:
+            session.close()
+
+
+def get_reachable_stations(
+    origin_name: str,
+    max_minutes: int = 120,
+    travel_date: Optional[str] = None,
+    after_time: Optional[str] = None,
+    max_transfers: int = 4,
+    limit: int = 50,
+    tool_context: ToolContext = None,
+) -> dict:
+    """Find every railway station reachable from a station within a travel time.
+
+    Use this tool for "where can I get to from X within N hours" questions. It
+    answers for all destinations at once, including journeys with changes, so do
+    not call get_departures or plan_journey per destination.
+
+    Args:
+        origin_name: The origin station name (e.g., "Linköping").
+        max_minutes: Travel time budget in minutes from the start time (default: 120).
+        travel_date: Optional date in YYYY-MM-DD format (default: today).
+        after_time: Optional start time in HH:MM format (e.g., "07:00").
+        max_transfers: Maximum number of changes between trains (default: 4).
+        limit: Maximum number of stations to return, earliest arrival first (default: 50).
+        tool_context: ADK tool context providing database session access.
+
+    Returns:
+        A dictionary with 'stations' (name, arrival, travel_minutes, transfers),
+        earliest arrival first, and the total 'count' of reachable stations.
+    """
+    # Get session from context or create a new one
+    if tool_context and "session" in tool_context.state:
+        session: Session = tool_context.state["session"]
+        use_existing = True
+    else:
+        session = SessionLocal()
+        use_existing = False
+
+    try:
+        parsed_date = date.today()
+        if travel_date:
+            try:
+                parsed_date = date.fromisoformat(travel_date)
+            except ValueError:
+                return {"stations": [], "error": f"Invalid date format: {travel_date}"}
+
+        parsed_time = time(0, 0)
+        if after_time:
+            try:
+                hour, minute = map(int, after_time.split(":"))
+                parsed_time = time(hour, minute)
+            except (ValueError, AttributeError):
+                return {"stations": [], "error": f"Invalid time format: {after_time}"}
+
+        if get_journey_planner(session) is None:
+            return {"stations": [], "error": "Reachability is not available for this database"}
+        # The budget actually searched, echoed back so the answer never overstates it
+        max_minutes = min(max(max_minutes, 1), 1440)
+        reachable = reachable_stations(session, origin_name, parsed_date, parsed_time, max_minutes, max_transfers)
+        if reachable is None:
+            return {"stations": [], "error": f"Station '{origin_name}' not found"}
+
+        result = {
+            "origin": reachable["origin"].name,
+            "date": parsed_date.isoformat(),
+            "after": parsed_time.strftime("%H:%M"),
+            "max_minutes": max_minutes,
+            "stations": [
+                {**row, "arrival": format_gtfs_time(row["arrival"])} for row in reachable["stations"][:limit]
+            ],
+            "count": len(reachable["stations"]),
+        }
+        if not reachable["stations"]:
+            result["message"] = "No station reachable in time; try a later start or a larger budget"
+
+        # Store result in tool context
+        if tool_context:
+            if "tool_results" not in tool_context.state:
+                tool_context.state["tool_results"] = []
+            tool_context.state["tool_results"].append(result)
+
+        return result
+    finally:
+        if not use_existing:
+            session.close()
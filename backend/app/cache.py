@@ -0,0 +1,155 @@
+"""
+Feed-versioned result cache for the query layer.
+
+Identical questions ("Stockholm C to Uppsala tomorrow after 08:00") are answered
+from an in-process LRU cache instead of re-running the station search, calendar
+lookup and departures query. Functions opt in with ``@cached(namespace, key=...)``;
+the key function normalizes the arguments (station names resolve to station ids,
+so "Göteborg C" and "goteborg central" share an entry).
+
+Every key starts with the feed the session is bound to (engine URL + the version
+stamped in ``feed_version``), so a blue/green swap starts from an empty cache
+while sessions still on the previous version keep theirs. An in-place reload
+restamps the version: the ingesting process clears its cache (``invalidate``) and
+every other process switches to new keys once it re-reads the stamp, at most
+``FEED_VERSION_CHECK_INTERVAL`` seconds later (see ``app.db.feed_version``).
+Entries also expire after ``RESULT_CACHE_TTL`` seconds and the least recently
+used go first once ``RESULT_CACHE_SIZE`` is reached (0 disables caching).
+
+The cache is per process: each uvicorn worker keeps its own. Cached values are
+shared between callers and must be treated as read-only.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .db import feed_version
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        counts = self._counts.setdefault(namespace, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get_or_compute(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """The cached value for ``(namespace, key)``, computing and storing it on a miss."""
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(entry_key)
+                    self._count(namespace, "hits")
+                    return entry[1]
+                del self._entries[entry_key]
+                self.expirations += 1
+            self._count(namespace, "misses")
+
+        # Computed outside the lock: concurrent misses on one key may both compute
+        value = compute()
+        with self._lock:
+            self._entries[entry_key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(counts["hits"] for counts in self._counts.values())
+            misses = sum(counts["misses"] for counts in self._counts.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "namespaces": {name: dict(counts) for name, counts in sorted(self._counts.items())},
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def result_cache() -> ResultCache:
+    """The process-wide cache, sized from settings on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            settings = get_settings()
+            _cache = ResultCache(settings.result_cache_size, settings.result_cache_ttl)
+        return _cache
+
+
+def invalidate() -> None:
+    """Drop every cached result (after reloading the feed in place)."""
+    result_cache().clear()
+
+
+def feed_key(session: Session) -> Tuple[str, Optional[str]]:
+    """Identity of the feed the session reads: engine URL and stamped version."""
+    bind = session.get_bind()
+    url = getattr(bind, "engine", bind).url.render_as_string(hide_password=True)
+    return url, feed_version(session)
+
+
+def cached(namespace: str, key: Optional[Callable[..., Hashable]] = None):
+    """
+    Cache a ``fn(session, ...)`` query per feed. ``key(session, **arguments)`` builds
+    the normalized key from the bound arguments (all of them, defaults applied, when
+    omitted). The undecorated function stays available as ``fn.uncached``.
+    """
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(session: Session, *args, **kwargs):
+            cache = result_cache()
+            if not cache.enabled:
+                return fn(session, *args, **kwargs)
+            bound = signature.bind(session, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            arguments.pop(next(iter(signature.parameters)))
+            normalized = key(session, **arguments) if key else tuple(arguments.items())
+            return cache.get_or_compute(
+                namespace, (feed_key(session), normalized), lambda: fn(session, *args, **kwargs)
+            )
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
@@ -35,11 +35,38 @@ class Settings(BaseModel):
                 return f"duckdb:///{abs_path}"
         return v
     trafiklab_api_key: str = Field(..., alias="TRAFIKLAB_API_KEY")
+    gtfs_feed_url: str = Field("https://opendata.samtrafiken.se/gtfs-sweden/sweden.zip", alias="GTFS_FEED_URL")
+    # Directory holding feed download state (ETag, Last-Modified, content hash)
+    gtfs_data_dir: str = Field("data/gtfs-sweden3", alias="GTFS_DATA_DIR")
+
+    @field_validator("gtfs_data_dir", mode="after")
+    @classmethod
+    def resolve_data_dir(cls, v: str) -> str:
+        """Resolve a relative data directory from the project root."""
+        if not Path(v).is_absolute():
+            return str((PROJECT_ROOT / v).resolve())
+        return v
+
     model_provider: str = Field("ollama", alias="MODEL_PROVIDER")
     model_name: str = Field("llama3.2", alias="MODEL_NAME")
     openrouter_api_key: str = Field("", alias="OPENROUTER_API_KEY")
     openrouter_model: str = Field("openrouter/quasar-alpha", alias="OPENROUTER_MODEL")
     log_level: str = Field("INFO", alias="LOG_LEVEL")
+    # GTFS loader: "duckdb" (native bulk CSV load), "pandas" (chunked to_sql) or "auto"
+    ingest_loader: str = Field("auto", alias="INGEST_LOADER")
+    # Number of GTFS files / rail tables loaded concurrently during ingest
+    ingest_workers: int = Field(4, alias="INGEST_WORKERS")
+    # Feed version files kept on disk (the active and previous versions are always kept)
+    feed_versions_keep: int = Field(2, alias="FEED_VERSIONS_KEEP")
+    # Departure/route lookups: "sql" (query the database) or "memory" (NumPy timetable, see app.timetable)
+    timetable_engine: str = Field("sql", alias="TIMETABLE_ENGINE")
+    # Query result cache (see app.cache): max entries (0 disables) and time to live in seconds
+    result_cache_size: int = Field(2048, alias="RESULT_CACHE_SIZE")
+    result_cache_ttl: float = Field(300.0, alias="RESULT_CACHE_TTL")
+    # Seconds between re-reads of the feed_version stamp, so in-place reloads by another process are seen
+    feed_version_check_interval: float = Field(5.0, alias="FEED_VERSION_CHECK_INTERVAL")
+    # Threads running ADK tool calls off the event loop (see app.tool_executor); bounds concurrent tool queries
+    tool_workers: int = Field(8, alias="TOOL_WORKERS")
 
 
 @lru_cache(maxsize=1)
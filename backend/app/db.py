@@ -1,18 +1,130 @@
+import threading
+import time
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Any, Callable, Dict, Iterator, Optional
+from weakref import WeakKeyDictionary
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from .config import get_settings
+from .feed_versions import feed_store
 
 settings = get_settings()
 engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+_feed_store = feed_store()
+_version_engines: Dict[str, Engine] = {}
+_version_engines_lock = threading.Lock()
+
+
+def active_feed_version() -> Optional[str]:
+    """Active blue/green feed version, or None when serving DATABASE_URL directly."""
+    return _feed_store.active_version() if _feed_store else None
+
+
+def get_engine() -> Engine:
+    """
+    Engine for the active feed version. Sessions opened before a swap keep their
+    engine, so in-flight queries finish against the version they started on.
+    """
+    pointer = _feed_store.pointer() if _feed_store else None
+    if not pointer:
+        return engine
+
+    version = pointer["version"]
+    with _version_engines_lock:
+        version_engine = _version_engines.get(version)
+        if version_engine is None:
+            version_engine = create_engine(
+                _feed_store.version_url(version),
+                pool_pre_ping=True,
+                future=True,
+                connect_args={"read_only": True},
+            )
+            _version_engines[version] = version_engine
+            # Keep the previous version's engine alive for sessions still using it
+            for stale in set(_version_engines) - {version, pointer.get("previous")}:
+                _version_engines.pop(stale).dispose()
+    return version_engine
+
+
+class _ActiveFeedSessionFactory:
+    """Drop-in for a bound sessionmaker that binds each session to the active feed version."""
+
+    def __init__(self) -> None:
+        self._maker = sessionmaker(autoflush=False, autocommit=False, future=True)
+
+    def __call__(self, **kwargs) -> Session:
+        return self._maker(bind=get_engine(), **kwargs)
+
+
+SessionLocal = _ActiveFeedSessionFactory()
+
+
+class _EngineData:
+    """What ``engine_cached`` holds for one engine, and the feed version it was loaded from."""
+
+    def __init__(self) -> None:
+        self.version: Optional[str] = None
+        self.checked_at = float("-inf")
+        self.values: Dict[str, Any] = {}
+
+
+# Data derived from a feed (indexes, calendars), per engine: each blue/green version
+# has its own engine, so a swap starts fresh while sessions on the old version keep
+# what they loaded. An in-place reload keeps the engine but restamps feed_version;
+# the stamp is re-read every FEED_VERSION_CHECK_INTERVAL seconds, and a new one
+# drops the engine's data, also in processes other than the one that ingested.
+_engine_data: "WeakKeyDictionary[Engine, _EngineData]" = WeakKeyDictionary()
+_engine_data_lock = threading.Lock()
+
+
+def read_feed_version(conn: Connection) -> Optional[str]:
+    """The version stamped in ``feed_version``; None for a database without the stamp."""
+    if not inspect(conn).has_table("feed_version"):
+        return None
+    return conn.execute(text("SELECT max(version) FROM feed_version")).scalar()
+
+
+def _current_engine_data(session: Session) -> _EngineData:
+    bind = session.get_bind()
+    bound_engine = getattr(bind, "engine", bind)
+    with _engine_data_lock:
+        data = _engine_data.get(bound_engine)
+        if data is None:
+            data = _engine_data[bound_engine] = _EngineData()
+        due = time.monotonic() - data.checked_at >= get_settings().feed_version_check_interval
+    if due:
+        version = read_feed_version(session.connection())
+        with _engine_data_lock:
+            data.checked_at = time.monotonic()
+            if version != data.version:
+                data.version = version
+                data.values = {}
+    return data
+
+
+def feed_version(session: Session) -> Optional[str]:
+    """The feed version the session's engine holds, re-read at most every check interval."""
+    return _current_engine_data(session).version
+
+
+def engine_cached(session: Session, key: str, load: Callable[[Connection], Any]) -> Any:
+    """``load(connection)`` once per (engine of ``session``, feed version, ``key``)."""
+    data = _current_engine_data(session)
+    with _engine_data_lock:
+        values = data.values
+        if key in values:
+            return values[key]
+    value = load(session.connection())
+    with _engine_data_lock:
+        return values.setdefault(key, value)
 
 
 @contextmanager
-def session_scope() -> Iterator[SessionLocal]:
+def session_scope() -> Iterator[Session]:
     """Provide a transactional scope around a series of operations."""
     session = SessionLocal()
     try:
@@ -23,4 +135,3 @@ def session_scope() -> Iterator[SessionLocal]:
         raise
     finally:
         session.close()
-
@@ -0,0 +1,141 @@
+"""
+Departure boards paged with an opaque keyset cursor.
+
+A board lists a station's departures in real time order from a start date and
+time, crossing midnight and service days: the trains leaving at 00:10 on
+``date`` come from ``date``'s service day and from the previous day's trips
+with times past 24:00. Every departure gets an absolute position
+(``service_date`` in seconds + GTFS departure time), and a page ends with a
+cursor holding the position and trip_id of its last row. The next page asks
+each service day only for the ``limit`` departures after that key, so it costs
+the same however deep the user has scrolled (no OFFSET, no growing LIMIT). The
+cursor holds no row numbers, so it stays valid across a feed refresh.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .gtfs_time import format_gtfs_time, time_to_seconds
+from .query_planner import next_departures
+from .stop_index import Station, get_stop_index
+
+SECONDS_PER_DAY = 86400
+# Service days before the start date whose trips can still be running (times past 24:00)
+OVERNIGHT_DAYS = 1
+# Service days searched after the start date before a board is considered exhausted
+HORIZON_DAYS = 7
+
+
+@dataclass(frozen=True)
+class BoardPage:
+    station: Station
+    rows: List[dict]
+    next_cursor: Optional[str]
+
+
+def board_position(day: date, at: Optional[time] = None) -> int:
+    """Absolute position of ``at`` (default midnight) on ``day``, in seconds."""
+    return day.toordinal() * SECONDS_PER_DAY + (time_to_seconds(at) if at else 0)
+
+
+def encode_cursor(station_id: str, position: int, trip_id: str) -> str:
+    payload = json.dumps([station_id, position, trip_id], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, str]:
+    """(station_id, position, trip_id); ValueError for a token this module did not issue."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        station_id, position, trip_id = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    if not isinstance(station_id, str) or not isinstance(position, int) or not isinstance(trip_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return station_id, position, trip_id
+
+
+def departure_board(
+    session: Session,
+    station: Station,
+    start: int,
+    limit: int = 20,
+    after_trip: Optional[str] = None,
+) -> BoardPage:
+    """
+    The next ``limit`` departures from ``station`` at/after position ``start`` (see
+    ``board_position``); with ``after_trip``, strictly after (start, after_trip).
+    ValueError for a ``limit`` below 1.
+    """
+    if limit < 1:
+        raise ValueError(f"limit must be at least 1, got {limit}")
+    first_day = date.fromordinal(start // SECONDS_PER_DAY)
+
+    found: List[Tuple[int, str, date, dict]] = []
+    service_date = first_day - timedelta(days=OVERNIGHT_DAYS)
+    while service_date <= first_day + timedelta(days=HORIZON_DAYS):
+        day_start = board_position(service_date)
+        bound = start - day_start
+        rows = next_departures(
+            session,
+            station.stop_ids,
+            service_date,
+            max(bound, 0),
+            limit,
+            after_trip if bound >= 0 else None,
+        )
+        found.extend((day_start + row["departure"], row["trip_id"], service_date, row) for row in rows)
+        found.sort(key=lambda item: item[:2])
+        del found[limit:]
+        service_date += timedelta(days=1)
+        # Later service days only start at their own midnight
+        if len(found) == limit and found[-1][0] < board_position(service_date):
+            break
+
+    rows = []
+    for position, _, service_date, row in found:
+        rows.append(
+            {
+                **row,
+                "date": date.fromordinal(position // SECONDS_PER_DAY).isoformat(),
+                "departure": format_gtfs_time(position % SECONDS_PER_DAY),
+                "service_date": service_date.isoformat(),
+            }
+        )
+    next_cursor = None
+    if len(found) == limit:
+        position, trip_id = found[-1][:2]
+        next_cursor = encode_cursor(station.station_id, position, trip_id)
+    return BoardPage(station=station, rows=rows, next_cursor=next_cursor)
+
+
+def board_page(
+    session: Session,
+    station_name: Optional[str],
+    start_date: date,
+    start_time: Optional[time] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Optional[BoardPage]:
+    """
+    A page of the board for ``station_name``, or the page after ``cursor`` (which carries
+    its own station and position, so the other arguments are then ignored). None when
+    the station is unknown; ValueError for a malformed cursor.
+    """
+    index = get_stop_index(session)
+    if cursor:
+        station_id, position, trip_id = decode_cursor(cursor)
+        station = index.station(station_id)
+        if station is None:
+            return None
+        return departure_board(session, station, position, limit, after_trip=trip_id)
+    station = index.resolve(station_name or "")
+    if station is None:
+        return None
+    return departure_board(session, station, board_position(start_date, start_time), limit)
@@ -0,0 +1,156 @@
+"""
+Blue/green feed versions for DuckDB deployments.
+
+Each ingest builds a complete database file under ``$GTFS_DATA_DIR/versions`` and
+then flips ``active_feed.json`` with an atomic rename. The API binds every new
+session to the active version, so queries never see a half-loaded feed; the
+previous version stays on disk for rollback.
+
+    python -m app.feed_versions status
+    python -m app.feed_versions rollback
+    python -m app.feed_versions activate 20261018T031500123456Z
+"""
+
+import argparse
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = "active_feed.json"
+VERSIONS_DIR = "versions"
+
+
+def new_version_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+class FeedStore:
+    """Versioned DuckDB files plus the pointer naming the active one."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.pointer_path = self.root / POINTER_FILE
+        self.versions_dir = self.root / VERSIONS_DIR
+        self._cached_stat = None
+        self._cached_pointer: Optional[dict] = None
+
+    def version_path(self, version: str) -> Path:
+        return self.versions_dir / f"gtfs-{version}.duckdb"
+
+    def version_url(self, version: str) -> str:
+        return f"duckdb:///{self.version_path(version)}"
+
+    def versions(self) -> List[str]:
+        """Versions present on disk, oldest first."""
+        if not self.versions_dir.exists():
+            return []
+        return sorted(p.stem[len("gtfs-") :] for p in self.versions_dir.glob("gtfs-*.duckdb"))
+
+    def pointer(self) -> Optional[dict]:
+        """Contents of the pointer file; re-read only when the file changes."""
+        try:
+            stat = self.pointer_path.stat()
+        except FileNotFoundError:
+            self._cached_stat = None
+            self._cached_pointer = None
+            return None
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if key != self._cached_stat:
+            self._cached_pointer = json.loads(self.pointer_path.read_text())
+            self._cached_stat = key
+        return self._cached_pointer
+
+    def active_version(self) -> Optional[str]:
+        pointer = self.pointer()
+        return pointer["version"] if pointer else None
+
+    def activate(self, version: str) -> dict:
+        """Atomically point the API at ``version``; the current one becomes ``previous``."""
+        if not self.version_path(version).exists():
+            raise FileNotFoundError(f"Feed version {version} not found in {self.versions_dir}")
+        current = self.active_version()
+        pointer = {
+            "version": version,
+            "previous": current if current != version else (self.pointer() or {}).get("previous"),
+            "activated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.pointer_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(pointer, indent=2))
+        os.replace(tmp_path, self.pointer_path)
+        logger.info("Activated feed version %s (previous: %s)", version, pointer["previous"])
+        return pointer
+
+    def rollback(self) -> dict:
+        pointer = self.pointer()
+        if not pointer or not pointer.get("previous"):
+            raise RuntimeError("No previous feed version to roll back to")
+        return self.activate(pointer["previous"])
+
+    def remove(self, version: str) -> None:
+        """Delete a version's database file and its write-ahead log."""
+        path = self.version_path(version)
+        path.unlink(missing_ok=True)
+        path.with_name(path.name + ".wal").unlink(missing_ok=True)
+
+    def prune(self, keep: int) -> List[str]:
+        """Delete old versions, keeping the newest ``keep`` plus the active and previous ones."""
+        pointer = self.pointer() or {}
+        protected = {pointer.get("version"), pointer.get("previous")}
+        versions = self.versions()
+        removed = []
+        for version in versions[: max(0, len(versions) - keep)]:
+            if version in protected:
+                continue
+            self.remove(version)
+            removed.append(version)
+        if removed:
+            logger.info("Pruned feed versions %s", ", ".join(removed))
+        return removed
+
+
+def feed_store() -> Optional[FeedStore]:
+    """The store for this deployment, or None when DATABASE_URL is not a DuckDB file."""
+    url = settings.database_url
+    if not url.startswith("duckdb:///") or url.endswith(":memory:"):
+        return None
+    return FeedStore(Path(settings.gtfs_data_dir))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or switch the active GTFS feed version")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    sub.add_parser("rollback")
+    activate = sub.add_parser("activate")
+    activate.add_argument("version")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.log_level)
+    store = feed_store()
+    if store is None:
+        raise SystemExit("Feed versioning requires a file-based DuckDB DATABASE_URL")
+
+    if args.command == "rollback":
+        store.rollback()
+    elif args.command == "activate":
+        store.activate(args.version)
+
+    pointer = store.pointer() or {}
+    for version in store.versions():
+        marker = "*" if version == pointer.get("version") else ("p" if version == pointer.get("previous") else " ")
+        print(f"{marker} {version}")
+    if not pointer:
+        print(f"No active version; serving {settings.database_url}")
+
+
+if __name__ == "__main__":
+    main()
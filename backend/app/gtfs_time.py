@@ -0,0 +1,35 @@
+"""
+GTFS time helpers.
+
+stop_times stores arrival/departure as integer seconds since the start of the
+service day, so "25:10:00" (a trip running past midnight) is 90600 and sorts after
+"23:59:00", and unpadded values such as "7:05:00" compare correctly.
+"""
+
+from datetime import time
+from typing import Optional
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def parse_gtfs_time(value: Optional[str]) -> Optional[int]:
+    """'H:MM:SS' / 'HH:MM:SS' (hours may exceed 23) -> seconds; blank -> None."""
+    if value is None:
+        return None
+    value = value.strip()
+    if not value:
+        return None
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def format_gtfs_time(seconds: Optional[int]) -> Optional[str]:
+    """Seconds since service-day start -> 'HH:MM:SS' (hours may exceed 23)."""
+    if seconds is None:
+        return None
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def time_to_seconds(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
@@ -0,0 +1,168 @@
+"""
+Stream GTFS files straight out of the downloaded zip.
+
+Members are never extracted as a whole: pandas reads a decompressing stream, and
+DuckDB reads a named pipe fed by a background thread, so the only file on disk is
+the archive itself. Progress is logged per file as the stream is consumed.
+"""
+
+import csv
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PIPE_CHUNK_SIZE = 1024 * 1024
+
+
+class _ProgressReader(io.RawIOBase):
+    """Read-through wrapper that logs every ``step`` of the expected size."""
+
+    def __init__(self, raw: BinaryIO, label: str, total: int, step: float = 0.1):
+        self._raw = raw
+        self._label = label
+        self._total = total
+        self._step = step
+        self._next_report = step
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.bytes_read += n
+        if self._total and self.bytes_read / self._total >= self._next_report:
+            logger.info(
+                "Reading %s: %d%% (%.1f of %.1f MB)",
+                self._label,
+                100 * self.bytes_read // self._total,
+                self.bytes_read / 1e6,
+                self._total / 1e6,
+            )
+            while self._next_report <= self.bytes_read / self._total:
+                self._next_report += self._step
+        return n
+
+
+@dataclass(frozen=True)
+class ZipMember:
+    """One CSV inside the feed archive."""
+
+    zip_path: Path
+    member: str
+    # Uncompressed size in bytes
+    size: int
+
+    @property
+    def name(self) -> str:
+        return Path(self.member).name
+
+    @contextmanager
+    def open(self, progress: bool = True) -> Iterator[BinaryIO]:
+        # A ZipFile per stream keeps concurrent loaders from sharing a file position
+        with zipfile.ZipFile(self.zip_path) as zf, zf.open(self.member) as raw:
+            if not progress:
+                yield raw
+                return
+            yield io.BufferedReader(_ProgressReader(raw, self.name, self.size), buffer_size=PIPE_CHUNK_SIZE)
+
+
+CsvSource = Union[Path, ZipMember]
+
+
+class FeedArchive:
+    """Index of the .txt members of a GTFS zip (members may sit in a subdirectory)."""
+
+    def __init__(self, zip_path: Path):
+        self.zip_path = Path(zip_path)
+        with zipfile.ZipFile(self.zip_path) as zf:
+            self._members: Dict[str, zipfile.ZipInfo] = {
+                Path(info.filename).name: info for info in zf.infolist() if not info.is_dir()
+            }
+
+    def member(self, filename: str) -> Optional[ZipMember]:
+        info = self._members.get(filename)
+        if info is None:
+            return None
+        return ZipMember(zip_path=self.zip_path, member=info.filename, size=info.file_size)
+
+
+def source_size(source: CsvSource) -> int:
+    """Uncompressed size in bytes."""
+    return source.size if isinstance(source, ZipMember) else Path(source).stat().st_size
+
+
+@contextmanager
+def open_source(source: CsvSource, progress: bool = True) -> Iterator[BinaryIO]:
+    if isinstance(source, ZipMember):
+        with source.open(progress=progress) as fh:
+            yield fh
+    else:
+        with open(source, "rb") as fh:
+            yield fh
+
+
+def csv_header(source: CsvSource) -> List[str]:
+    """Column names from the first line, BOM and surrounding whitespace removed."""
+    with open_source(source, progress=False) as fh:
+        text_stream = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+        header = next(csv.reader(text_stream), [])
+        text_stream.detach()
+    return [col.strip() for col in header]
+
+
+def _pipe_member(member: ZipMember, fifo: Path, errors: list) -> None:
+    try:
+        with member.open() as src, open(fifo, "wb") as dst:
+            shutil.copyfileobj(src, dst, PIPE_CHUNK_SIZE)
+    except BrokenPipeError:
+        pass  # the reader gave up; its own error is reported
+    except Exception as exc:  # noqa: BLE001 - surfaced by readable_path()
+        errors.append(exc)
+
+
+@contextmanager
+def readable_path(source: CsvSource) -> Iterator[Path]:
+    """
+    A filesystem path DuckDB's read_csv can scan. Zip members are streamed through a
+    named pipe; where pipes are unavailable the single member is spooled to a temp file.
+    """
+    if not isinstance(source, ZipMember):
+        yield source
+        return
+
+    with tempfile.TemporaryDirectory(prefix="gtfs-") as tmpdir:
+        path = Path(tmpdir) / source.name
+        if not hasattr(os, "mkfifo"):
+            with source.open() as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst, PIPE_CHUNK_SIZE)
+            yield path
+            return
+
+        os.mkfifo(path)
+        errors: list = []
+        writer = threading.Thread(target=_pipe_member, args=(source, path, errors), daemon=True)
+        writer.start()
+        try:
+            yield path
+        finally:
+            while writer.is_alive():
+                # Reader failed or never opened the pipe: open and close our end so the
+                # writer's open() returns and its next write fails with EPIPE
+                fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+                os.close(fd)
+                writer.join(timeout=0.1)
+        if errors:
+            raise errors[0]
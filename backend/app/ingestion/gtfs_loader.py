@@ -1,17 +1,38 @@
+import argparse
+import hashlib
+import json
 import logging
 import os
 import tempfile
-import zipfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 import requests
-from sqlalchemy import text
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
 
+from ..cache import invalidate as invalidate_result_cache
 from ..config import get_settings
 from ..db import engine
+from ..feed_versions import feed_store, new_version_id
 from ..models import Base
+from ..service_calendar import (
+    SERVICE_CALENDAR_DDL,
+    SERVICE_DATES_DDL,
+    build_service_calendar,
+    build_service_dates,
+)
+from ..service_frequency import FREQUENCY_DAYS_SQL, OD_FREQUENCY_SQL, STATION_FREQUENCY_SQL
+from ..shape_geometry import SHAPE_GEOMETRIES_DDL, build_shape_geometries
+from ..stop_index import STATION_STOPS_DDL, build_station_stops
+from ..trip_times import TIME_PROFILES_SQL, TRIP_TIMES_SQL
+from .feed_archive import CsvSource, FeedArchive, csv_header, open_source, readable_path, source_size
+from .report import RssMonitor, StatementTiming, build_report, statement_label, write_report
+from .scheduler import RunTimings, Task, run_tasks
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -52,30 +73,239 @@ GTFS_FILES: Dict[str, List[str]] = {
 }
 
 
-def download_gtfs_zip(dest_path: Path) -> Path:
-    url = f"https://opendata.samtrafiken.se/gtfs-sweden/sweden.zip?key={settings.trafiklab_api_key}"
+FEED_STATE_FILE = "feed_state.json"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class FeedDownload:
+    """Outcome of a (conditional) feed download."""
+
+    path: Path
+    changed: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+    size_bytes: int = 0
+
+    def state(self) -> dict:
+        return {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "sha256": self.sha256,
+            "size_bytes": self.size_bytes,
+            "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+
+def feed_state_path() -> Path:
+    return Path(settings.gtfs_data_dir) / FEED_STATE_FILE
+
+
+def read_feed_state() -> dict:
+    """Validators and content hash of the last successfully ingested feed."""
+    path = feed_state_path()
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable feed state file %s", path)
+        return {}
+
+
+def write_feed_state(download: FeedDownload) -> None:
+    path = feed_state_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(download.state(), indent=2))
+    os.replace(tmp_path, path)
+
+
+def download_gtfs_zip(
+    dest_path: Path,
+    previous_state: Optional[dict] = None,
+    url: Optional[str] = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> FeedDownload:
+    """
+    Stream the GTFS archive to ``dest_path`` in ``chunk_size`` pieces.
+
+    With ``previous_state`` the request is conditional (If-None-Match /
+    If-Modified-Since); a 304 or an archive whose SHA-256 matches the previous one is
+    reported as ``changed=False``.
+    """
+    previous_state = previous_state or {}
+    if url is None:
+        url = settings.gtfs_feed_url
+        params = {"key": settings.trafiklab_api_key}
+    else:
+        params = None
+
+    headers = {"Accept-Encoding": "gzip"}
+    if previous_state.get("etag"):
+        headers["If-None-Match"] = previous_state["etag"]
+    if previous_state.get("last_modified"):
+        headers["If-Modified-Since"] = previous_state["last_modified"]
+
     logger.info("Downloading GTFS Sweden 3 feed...")
-    response = requests.get(url, timeout=120, headers={"Accept-Encoding": "gzip"})
-    response.raise_for_status()
-    dest_path.write_bytes(response.content)
-    logger.info("Downloaded GTFS archive to %s", dest_path)
-    return dest_path
+    with requests.get(url, params=params, headers=headers, timeout=120, stream=True) as response:
+        if response.status_code == 304:
+            logger.info("GTFS feed not modified since last download")
+            return FeedDownload(
+                path=dest_path,
+                changed=False,
+                etag=previous_state.get("etag"),
+                last_modified=previous_state.get("last_modified"),
+                sha256=previous_state.get("sha256"),
+                size_bytes=previous_state.get("size_bytes", 0),
+            )
+        response.raise_for_status()
+
+        digest = hashlib.sha256()
+        size = 0
+        part_path = dest_path.with_name(dest_path.name + ".part")
+        with part_path.open("wb") as fh:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                fh.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        os.replace(part_path, dest_path)
+
+        download = FeedDownload(
+            path=dest_path,
+            changed=True,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            sha256=digest.hexdigest(),
+            size_bytes=size,
+        )
+
+    if previous_state.get("sha256") == download.sha256:
+        logger.info("GTFS archive content unchanged (sha256 %s)", download.sha256[:12])
+        download.changed = False
+    logger.info("Downloaded GTFS archive to %s (%d bytes)", dest_path, size)
+    return download
+
+
+CALENDAR_DAY_COLUMNS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Projection applied to stops.txt; extra columns in the feed are dropped
+STOPS_COLUMNS = [
+    "stop_id",
+    "stop_name",
+    "stop_lat",
+    "stop_lon",
+    "location_type",
+    "parent_station",
+    "platform_code",
+]
+
+# Date columns (YYYYMMDD in the feed) per table
+DATE_COLUMNS: Dict[str, List[str]] = {
+    "calendar": ["start_date", "end_date"],
+    "calendar_dates": ["date"],
+}
 
+# Numeric columns; unparseable values become NULL like pd.to_numeric(errors="coerce")
+NUMERIC_COLUMNS: Dict[str, str] = {
+    "stop_lat": "DOUBLE",
+    "stop_lon": "DOUBLE",
+    "location_type": "INTEGER",
+    "stop_sequence": "INTEGER",
+    "pickup_type": "INTEGER",
+    "drop_off_type": "INTEGER",
+    "timepoint": "INTEGER",
+    "shape_dist_traveled": "DOUBLE",
+    "shape_pt_lat": "DOUBLE",
+    "shape_pt_lon": "DOUBLE",
+    "shape_pt_sequence": "INTEGER",
+    "exception_type": "INTEGER",
+    "route_type": "INTEGER",
+    "direction_id": "INTEGER",
+    "transfer_type": "INTEGER",
+    "min_transfer_time": "INTEGER",
+}
 
-def unzip_feed(zip_path: Path, dest_dir: Path) -> None:
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(dest_dir)
-    logger.info("Extracted GTFS feed to %s", dest_dir)
+# GTFS times ('H:MM:SS', hours may exceed 23) stored as INTEGER seconds since service-day start
+TIME_COLUMNS: Dict[str, List[str]] = {
+    "stop_times": ["arrival_time", "departure_time"],
+}
 
+# Natural keys for tables that may carry duplicate rows
+DEDUP_KEYS: Dict[str, List[str]] = {
+    "stop_areas": ["area_id", "stop_id"],
+}
+
+
+def _resolve_loader(bind: Engine, method: Optional[str]) -> str:
+    method = (method or settings.ingest_loader).lower()
+    if method == "auto":
+        return "duckdb" if bind.dialect.name == "duckdb" else "pandas"
+    if method not in ("duckdb", "pandas"):
+        raise ValueError(f"Unknown ingest loader: {method}")
+    if method == "duckdb" and bind.dialect.name != "duckdb":
+        raise ValueError("The duckdb loader requires a DuckDB DATABASE_URL")
+    return method
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_expr(table_name: str, column: str) -> str:
+    """SQL expression casting a raw VARCHAR column to its typed form."""
+    ident = _quote_ident(column)
+    if table_name == "calendar" and column in CALENDAR_DAY_COLUMNS:
+        return f"(trim({ident}) = '1') AS {ident}"
+    if column in DATE_COLUMNS.get(table_name, []):
+        return f"CAST(strptime(trim({ident}), '%Y%m%d') AS DATE) AS {ident}"
+    if column in TIME_COLUMNS.get(table_name, []):
+        parts = [f"TRY_CAST(split_part(trim({ident}), ':', {i}) AS INTEGER)" for i in (1, 2, 3)]
+        return f"({parts[0]} * 3600 + {parts[1]} * 60 + {parts[2]}) AS {ident}"
+    if column in NUMERIC_COLUMNS:
+        return f"TRY_CAST(trim({ident}) AS {NUMERIC_COLUMNS[column]}) AS {ident}"
+    return ident
+
+
+def _load_csv_duckdb(source: CsvSource, table_name: str, bind: Engine) -> int:
+    """Let DuckDB's parallel CSV reader ingest the file directly, casting columns in SQL."""
+    columns = csv_header(source)
+    if table_name == "stops":
+        select_list = [
+            _column_expr(table_name, col)
+            if col in columns
+            else f"CAST(NULL AS {NUMERIC_COLUMNS.get(col, 'VARCHAR')}) AS {_quote_ident(col)}"
+            for col in STOPS_COLUMNS
+        ]
+    else:
+        select_list = [_column_expr(table_name, col) for col in columns]
+
+    distinct = ""
+    if table_name in DEDUP_KEYS:
+        distinct = "DISTINCT ON ({}) ".format(", ".join(_quote_ident(c) for c in DEDUP_KEYS[table_name]))
+
+    names = ", ".join("'{}'".format(col.replace("'", "''")) for col in columns)
+    with bind.begin() as conn, readable_path(source) as csv_path:
+        relation = "read_csv('{}', header=true, all_varchar=true, names=[{}])".format(
+            str(csv_path).replace("'", "''"), names
+        )
+        conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        conn.execute(
+            text(f"CREATE TABLE {table_name} AS SELECT {distinct}{', '.join(select_list)} FROM {relation}")
+        )
+        return conn.execute(text(f"SELECT count(*) FROM {table_name}")).scalar_one()
 
-def load_csv_to_table(csv_path: Path, table_name: str, chunksize: int = 20000) -> None:
-    if not csv_path.exists():
-        logger.warning("File %s not found; skipping", csv_path.name)
-        return
 
-    logger.info("Loading %s into %s", csv_path.name, table_name)
+def _gtfs_time_seconds(values: pd.Series) -> pd.Series:
+    parts = values.str.strip().str.split(":", expand=True).reindex(columns=range(3))
+    hms = parts.apply(pd.to_numeric, errors="coerce")
+    return (hms[0] * 3600 + hms[1] * 60 + hms[2]).astype("Int64")
+
+
+def _load_csv_pandas(source: CsvSource, table_name: str, chunksize: int, bind: Engine) -> int:
     # Idempotent: drop-and-append to avoid reflection issues in duckdb pandas writer
-    with engine.begin() as conn:
+    with bind.begin() as conn:
         conn.execute(text(f"DROP TABLE IF EXISTS {table_name};"))
     if_exists_mode = "append"
 
@@ -83,161 +313,617 @@ def load_csv_to_table(csv_path: Path, table_name: str, chunksize: int = 20000) -
     heavy_tables = {"stop_times", "shapes"}
     table_chunksize = 5000 if table_name in heavy_tables else chunksize
 
-    for chunk in pd.read_csv(csv_path, chunksize=table_chunksize, dtype=str):
-        chunk.columns = [col.strip() for col in chunk.columns]
+    rows = 0
+    seen_keys = set()
+    with open_source(source) as fh:
+        for chunk in pd.read_csv(fh, chunksize=table_chunksize, dtype=str):
+            chunk.columns = [col.strip() for col in chunk.columns]
 
-        if table_name == "calendar":
-            day_cols = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-            for col in day_cols:
-                if col in chunk.columns:
-                    chunk[col] = chunk[col].astype(bool)
-            if "start_date" in chunk.columns:
-                chunk["start_date"] = pd.to_datetime(chunk["start_date"], format="%Y%m%d")
-            if "end_date" in chunk.columns:
-                chunk["end_date"] = pd.to_datetime(chunk["end_date"], format="%Y%m%d")
-
-        if table_name == "calendar_dates":
-            if "date" in chunk.columns:
-                chunk["date"] = pd.to_datetime(chunk["date"], format="%Y%m%d")
-
-        if table_name == "stops":
-            expected = [
-                "stop_id",
-                "stop_name",
-                "stop_lat",
-                "stop_lon",
-                "location_type",
-                "parent_station",
-                "platform_code",
-            ]
-            for col in expected:
-                if col not in chunk.columns:
-                    chunk[col] = None
-            chunk = chunk[expected]
-            for col in ("stop_lat", "stop_lon"):
+            if table_name == "calendar":
+                for col in CALENDAR_DAY_COLUMNS:
+                    if col in chunk.columns:
+                        chunk[col] = chunk[col].str.strip() == "1"
+
+            for col in DATE_COLUMNS.get(table_name, []):
                 if col in chunk.columns:
-                    chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
-            if "location_type" in chunk.columns:
-                chunk["location_type"] = pd.to_numeric(chunk["location_type"], errors="coerce").astype("Int64")
+                    chunk[col] = pd.to_datetime(chunk[col], format="%Y%m%d")
 
-        # Deduplicate for tables that may carry duplicate natural keys
-        if table_name == "stop_areas":
-            chunk = chunk.drop_duplicates(subset=["area_id", "stop_id"])
-        chunk.to_sql(table_name, engine, if_exists=if_exists_mode, index=False)
-        if_exists_mode = "append"
-    logger.info("Finished loading %s", table_name)
+            for col in TIME_COLUMNS.get(table_name, []):
+                if col in chunk.columns:
+                    chunk[col] = _gtfs_time_seconds(chunk[col])
 
+            if table_name == "stops":
+                for col in STOPS_COLUMNS:
+                    if col not in chunk.columns:
+                        chunk[col] = None
+                chunk = chunk[STOPS_COLUMNS]
 
-def materialize_rail_subset() -> None:
+            for col, sql_type in NUMERIC_COLUMNS.items():
+                if col in chunk.columns:
+                    chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+                    if sql_type == "INTEGER":
+                        chunk[col] = chunk[col].astype("Int64")
+
+            # Deduplicate for tables that may carry duplicate natural keys
+            if table_name in DEDUP_KEYS:
+                keys = DEDUP_KEYS[table_name]
+                chunk = chunk.drop_duplicates(subset=keys)
+                key_tuples = list(chunk[keys].itertuples(index=False, name=None))
+                chunk = chunk[[key not in seen_keys for key in key_tuples]]
+                seen_keys.update(key_tuples)
+            chunk.to_sql(table_name, bind, if_exists=if_exists_mode, index=False)
+            if_exists_mode = "append"
+            rows += len(chunk)
+    return rows
+
+
+def load_csv_to_table(
+    csv_path: CsvSource,
+    table_name: str,
+    chunksize: int = 20000,
+    bind: Optional[Engine] = None,
+    method: Optional[str] = None,
+) -> int:
     """
-    Create rail-only tables and indexes to slim the dataset for rail-focused queries.
+    Load one GTFS file (a path, or a member streamed from the feed zip) into
+    ``table_name`` and return the number of rows loaded.
+
+    ``method`` selects the loader: ``duckdb`` bulk-loads through DuckDB's native CSV
+    reader, ``pandas`` streams chunks through ``DataFrame.to_sql``. Defaults to the
+    ``INGEST_LOADER`` setting (``auto`` picks duckdb on DuckDB databases).
     """
+    bind = bind or engine
+    if isinstance(csv_path, Path) and not csv_path.exists():
+        logger.warning("File %s not found; skipping", csv_path.name)
+        return 0
+
+    loader = _resolve_loader(bind, method)
+    logger.info("Loading %s into %s (%s loader)", csv_path.name, table_name, loader)
+    started = time.perf_counter()
+    if loader == "duckdb":
+        rows = _load_csv_duckdb(csv_path, table_name, bind)
+    else:
+        rows = _load_csv_pandas(csv_path, table_name, chunksize, bind)
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Finished loading %s: %d rows in %.2fs (%.0f rows/s)",
+        table_name,
+        rows,
+        elapsed,
+        rows / elapsed if elapsed > 0 else 0.0,
+    )
+    return rows
+
+
+@dataclass(frozen=True)
+class RailStep:
+    """One rail-subset table (or view) with the tables it is derived from."""
+
+    name: str
+    # Raw GTFS tables read by the step
+    sources: Tuple[str, ...]
+    # Other rail steps that must finish first
+    depends_on: Tuple[str, ...]
+    statements: Tuple[str, ...]
+    indexes: Tuple[str, ...] = ()
+    # True when the step creates a view rather than a table
+    view: bool = False
+    # Python fill run after the statements, before the indexes
+    build: Optional[Callable[[Connection], None]] = None
+    # Uses DuckDB-only SQL (lists, GROUP BY ALL, isodow); left out on other databases
+    duckdb_only: bool = False
+
+
+def rail_steps() -> List[RailStep]:
     whitelist = ",".join(str(x) for x in sorted(RAIL_ROUTE_TYPES))
-    logger.info("Creating rail-only tables with route_type in (%s)", whitelist)
-
-    stmts = [
-        "DROP TABLE IF EXISTS routes_rail",
-        f"""
-        CREATE TABLE routes_rail AS
-        SELECT * FROM routes WHERE route_type IN ({whitelist})
-        """,
-        "DROP TABLE IF EXISTS trips_rail",
-        """
-        CREATE TABLE trips_rail AS
-        SELECT t.*
-        FROM trips t
-        JOIN routes_rail r ON r.route_id = t.route_id
-        """,
-        "DROP TABLE IF EXISTS stop_times_rail",
-        """
-        CREATE TABLE stop_times_rail AS
-        SELECT st.*
-        FROM stop_times st
-        JOIN trips_rail t ON t.trip_id = st.trip_id
-        """,
-        "DROP TABLE IF EXISTS shapes_rail",
-        """
-        CREATE TABLE shapes_rail AS
-        SELECT s.*
-        FROM shapes s
-        WHERE EXISTS (
-            SELECT 1 FROM trips_rail t WHERE t.shape_id = s.shape_id
-        )
-        """,
-        "DROP TABLE IF EXISTS stops_rail",
-        """
-        CREATE TABLE stops_rail AS
-        SELECT DISTINCT s.*
-        FROM stops s
-        JOIN stop_times_rail st ON st.stop_id = s.stop_id
-        """,
-        "DROP TABLE IF EXISTS transfers_rail",
-        """
-        CREATE TABLE transfers_rail AS
-        SELECT tr.*
-        FROM transfers tr
-        WHERE tr.from_stop_id IN (SELECT DISTINCT stop_id FROM stop_times_rail)
-          AND tr.to_stop_id   IN (SELECT DISTINCT stop_id FROM stop_times_rail)
-        """,
+    return [
+        RailStep(
+            name="routes_rail",
+            sources=("routes",),
+            depends_on=(),
+            statements=(
+                "DROP TABLE IF EXISTS routes_rail",
+                f"""
+                CREATE TABLE routes_rail AS
+                SELECT * FROM routes WHERE route_type IN ({whitelist})
+                """,
+            ),
+            indexes=(
+                "CREATE INDEX IF NOT EXISTS idx_routes_rail_type ON routes_rail(route_type)",
+                "CREATE INDEX IF NOT EXISTS idx_routes_rail_agency ON routes_rail(agency_id)",
+            ),
+        ),
+        RailStep(
+            name="trips_rail",
+            sources=("trips",),
+            depends_on=("routes_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS trips_rail",
+                """
+                CREATE TABLE trips_rail AS
+                SELECT t.*
+                FROM trips t
+                JOIN routes_rail r ON r.route_id = t.route_id
+                """,
+            ),
+            indexes=(
+                "CREATE INDEX IF NOT EXISTS idx_trips_rail_route ON trips_rail(route_id)",
+                "CREATE INDEX IF NOT EXISTS idx_trips_rail_service ON trips_rail(service_id)",
+                "CREATE INDEX IF NOT EXISTS idx_trips_rail_shape ON trips_rail(shape_id)",
+            ),
+        ),
+        RailStep(
+            name="stop_times_rail",
+            sources=("stop_times",),
+            depends_on=("trips_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS stop_times_rail",
+                """
+                CREATE TABLE stop_times_rail AS
+                SELECT
+                    st.*,
+                    -- 0-based position along the trip, the key trip patterns are joined on
+                    CAST(row_number() OVER (PARTITION BY st.trip_id ORDER BY st.stop_sequence) - 1 AS INTEGER)
+                        AS stop_pos
+                FROM stop_times st
+                JOIN trips_rail t ON t.trip_id = st.trip_id
+                """,
+            ),
+            indexes=(
+                "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_trip ON stop_times_rail(trip_id)",
+                "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_trip_pos ON stop_times_rail(trip_id, stop_pos)",
+                "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_stop_seq ON stop_times_rail(stop_id, stop_sequence)",
+                "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_departure ON stop_times_rail(departure_time)",
+            ),
+        ),
+        RailStep(
+            name="shapes_rail",
+            sources=("shapes",),
+            depends_on=("trips_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS shapes_rail",
+                """
+                CREATE TABLE shapes_rail AS
+                SELECT s.*
+                FROM shapes s
+                WHERE EXISTS (
+                    SELECT 1 FROM trips_rail t WHERE t.shape_id = s.shape_id
+                )
+                """,
+            ),
+            indexes=("CREATE INDEX IF NOT EXISTS idx_shapes_rail_seq ON shapes_rail(shape_id, shape_pt_sequence)",),
+        ),
+        # Simplified encoded polylines per shape and tolerance (see app.shape_geometry)
+        RailStep(
+            name="shape_geometries_rail",
+            sources=(),
+            depends_on=("shapes_rail",),
+            statements=("DROP TABLE IF EXISTS shape_geometries_rail", SHAPE_GEOMETRIES_DDL),
+            build=build_shape_geometries,
+            indexes=(
+                "CREATE INDEX IF NOT EXISTS idx_shape_geometries_rail_shape "
+                "ON shape_geometries_rail(shape_id, tolerance_m)",
+            ),
+        ),
+        RailStep(
+            name="stops_rail",
+            sources=("stops",),
+            depends_on=("stop_times_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS stops_rail",
+                """
+                CREATE TABLE stops_rail AS
+                SELECT DISTINCT s.*
+                FROM stops s
+                JOIN stop_times_rail st ON st.stop_id = s.stop_id
+                """,
+            ),
+        ),
+        RailStep(
+            name="transfers_rail",
+            sources=("transfers",),
+            depends_on=("stop_times_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS transfers_rail",
+                """
+                CREATE TABLE transfers_rail AS
+                SELECT tr.*
+                FROM transfers tr
+                WHERE tr.from_stop_id IN (SELECT DISTINCT stop_id FROM stop_times_rail)
+                  AND tr.to_stop_id   IN (SELECT DISTINCT stop_id FROM stop_times_rail)
+                """,
+            ),
+        ),
+        # Trip patterns: trips with the same ordered stop sequence share a pattern_id.
+        # Each trip's times are kept as arrays indexed by stop_pos (1-based in SQL), so
+        # point-to-point queries read one row per trip instead of scanning stop_times_rail.
+        RailStep(
+            name="trip_patterns_rail",
+            sources=(),
+            depends_on=("stop_times_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS trip_patterns_rail",
+                """
+                CREATE TABLE trip_patterns_rail AS
+                WITH sequences AS (
+                    SELECT
+                        trip_id,
+                        string_agg(stop_id, chr(31) ORDER BY stop_pos) AS stops,
+                        array_agg(departure_time ORDER BY stop_pos) AS departure_times,
+                        array_agg(arrival_time ORDER BY stop_pos) AS arrival_times
+                    FROM stop_times_rail
+                    GROUP BY trip_id
+                ),
+                patterns AS (
+                    SELECT stops, CAST(row_number() OVER (ORDER BY stops) - 1 AS INTEGER) AS pattern_id
+                    FROM (SELECT DISTINCT stops FROM sequences) distinct_sequences
+                )
+                SELECT s.trip_id, p.pattern_id, s.departure_times, s.arrival_times
+                FROM sequences s
+                JOIN patterns p ON p.stops = s.stops
+                ORDER BY p.pattern_id, s.departure_times[1], s.trip_id
+                """,
+            ),
+            indexes=("CREATE INDEX IF NOT EXISTS idx_trip_patterns_rail_trip ON trip_patterns_rail(trip_id)",),
+            duckdb_only=True,
+        ),
+        RailStep(
+            name="pattern_stops_rail",
+            sources=(),
+            depends_on=("trip_patterns_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS pattern_stops_rail",
+                """
+                CREATE TABLE pattern_stops_rail AS
+                SELECT tp.pattern_id, st.stop_pos, st.stop_id
+                FROM (SELECT pattern_id, min(trip_id) AS trip_id FROM trip_patterns_rail GROUP BY pattern_id) tp
+                JOIN stop_times_rail st ON st.trip_id = tp.trip_id
+                ORDER BY tp.pattern_id, st.stop_pos
+                """,
+            ),
+        ),
+        # Compact trip times: shared offset profiles per pattern, start time per trip (see app.trip_times)
+        RailStep(
+            name="time_profiles_rail",
+            sources=(),
+            depends_on=("trip_patterns_rail",),
+            statements=("DROP TABLE IF EXISTS time_profiles_rail", TIME_PROFILES_SQL),
+            duckdb_only=True,
+        ),
+        RailStep(
+            name="trip_times_rail",
+            sources=(),
+            depends_on=("time_profiles_rail",),
+            statements=("DROP TABLE IF EXISTS trip_times_rail", TRIP_TIMES_SQL),
+            duckdb_only=True,
+        ),
+        # Every (origin, destination) pair each pattern serves, in travel order
+        RailStep(
+            name="pattern_od_rail",
+            sources=(),
+            depends_on=("pattern_stops_rail",),
+            statements=(
+                "DROP TABLE IF EXISTS pattern_od_rail",
+                """
+                CREATE TABLE pattern_od_rail AS
+                SELECT
+                    o.stop_id AS origin_id,
+                    d.stop_id AS dest_id,
+                    o.pattern_id,
+                    o.stop_pos AS origin_pos,
+                    d.stop_pos AS dest_pos
+                FROM pattern_stops_rail o
+                JOIN pattern_stops_rail d
+                  ON d.pattern_id = o.pattern_id
+                 AND d.stop_pos > o.stop_pos
+                ORDER BY o.stop_id, d.stop_id
+                """,
+            ),
+            indexes=("CREATE INDEX IF NOT EXISTS idx_pattern_od_rail_od ON pattern_od_rail(origin_id, dest_id)",),
+        ),
+        # Rail stop -> station it belongs to (see app.stop_index)
+        RailStep(
+            name="station_stops_rail",
+            sources=("stops", "stop_areas", "areas"),
+            depends_on=("stops_rail",),
+            statements=("DROP TABLE IF EXISTS station_stops_rail", STATION_STOPS_DDL),
+            build=build_station_stops,
+            indexes=(
+                "CREATE INDEX IF NOT EXISTS idx_station_stops_rail_station ON station_stops_rail(station_id)",
+                "CREATE INDEX IF NOT EXISTS idx_station_stops_rail_stop ON station_stops_rail(stop_id)",
+            ),
+        ),
+        # Per-service day bitmaps for the rail services (see app.service_calendar)
+        RailStep(
+            name="service_calendar",
+            sources=("calendar", "calendar_dates"),
+            depends_on=("trips_rail",),
+            statements=("DROP TABLE IF EXISTS service_calendar", SERVICE_CALENDAR_DDL),
+            build=build_service_calendar,
+        ),
+        # The same days as joinable (service_date, service_id) rows
+        RailStep(
+            name="service_dates",
+            sources=("calendar", "calendar_dates"),
+            depends_on=("service_calendar",),
+            statements=("DROP TABLE IF EXISTS service_dates", SERVICE_DATES_DDL),
+            build=build_service_dates,
+            indexes=("CREATE INDEX IF NOT EXISTS idx_service_dates_date ON service_dates(service_date, service_id)",),
+        ),
+        # Service frequency on a representative day per day type (see app.service_frequency)
+        RailStep(
+            name="frequency_days_rail",
+            sources=(),
+            depends_on=("service_dates",),
+            statements=("DROP TABLE IF EXISTS frequency_days_rail", FREQUENCY_DAYS_SQL),
+            duckdb_only=True,
+        ),
+        RailStep(
+            name="station_frequency_rail",
+            sources=(),
+            depends_on=("frequency_days_rail", "pattern_stops_rail", "station_stops_rail"),
+            statements=("DROP TABLE IF EXISTS station_frequency_rail", STATION_FREQUENCY_SQL),
+            indexes=(
+                "CREATE INDEX IF NOT EXISTS idx_station_frequency_rail_station "
+                "ON station_frequency_rail(station_id, day_type)",
+            ),
+            duckdb_only=True,
+        ),
+        RailStep(
+            name="od_frequency_rail",
+            sources=(),
+            depends_on=("frequency_days_rail", "pattern_od_rail", "station_stops_rail"),
+            statements=("DROP TABLE IF EXISTS od_frequency_rail", OD_FREQUENCY_SQL),
+            indexes=(
+                "CREATE INDEX IF NOT EXISTS idx_od_frequency_rail_od "
+                "ON od_frequency_rail(origin_station_id, dest_station_id, day_type)",
+            ),
+            duckdb_only=True,
+        ),
         # Readability helper with agency names
-        "DROP VIEW IF EXISTS routes_rail_with_agency",
-        """
-        CREATE VIEW routes_rail_with_agency AS
-        SELECT r.*, a.agency_name, a.agency_url, a.agency_timezone
-        FROM routes_rail r
-        LEFT JOIN agency a ON a.agency_id = r.agency_id
-        """,
+        RailStep(
+            name="routes_rail_with_agency",
+            sources=("agency",),
+            depends_on=("routes_rail",),
+            statements=(
+                "DROP VIEW IF EXISTS routes_rail_with_agency",
+                """
+                CREATE VIEW routes_rail_with_agency AS
+                SELECT r.*, a.agency_name, a.agency_url, a.agency_timezone
+                FROM routes_rail r
+                LEFT JOIN agency a ON a.agency_id = r.agency_id
+                """,
+            ),
+            view=True,
+        ),
     ]
 
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_routes_rail_type ON routes_rail(route_type)",
-        "CREATE INDEX IF NOT EXISTS idx_routes_rail_agency ON routes_rail(agency_id)",
-        "CREATE INDEX IF NOT EXISTS idx_trips_rail_route ON trips_rail(route_id)",
-        "CREATE INDEX IF NOT EXISTS idx_trips_rail_service ON trips_rail(service_id)",
-        "CREATE INDEX IF NOT EXISTS idx_trips_rail_shape ON trips_rail(shape_id)",
-        "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_trip ON stop_times_rail(trip_id)",
-        "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_stop_seq ON stop_times_rail(stop_id, stop_sequence)",
-        "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_departure ON stop_times_rail(departure_time)",
-        "CREATE INDEX IF NOT EXISTS idx_shapes_rail_seq ON shapes_rail(shape_id, shape_pt_sequence)",
-    ]
 
-    with engine.begin() as conn:
-        for stmt in stmts:
+def run_rail_step(step: RailStep, bind: Optional[Engine] = None) -> List[StatementTiming]:
+    """Run one rail step, timing each statement and index build separately."""
+    bind = bind or engine
+    statement_timings = []
+    with bind.begin() as conn:
+        for stmt in step.statements:
+            started = time.perf_counter()
             conn.execute(text(stmt))
-        for idx in indexes:
+            statement_timings.append(
+                StatementTiming(step.name, "statement", statement_label(stmt), time.perf_counter() - started)
+            )
+        if step.build is not None:
+            started = time.perf_counter()
+            step.build(conn)
+            statement_timings.append(
+                StatementTiming(step.name, "build", f"build {step.name}", time.perf_counter() - started)
+            )
+        for idx in step.indexes:
+            started = time.perf_counter()
             conn.execute(text(idx))
+            statement_timings.append(
+                StatementTiming(step.name, "index", statement_label(idx), time.perf_counter() - started)
+            )
+    return statement_timings
+
+
+def rail_steps_for(bind: Engine) -> List[RailStep]:
+    """
+    The rail steps ``bind`` can run. Other databases than DuckDB get neither the
+    DuckDB-only steps nor the steps built on them; the queries reading those tables
+    fall back to ``stop_times_rail`` when they are missing.
+    """
+    steps = rail_steps()
+    if bind.dialect.name == "duckdb":
+        return steps
+    skipped = set()
+    # rail_steps() lists every step after the steps it depends on
+    for step in steps:
+        if step.duckdb_only or skipped.intersection(step.depends_on):
+            skipped.add(step.name)
+    logger.info("Leaving out DuckDB-only rail tables on %s: %s", bind.dialect.name, ", ".join(sorted(skipped)))
+    return [step for step in steps if step.name not in skipped]
+
+
+def rail_tasks(bind: Optional[Engine] = None, source_prefix: Optional[str] = None) -> List[Task]:
+    """
+    Scheduler tasks for the rail subset. With ``source_prefix`` each step also waits
+    for the load tasks of the raw tables it reads (``f"{source_prefix}{table}"``).
+    """
+    bind = bind or engine
+    tasks = []
+    for step in rail_steps_for(bind):
+        depends_on = [f"rail:{dep}" for dep in step.depends_on]
+        if source_prefix is not None:
+            depends_on += [f"{source_prefix}{src}" for src in step.sources]
+        tasks.append(
+            Task(
+                name=f"rail:{step.name}",
+                fn=lambda step=step: run_rail_step(step, bind),
+                depends_on=depends_on,
+            )
+        )
+    return tasks
+
+
+def materialize_rail_subset(bind: Optional[Engine] = None, max_workers: Optional[int] = None) -> RunTimings:
+    """
+    Create rail-only tables and indexes to slim the dataset for rail-focused queries.
+    """
+    whitelist = ",".join(str(x) for x in sorted(RAIL_ROUTE_TYPES))
+    logger.info("Creating rail-only tables with route_type in (%s)", whitelist)
+
+    timings = run_tasks(rail_tasks(bind), max_workers=max_workers or settings.ingest_workers)
 
     logger.info("Rail-only tables created.")
+    return timings
 
 
-def ingest(include_rail: bool = True):
-    Base.metadata.create_all(bind=engine)
+def load_feed(
+    sources: Dict[str, CsvSource],
+    bind: Optional[Engine] = None,
+    include_rail: bool = True,
+    max_workers: Optional[int] = None,
+) -> RunTimings:
+    """
+    Load GTFS files (table name -> path or zip member) and, optionally, build the rail
+    subset on top, as one dependency-aware task graph.
+    """
+    bind = bind or engine
+    tasks = [
+        Task(
+            name=f"load:{table}",
+            fn=lambda source=source, table=table: load_csv_to_table(source, table, bind=bind),
+            # Start the biggest files first so they do not queue behind small tables
+            weight=source_size(source),
+        )
+        for table, source in sources.items()
+    ]
+    if include_rail:
+        loaded = {task.name for task in tasks}
+        for task in rail_tasks(bind=bind, source_prefix="load:"):
+            # A file missing from the feed leaves its table as-is (e.g. from Base.metadata)
+            task.depends_on = [dep for dep in task.depends_on if dep.startswith("rail:") or dep in loaded]
+            tasks.append(task)
+
+    workers = max_workers or settings.ingest_workers
+    logger.info("Running %d ingest stages with %d workers", len(tasks), workers)
+    return run_tasks(tasks, max_workers=workers)
+
+
+def record_feed_version(bind: Engine, version: str, download: FeedDownload) -> None:
+    """Stamp the database with the feed version it holds."""
+    with bind.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS feed_version"))
+        conn.execute(
+            text(
+                """
+                CREATE TABLE feed_version (
+                    version VARCHAR,
+                    created_at TIMESTAMP,
+                    source_sha256 VARCHAR,
+                    source_etag VARCHAR,
+                    source_last_modified VARCHAR
+                )
+                """
+            )
+        )
+        conn.execute(
+            text(
+                """
+                INSERT INTO feed_version
+                VALUES (:version, :created_at, :sha256, :etag, :last_modified)
+                """
+            ),
+            {
+                "version": version,
+                "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+                "sha256": download.sha256,
+                "etag": download.etag,
+                "last_modified": download.last_modified,
+            },
+        )
+
+
+def ingest(include_rail: bool = True, force: bool = False) -> bool:
+    """
+    Download and load the feed. Returns False when the feed is unchanged since the
+    last successful ingest and the reload was skipped (pass ``force`` to reload anyway).
 
+    On DuckDB the feed is built into a new version file and only activated once it
+    is complete; the previous version is kept for rollback (see ``app.feed_versions``).
+    """
     with tempfile.TemporaryDirectory() as tmpdir_str:
         tmpdir = Path(tmpdir_str)
         zip_path = tmpdir / "sweden.zip"
-        download_gtfs_zip(zip_path)
-        unzip_feed(zip_path, tmpdir)
-
-        load_csv_to_table(tmpdir / "agency.txt", "agency")
-        load_csv_to_table(tmpdir / "stops.txt", "stops")
-        load_csv_to_table(tmpdir / "routes.txt", "routes")
-        load_csv_to_table(tmpdir / "trips.txt", "trips")
-        load_csv_to_table(tmpdir / "stop_times.txt", "stop_times")
-        load_csv_to_table(tmpdir / "calendar.txt", "calendar")
-        load_csv_to_table(tmpdir / "calendar_dates.txt", "calendar_dates")
-        load_csv_to_table(tmpdir / "shapes.txt", "shapes")
-        load_csv_to_table(tmpdir / "stop_areas.txt", "stop_areas")
-        load_csv_to_table(tmpdir / "areas.txt", "areas")
-        load_csv_to_table(tmpdir / "transfers.txt", "transfers")
-
-    logger.info("GTFS Sweden 3 ingestion completed.")
-
-    if include_rail:
-        materialize_rail_subset()
+        download_started = time.perf_counter()
+        download = download_gtfs_zip(zip_path, previous_state=None if force else read_feed_state())
+        download_seconds = time.perf_counter() - download_started
+        if not download.changed:
+            logger.info("GTFS feed unchanged; skipping reload")
+            # Same content, possibly under new validators: keep them so the next fetch can be a 304
+            write_feed_state(download)
+            return False
+
+        store = feed_store()
+        version = new_version_id()
+        if store is not None:
+            target_path = store.version_path(version)
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            bind = create_engine(store.version_url(version), future=True)
+            logger.info("Building feed version %s in %s", version, target_path)
+        else:
+            logger.warning("DATABASE_URL is not a DuckDB file; reloading tables in place")
+            bind = engine
+
+        try:
+            Base.metadata.create_all(bind=bind)
+            archive = FeedArchive(zip_path)
+            sources = {}
+            for table in GTFS_FILES:
+                member = archive.member(f"{table}.txt")
+                if member is None:
+                    logger.warning("File %s.txt not found in archive; skipping", table)
+                    continue
+                sources[table] = member
+
+            with RssMonitor() as rss:
+                timings = load_feed(sources, bind, include_rail=include_rail)
+            record_feed_version(bind, version, download)
+            report = build_report(
+                timings,
+                sources,
+                rss,
+                feed_version=version,
+                loader=_resolve_loader(bind, None),
+                workers=settings.ingest_workers,
+                source={**download.state(), "download_seconds": round(download_seconds, 3)},
+            )
+        except Exception:
+            if store is not None:
+                bind.dispose()
+                store.remove(version)
+            raise
+
+    logger.info("GTFS Sweden 3 ingestion completed.\n%s", report.summary())
+    logger.info("Ingest report written to %s", write_report(report))
+
+    if store is not None:
+        # Close the writer so the file is checkpointed before the API opens it read-only
+        bind.dispose()
+        store.activate(version)
+        store.prune(keep=settings.feed_versions_keep)
+    else:
+        # Same engine, new data: cached answers from this process are stale
+        invalidate_result_cache()
+
+    write_feed_state(download)
+    return True
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest the GTFS Sweden 3 static feed")
+    parser.add_argument("--force", action="store_true", help="Reload even if the feed has not changed")
+    args = parser.parse_args()
+
     logging.basicConfig(level=settings.log_level)
-    ingest()
+    ingest(force=args.force)
 
@@ -0,0 +1,327 @@
+"""
+Structured ingest run reports.
+
+Every successful ``ingest()`` writes ``$GTFS_DATA_DIR/ingest_reports/ingest-<version>.json``
+with per-table rows, bytes read, rows/s and peak RSS, the timing of every stage, and
+of each rail-subset statement and index build. The schema is versioned so reports
+from successive runs can be diffed:
+
+    python -m app.ingestion.report                          # latest run vs the one before
+    python -m app.ingestion.report NEW.json --against OLD.json
+
+Peak RSS is process-wide (stages run concurrently and DuckDB shares one heap), so a
+stage's figure is the highest resident set sampled while that stage was running.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from ..config import get_settings
+from .feed_archive import CsvSource, source_size
+from .scheduler import RunTimings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+REPORT_SCHEMA_VERSION = 1
+REPORTS_DIR = "ingest_reports"
+RSS_SAMPLE_INTERVAL = 0.2
+SLOWEST_STATEMENTS = 10
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size now; the process peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssMonitor:
+    """Samples the resident set size on a background thread while the block runs."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: List[Tuple[float, int]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+
+    def _sample(self) -> None:
+        rss = current_rss_bytes()
+        if rss is not None:
+            self.samples.append((time.perf_counter(), rss))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "RssMonitor":
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def peak(self, start: Optional[float] = None, end: Optional[float] = None) -> Optional[int]:
+        """Highest sample in [start, end] (perf_counter times), else the last sample before ``start``."""
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        inside = [rss for at, rss in self.samples if start <= at <= end]
+        if inside:
+            return max(inside)
+        before = [rss for at, rss in self.samples if at < start]
+        return before[-1] if before else None
+
+
+@dataclass(frozen=True)
+class StatementTiming:
+    """One SQL statement of a rail step."""
+
+    step: str
+    # "statement", "build" or "index"
+    kind: str
+    label: str
+    seconds: float
+
+
+def statement_label(stmt: str) -> str:
+    """Short, stable name for a statement: ``CREATE TABLE trips_rail AS``, ``CREATE INDEX ... ON ...``."""
+    return " ".join(stmt.split()).split(" SELECT ", 1)[0][:100]
+
+
+@dataclass
+class TableReport:
+    table: str
+    rows: int
+    bytes_read: int
+    seconds: float
+    rows_per_second: float
+    peak_rss_bytes: Optional[int]
+
+
+@dataclass
+class StageReport:
+    name: str
+    # Seconds since the run started
+    started: float
+    seconds: float
+    peak_rss_bytes: Optional[int]
+
+
+@dataclass
+class IngestReport:
+    feed_version: str
+    loader: str
+    workers: int
+    wall_seconds: float
+    peak_rss_bytes: Optional[int]
+    source: Dict[str, object]
+    tables: List[TableReport]
+    stages: List[StageReport]
+    statements: List[StatementTiming]
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    environment: Dict[str, str] = field(default_factory=dict)
+    schema_version: int = REPORT_SCHEMA_VERSION
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return format_report(self.to_dict())
+
+
+def _environment() -> Dict[str, str]:
+    env = {"python": platform.python_version(), "platform": platform.platform()}
+    for module in ("duckdb", "sqlalchemy", "pandas"):
+        try:
+            env[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return env
+
+
+def build_report(
+    timings: RunTimings,
+    sources: Dict[str, CsvSource],
+    rss: RssMonitor,
+    feed_version: str,
+    loader: str,
+    workers: int,
+    source: Optional[Dict[str, object]] = None,
+) -> IngestReport:
+    """Assemble the report for a ``load_feed`` run (load tasks ``load:<table>``, rail tasks ``rail:<step>``)."""
+    stages, tables, statements = [], [], []
+    for timing in sorted(timings.tasks.values(), key=lambda t: t.started):
+        started = timings.origin + timing.started
+        peak = rss.peak(started, started + timing.seconds)
+        stages.append(StageReport(timing.name, round(timing.started, 3), round(timing.seconds, 3), peak))
+
+        kind, _, name = timing.name.partition(":")
+        if kind == "load" and name in sources:
+            rows = int(timing.result or 0)
+            tables.append(
+                TableReport(
+                    table=name,
+                    rows=rows,
+                    bytes_read=source_size(sources[name]),
+                    seconds=round(timing.seconds, 3),
+                    rows_per_second=round(rows / timing.seconds, 1) if timing.seconds > 0 else 0.0,
+                    peak_rss_bytes=peak,
+                )
+            )
+        elif kind == "rail" and timing.result:
+            statements.extend(
+                StatementTiming(s.step, s.kind, s.label, round(s.seconds, 3)) for s in timing.result
+            )
+
+    return IngestReport(
+        feed_version=feed_version,
+        loader=loader,
+        workers=workers,
+        wall_seconds=round(timings.wall_seconds, 3),
+        peak_rss_bytes=max(filter(None, [rss.peak(), peak_rss_bytes()]), default=None),
+        source=dict(source or {}),
+        tables=tables,
+        stages=stages,
+        statements=statements,
+        environment=_environment(),
+    )
+
+
+def reports_dir() -> Path:
+    return Path(settings.gtfs_data_dir) / REPORTS_DIR
+
+
+def write_report(report: IngestReport, out_dir: Optional[Path] = None) -> Path:
+    out_dir = Path(out_dir or reports_dir())
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"ingest-{report.feed_version}.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(report.to_dict(), indent=2))
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_reports(out_dir: Optional[Path] = None) -> List[Path]:
+    """Report files, oldest first (version ids sort chronologically)."""
+    out_dir = Path(out_dir or reports_dir())
+    return sorted(out_dir.glob("ingest-*.json")) if out_dir.exists() else []
+
+
+def _mb(value: Optional[int]) -> str:
+    return f"{value / 1e6:.0f}" if value else "-"
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Ingest of feed version {report['feed_version']}: wall {report['wall_seconds']:.2f}s, "
+        f"peak RSS {_mb(report['peak_rss_bytes'])} MB, {report['loader']} loader, {report['workers']} workers",
+        f"{'table':<18}{'rows':>12}{'MB read':>10}{'seconds':>10}{'rows/s':>14}{'peak RSS MB':>13}",
+    ]
+    for t in report["tables"]:
+        lines.append(
+            f"{t['table']:<18}{t['rows']:>12}{t['bytes_read'] / 1e6:>10.1f}{t['seconds']:>10.2f}"
+            f"{t['rows_per_second']:>14,.0f}{_mb(t['peak_rss_bytes']):>13}"
+        )
+    lines.append(f"{'stage':<32}{'start':>9}{'seconds':>10}{'peak RSS MB':>13}")
+    for s in report["stages"]:
+        lines.append(f"{s['name']:<32}{s['started']:>9.2f}{s['seconds']:>10.2f}{_mb(s['peak_rss_bytes']):>13}")
+    slowest = sorted(report["statements"], key=lambda s: s["seconds"], reverse=True)[:SLOWEST_STATEMENTS]
+    if slowest:
+        lines.append("slowest rail statements:")
+        lines.extend(f"{s['seconds']:>9.2f}s  {s['step']:<24}{_display_label(s['label'])}" for s in slowest)
+    return "\n".join(lines)
+
+
+def _pct(old: float, new: float) -> str:
+    return f"{100.0 * (new - old) / old:+.1f}%" if old else "n/a"
+
+
+def _display_label(label: str) -> str:
+    return label.replace(" IF NOT EXISTS", "").replace(" IF EXISTS", "")
+
+
+def compare_reports(old: dict, new: dict) -> str:
+    """Side-by-side of two reports: wall time, per-table throughput and per-statement time."""
+    width = 64
+
+    def row(name: str, before: str, after: str, change: str) -> str:
+        return f"{name[: width - 1]:<{width}}{before:>10}{after:>10}{change:>10}"
+
+    lines = [
+        row(f"{old['feed_version']} -> {new['feed_version']}", "old", "new", "change"),
+        row("wall seconds", f"{old['wall_seconds']:.2f}", f"{new['wall_seconds']:.2f}",
+            _pct(old['wall_seconds'], new['wall_seconds'])),
+        row("peak RSS MB", _mb(old["peak_rss_bytes"]), _mb(new["peak_rss_bytes"]),
+            _pct(old["peak_rss_bytes"] or 0, new["peak_rss_bytes"] or 0)),
+    ]
+    old_tables = {t["table"]: t for t in old["tables"]}
+    for t in new["tables"]:
+        before = old_tables.get(t["table"])
+        if before:
+            lines.append(
+                row(f"{t['table']} rows/s", f"{before['rows_per_second']:,.0f}", f"{t['rows_per_second']:,.0f}",
+                    _pct(before["rows_per_second"], t["rows_per_second"]))
+            )
+    old_statements = {(s["step"], s["label"]): s for s in old["statements"]}
+    for s in new["statements"]:
+        before = old_statements.get((s["step"], s["label"]))
+        if before:
+            lines.append(
+                row(_display_label(s["label"]), f"{before['seconds']:.2f}", f"{s['seconds']:.2f}",
+                    _pct(before["seconds"], s["seconds"]))
+            )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show or compare ingest run reports")
+    parser.add_argument("report", nargs="?", type=Path, help="Report JSON (default: the latest run)")
+    parser.add_argument("--against", type=Path, help="Older report to compare with (default: the run before)")
+    args = parser.parse_args()
+
+    reports = [path.resolve() for path in list_reports()]
+    new_path = args.report.resolve() if args.report else (reports[-1] if reports else None)
+    if new_path is None:
+        parser.error(f"No reports in {reports_dir()}")
+    new = json.loads(new_path.read_text())
+    old_path = args.against
+    if old_path is None and new_path in reports and reports.index(new_path) > 0:
+        old_path = reports[reports.index(new_path) - 1]
+
+    print(format_report(new))
+    if old_path is not None:
+        print()
+        print(compare_reports(json.loads(old_path.read_text()), new))
+
+
+if __name__ == "__main__":
+    main()
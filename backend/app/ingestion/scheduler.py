@@ -0,0 +1,120 @@
+"""
+Dependency-aware task runner for the ingestion pipeline.
+
+Tasks whose dependencies have finished are submitted to a thread pool, heaviest
+first, so large files (stop_times, shapes) start immediately instead of queueing
+behind the small tables.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Task:
+    name: str
+    fn: Callable[[], Any]
+    depends_on: Sequence[str] = ()
+    # Scheduling hint: among ready tasks, higher weight is submitted first
+    weight: float = 0.0
+
+
+@dataclass
+class TaskTiming:
+    name: str
+    started: float  # seconds since the run started
+    seconds: float
+    result: Any = None
+
+
+@dataclass
+class RunTimings:
+    wall_seconds: float = 0.0
+    # time.perf_counter() when the run started; task ``started`` offsets are relative to it
+    origin: float = 0.0
+    tasks: Dict[str, TaskTiming] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<32}{'start':>9}{'seconds':>10}"]
+        for timing in sorted(self.tasks.values(), key=lambda t: t.started):
+            lines.append(f"{timing.name:<32}{timing.started:>9.2f}{timing.seconds:>10.2f}")
+        busy = sum(t.seconds for t in self.tasks.values())
+        lines.append(f"wall {self.wall_seconds:.2f}s, summed stage time {busy:.2f}s")
+        return "\n".join(lines)
+
+
+def _validate(tasks: Sequence[Task]) -> None:
+    names = {task.name for task in tasks}
+    if len(names) != len(tasks):
+        raise ValueError("Duplicate task names")
+    for task in tasks:
+        missing = set(task.depends_on) - names
+        if missing:
+            raise ValueError(f"Task {task.name} depends on unknown tasks: {sorted(missing)}")
+
+
+def run_tasks(tasks: Sequence[Task], max_workers: int = 1) -> RunTimings:
+    """
+    Run ``tasks`` respecting ``depends_on``, at most ``max_workers`` at a time.
+
+    The first failure stops scheduling new tasks; in-flight tasks are awaited and the
+    exception is re-raised.
+    """
+    _validate(tasks)
+    pending: Dict[str, Task] = {task.name: task for task in tasks}
+    done: set = set()
+    running: Dict[Future, str] = {}
+    run_started = time.perf_counter()
+    timings = RunTimings(origin=run_started)
+
+    def timed(task: Task) -> TaskTiming:
+        started = time.perf_counter()
+        result = task.fn()
+        return TaskTiming(
+            name=task.name,
+            started=started - run_started,
+            seconds=time.perf_counter() - started,
+            result=result,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest") as pool:
+        error = None
+        while pending or running:
+            if error is None:
+                ready: List[Task] = sorted(
+                    (t for t in pending.values() if set(t.depends_on) <= done),
+                    key=lambda t: t.weight,
+                    reverse=True,
+                )
+                for task in ready[: max(1, max_workers) - len(running)]:
+                    del pending[task.name]
+                    running[pool.submit(timed, task)] = task.name
+
+            if not running:
+                if error is not None:
+                    break
+                raise RuntimeError(f"Dependency cycle among tasks: {sorted(pending)}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    timing = future.result()
+                except Exception as exc:  # noqa: BLE001 - re-raised once in-flight work drains
+                    logger.error("Ingest stage %s failed: %s", name, exc)
+                    error = error or exc
+                    continue
+                timings.tasks[name] = timing
+                done.add(name)
+                logger.info("Stage %s finished in %.2fs", name, timing.seconds)
+
+        if error is not None:
+            raise error
+
+    timings.wall_seconds = time.perf_counter() - run_started
+    return timings
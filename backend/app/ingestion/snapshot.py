@@ -0,0 +1,177 @@
+"""
+Parquet snapshots of the serving tables for fast replica startup.
+
+Build once with a full ``ingest()``, export the rail subset (plus the small tables
+the query layer joins against) as a versioned directory of Parquet files, then let
+each API node import it into a fresh feed version in seconds:
+
+    python -m app.ingestion.snapshot export /shared/snapshots
+    python -m app.ingestion.snapshot import /shared/snapshots/20261018T031500000000Z
+
+A snapshot directory holds one ``<table>.parquet`` per table and ``manifest.json``
+with row counts, column types, the index DDL and the view definitions.
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+
+from ..config import get_settings
+from ..db import engine, get_engine
+from ..feed_versions import feed_store, new_version_id
+from .gtfs_loader import rail_steps
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Raw tables the rail queries still read (agency names, service calendar) and the version stamp
+SUPPORT_TABLES = ["agency", "calendar", "calendar_dates", "feed_version"]
+
+
+def snapshot_tables() -> List[str]:
+    return [step.name for step in rail_steps() if not step.view] + SUPPORT_TABLES
+
+
+def _sql_path(path: Path) -> str:
+    return str(path).replace("'", "''")
+
+
+def _feed_version(conn) -> Optional[str]:
+    if not inspect(conn).has_table("feed_version"):
+        return None
+    return conn.execute(text("SELECT version FROM feed_version LIMIT 1")).scalar()
+
+
+def export_snapshot(out_dir: Path, bind: Optional[Engine] = None) -> Path:
+    """Write the serving tables of ``bind`` (default: the active feed) to ``out_dir/<version>``."""
+    bind = bind or get_engine()
+    with bind.connect() as conn:
+        version = _feed_version(conn) or new_version_id()
+        snapshot_dir = Path(out_dir) / version
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+        tables = {}
+        for table in snapshot_tables():
+            if not inspect(conn).has_table(table):
+                logger.warning("Table %s not found; leaving it out of the snapshot", table)
+                continue
+            file_name = f"{table}.parquet"
+            conn.execute(
+                text(
+                    f"COPY (SELECT * FROM {table}) TO '{_sql_path(snapshot_dir / file_name)}' "
+                    "(FORMAT PARQUET, COMPRESSION ZSTD)"
+                )
+            )
+            tables[table] = {
+                "file": file_name,
+                "rows": conn.execute(text(f"SELECT count(*) FROM {table}")).scalar_one(),
+                "columns": [[row[0], row[1]] for row in conn.execute(text(f"DESCRIBE {table}"))],
+            }
+            logger.info("Exported %s (%d rows)", table, tables[table]["rows"])
+
+    steps = rail_steps()
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "feed_version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tables": tables,
+        "indexes": [idx for step in steps if step.name in tables for idx in step.indexes],
+        "views": [stmt for step in steps if step.view for stmt in step.statements],
+    }
+    (snapshot_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    logger.info("Snapshot %s written to %s", version, snapshot_dir)
+    return snapshot_dir
+
+
+def read_manifest(snapshot_dir: Path) -> dict:
+    manifest = json.loads((Path(snapshot_dir) / MANIFEST_FILE).read_text())
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')}")
+    return manifest
+
+
+def load_snapshot(snapshot_dir: Path, bind: Engine) -> dict:
+    """Create the snapshot's tables, indexes and views in ``bind``."""
+    snapshot_dir = Path(snapshot_dir)
+    manifest = read_manifest(snapshot_dir)
+    with bind.begin() as conn:
+        for table, meta in manifest["tables"].items():
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            conn.execute(
+                text(
+                    f"CREATE TABLE {table} AS "
+                    f"SELECT * FROM read_parquet('{_sql_path(snapshot_dir / meta['file'])}')"
+                )
+            )
+            rows = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar_one()
+            if rows != meta["rows"]:
+                raise ValueError(f"Snapshot table {table} has {rows} rows, manifest says {meta['rows']}")
+        for idx in manifest["indexes"]:
+            conn.execute(text(idx))
+        for stmt in manifest["views"]:
+            conn.execute(text(stmt))
+    return manifest
+
+
+def import_snapshot(snapshot_dir: Path, activate: bool = True) -> str:
+    """
+    Build a serving database from a snapshot. On DuckDB this creates the snapshot's
+    feed version file and (by default) activates it; otherwise tables load in place.
+    """
+    manifest = read_manifest(snapshot_dir)
+    version = manifest["feed_version"]
+    store = feed_store()
+    if store is None:
+        logger.warning("DATABASE_URL is not a DuckDB file; importing snapshot in place")
+        load_snapshot(snapshot_dir, engine)
+        return version
+
+    target_path = store.version_path(version)
+    if target_path.exists():
+        logger.info("Feed version %s already present; not rebuilding it", version)
+    else:
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        bind = create_engine(store.version_url(version), future=True)
+        try:
+            load_snapshot(snapshot_dir, bind)
+        except Exception:
+            bind.dispose()
+            target_path.unlink(missing_ok=True)
+            raise
+        bind.dispose()
+        logger.info("Imported snapshot %s into %s", version, target_path)
+
+    if activate:
+        store.activate(version)
+        store.prune(keep=settings.feed_versions_keep)
+    return version
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import Parquet snapshots of the rail subset")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_cmd = sub.add_parser("export", help="Write the active feed to OUT_DIR/<feed version>")
+    export_cmd.add_argument("out_dir", type=Path)
+    import_cmd = sub.add_parser("import", help="Build and activate a feed version from a snapshot directory")
+    import_cmd.add_argument("snapshot_dir", type=Path)
+    import_cmd.add_argument("--no-activate", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.log_level)
+    if args.command == "export":
+        print(export_snapshot(args.out_dir))
+    else:
+        print(import_snapshot(args.snapshot_dir, activate=not args.no_activate))
+
+
+if __name__ == "__main__":
+    main()
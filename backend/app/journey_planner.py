@@ -0,0 +1,394 @@
+"""
+Multi-leg rail journey planner (RAPTOR over trip patterns).
+
+Round ``k`` finds the earliest arrival at every stop using ``k`` trains. Each round
+boards, at every stop improved by the previous round, the earliest running trip of
+each pattern (trips sharing one stop sequence) calling there, rides it to every
+later stop, and then walks the transfers out of the stops it improved. The result
+is the Pareto set of (arrival time, number of changes): a journey with more
+changes is only returned when it arrives earlier.
+
+Everything is vectorized with NumPy on top of ``app.timetable``. Per-pattern stop
+columns of departures are concatenated into one sorted key array
+(``column * KEY_SPAN + departure``), so finding the next trip for every boarding
+candidate of a round is a single ``searchsorted``.
+
+``reachable`` runs the same rounds without a destination, pruned by an arrival
+deadline instead, for the earliest arrival at every stop in one sweep.
+
+Changes use ``transfers_rail`` (min_transfer_time; transfer_type 1 is a timed,
+zero-minute change and 3 forbids it). Platforms of the same station and the same
+platform get ``DEFAULT_TRANSFER_SECONDS`` unless the feed says otherwise. Only trips
+of the travel date's service day are used, so journeys continuing on trips of the
+next service day are not found.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .db import engine_cached
+from .timetable import NO_TIME, Timetable, _slices, shared_timetable
+
+JOURNEY_PLANNER_KEY = "journey_planner"
+DEFAULT_TRANSFER_SECONDS = 180
+MAX_TRANSFERS = 4
+# Larger than any GTFS time in seconds (times run past 24:00 for overnight trips)
+KEY_SPAN = 1 << 20
+UNREACHED = np.iinfo(np.int64).max
+
+
+@dataclass(frozen=True)
+class Leg:
+    trip_id: str
+    route_id: str
+    route_short_name: Optional[str]
+    agency_name: Optional[str]
+    from_stop_id: str
+    from_stop_name: str
+    to_stop_id: str
+    to_stop_name: str
+    departure: int
+    arrival: int
+
+
+@dataclass(frozen=True)
+class Journey:
+    legs: Tuple[Leg, ...]
+
+    @property
+    def departure(self) -> int:
+        return self.legs[0].departure
+
+    @property
+    def arrival(self) -> int:
+        return self.legs[-1].arrival
+
+    @property
+    def transfers(self) -> int:
+        return len(self.legs) - 1
+
+
+def _first_per_key(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Indices of the smallest ``values`` for each distinct ``keys`` (ties: first); values are >= 0."""
+    span = int(values.max()) + 1 if len(values) else 1
+    # In int64: int32 trip codes times a national row count overflow int32
+    order = np.argsort(keys.astype(np.int64) * span + values, kind="stable")
+    sorted_keys = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return order[first]
+
+
+class JourneyPlanner:
+    """Earliest-arrival journeys with up to ``MAX_TRANSFERS`` changes."""
+
+    def __init__(
+        self,
+        timetable: Timetable,
+        transfers: Iterable[Tuple[str, str, Optional[int], Optional[int]]] = (),
+        stations: Optional[Dict[str, Sequence[str]]] = None,
+    ):
+        """
+        ``transfers``: (from_stop_id, to_stop_id, transfer_type, min_transfer_time)
+        rows; ``stations``: station_id -> member stop_ids, for in-station changes.
+        """
+        tt = self.timetable = timetable
+        n_trips, n_rows = len(tt.trip_ids), len(tt)
+
+        # Trips with identical stop sequences share a pattern
+        patterns: Dict[bytes, int] = {}
+        trip_pattern = np.empty(n_trips, dtype=np.int64)
+        pattern_lengths: List[int] = []
+        for trip in range(n_trips):
+            stops = tt.st_stop[tt.trip_ptr[trip] : tt.trip_ptr[trip + 1]]
+            pattern = patterns.setdefault(stops.tobytes(), len(patterns))
+            if pattern == len(pattern_lengths):
+                pattern_lengths.append(len(stops))
+            trip_pattern[trip] = pattern
+        lengths = np.array(pattern_lengths, dtype=np.int64)
+        pattern_offset = np.concatenate(([0], np.cumsum(lengths)))
+
+        # Column = (pattern, position); every stop_times row belongs to one
+        trip_lengths = np.diff(tt.trip_ptr)
+        row_pos = np.arange(n_rows, dtype=np.int64) - np.repeat(tt.trip_ptr[:-1], trip_lengths)
+        row_col = pattern_offset[trip_pattern[tt.st_trip]] + row_pos
+        n_cols = int(pattern_offset[-1])
+
+        # Boarding entries sorted by (column, departure, trip)
+        order = np.lexsort((tt.st_trip, tt.st_departure, row_col))
+        self.entry_row = order.astype(np.int64)
+        self.entry_trip = tt.st_trip[order]
+        self.entry_key = row_col[order] * KEY_SPAN + tt.st_departure[order]
+        self.col_ptr = np.zeros(n_cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_col, minlength=n_cols), out=self.col_ptr[1:])
+
+        col_stop = np.zeros(n_cols, dtype=np.int64)
+        col_stop[row_col] = tt.st_stop
+        self.col_stop = col_stop
+        # A pattern's last stop is never a boarding point
+        col_pos = np.arange(n_cols, dtype=np.int64) - np.repeat(pattern_offset[:-1], lengths)
+        boardable = np.flatnonzero(col_pos < np.repeat(lengths, lengths) - 1)
+        by_stop = boardable[np.argsort(col_stop[boardable], kind="stable")]
+        self.stop_cols = by_stop
+        self.stop_col_ptr = np.zeros(len(tt.stop_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(col_stop[by_stop], minlength=len(tt.stop_ids)), out=self.stop_col_ptr[1:])
+
+        self._build_transfers(transfers, stations or {})
+        self.pattern_count = len(patterns)
+
+    def _build_transfers(
+        self,
+        transfers: Iterable[Tuple[str, str, Optional[int], Optional[int]]],
+        stations: Dict[str, Sequence[str]],
+    ) -> None:
+        codes = self.timetable.stop_codes
+        seconds: Dict[Tuple[int, int], int] = {}
+        for stop in range(len(codes)):
+            seconds[(stop, stop)] = DEFAULT_TRANSFER_SECONDS
+        for members in stations.values():
+            member_codes = [codes[s] for s in members if s in codes]
+            for a in member_codes:
+                for b in member_codes:
+                    seconds[(a, b)] = DEFAULT_TRANSFER_SECONDS
+        for from_id, to_id, transfer_type, min_time in transfers:
+            if from_id not in codes or to_id not in codes:
+                continue
+            pair = (codes[from_id], codes[to_id])
+            if transfer_type == 3:
+                seconds.pop(pair, None)
+            elif transfer_type == 1:
+                seconds[pair] = 0
+            elif min_time is not None:
+                seconds[pair] = int(min_time)
+        pairs = sorted(seconds.items())
+        from_stop = np.array([pair[0] for pair, _ in pairs], dtype=np.int64)
+        self.transfer_to = np.array([pair[1] for pair, _ in pairs], dtype=np.int64)
+        self.transfer_seconds = np.array([value for _, value in pairs], dtype=np.int64)
+        self.transfer_ptr = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(from_stop, minlength=len(codes)), out=self.transfer_ptr[1:])
+
+    def _board(self, stops: np.ndarray, ready: np.ndarray, trip_mask: Optional[np.ndarray]) -> np.ndarray:
+        """stop_times rows of the earliest running trip per pattern boardable at ``stops``."""
+        cols = self.stop_cols[_slices(self.stop_col_ptr[stops], self.stop_col_ptr[stops + 1])]
+        needles = cols * KEY_SPAN + ready[self.col_stop[cols]]
+        # Sorted needles let searchsorted narrow each search from the previous one
+        order = np.argsort(needles)
+        entry = np.empty(len(needles), dtype=np.int64)
+        entry[order] = np.searchsorted(self.entry_key, needles[order])
+        ends = self.col_ptr[cols + 1]
+        if trip_mask is not None:
+            # Step past trips that do not run on the date; most do, so this takes few passes
+            pending = np.flatnonzero(entry < ends)
+            while len(pending):
+                idle = ~trip_mask[self.entry_trip[entry[pending]]]
+                pending = pending[idle]
+                entry[pending] += 1
+                pending = pending[entry[pending] < ends[pending]]
+        boarded = entry < ends
+        rows = self.entry_row[entry[boarded]]
+        # One boarding per trip: the earliest stop on it reaches every later one
+        return rows[_first_per_key(self.timetable.st_trip[rows], rows)]
+
+    def plan(
+        self,
+        origin_ids: Sequence[str],
+        dest_ids: Sequence[str],
+        depart_after: int,
+        trip_mask: Optional[np.ndarray] = None,
+        max_transfers: int = MAX_TRANSFERS,
+    ) -> List[Journey]:
+        """Pareto-optimal journeys (fewer changes, or earlier arrival) leaving at/after ``depart_after``."""
+        tt = self.timetable
+        codes = tt.stop_codes
+        origins = np.array(sorted({codes[s] for s in origin_ids if s in codes}), dtype=np.int64)
+        dests = np.array(sorted({codes[s] for s in dest_ids if s in codes}), dtype=np.int64)
+        if not len(origins) or not len(dests) or np.intersect1d(origins, dests).size:
+            return []
+
+        n_stops = len(tt.stop_ids)
+        best = np.full(n_stops, UNREACHED, dtype=np.int64)
+        best_ready = np.full(n_stops, UNREACHED, dtype=np.int64)
+        ready = np.full(n_stops, UNREACHED, dtype=np.int64)
+        ready[origins] = depart_after
+        best_ready[origins] = depart_after
+        marked = origins
+        target = UNREACHED
+        # Per round: the row boarded/alighted to reach a stop, and the stop a change came from
+        rounds: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        ready_from = np.full(n_stops, -1, dtype=np.int64)
+        journeys: List[Journey] = []
+
+        for _ in range(max_transfers + 1):
+            board_rows = self._board(marked, ready, trip_mask)
+            ends = tt.trip_ptr[tt.st_trip[board_rows] + 1]
+            alight = _slices(board_rows + 1, ends)
+            boarded_at = np.repeat(board_rows, ends - board_rows - 1)
+            arrival = tt.st_arrival[alight].astype(np.int64)
+            stop = tt.st_stop[alight].astype(np.int64)
+            keep = (arrival != NO_TIME) & (arrival < best[stop]) & (arrival < target)
+            alight, boarded_at, arrival, stop = alight[keep], boarded_at[keep], arrival[keep], stop[keep]
+
+            round_board = np.full(n_stops, -1, dtype=np.int64)
+            round_alight = np.full(n_stops, -1, dtype=np.int64)
+            winners = _first_per_key(stop, arrival)
+            improved = stop[winners]
+            best[improved] = arrival[winners]
+            round_board[improved] = boarded_at[winners]
+            round_alight[improved] = alight[winners]
+            rounds.append((round_board, round_alight, ready_from))
+
+            reached = dests[round_alight[dests] >= 0]
+            if len(reached):
+                at = reached[np.argmin(best[reached])]
+                if best[at] < target:
+                    target = int(best[at])
+                    journeys.append(self._journey(rounds, int(at)))
+            if not len(improved):
+                break
+
+            # Changes out of the improved stops set the next round's boarding times
+            links = _slices(self.transfer_ptr[improved], self.transfer_ptr[improved + 1])
+            from_stop = np.repeat(improved, self.transfer_ptr[improved + 1] - self.transfer_ptr[improved])
+            to_stop = self.transfer_to[links]
+            at_time = best[from_stop] + self.transfer_seconds[links]
+            useful = (at_time < best_ready[to_stop]) & (at_time < target)
+            from_stop, to_stop, at_time = from_stop[useful], to_stop[useful], at_time[useful]
+            winners = _first_per_key(to_stop, at_time)
+            marked = to_stop[winners]
+            ready = np.full(n_stops, UNREACHED, dtype=np.int64)
+            ready[marked] = at_time[winners]
+            best_ready[marked] = at_time[winners]
+            ready_from = np.full(n_stops, -1, dtype=np.int64)
+            ready_from[marked] = from_stop[winners]
+            if not len(marked):
+                break
+        return journeys
+
+    def reachable(
+        self,
+        origin_ids: Sequence[str],
+        depart_after: int,
+        arrive_by: int,
+        trip_mask: Optional[np.ndarray] = None,
+        max_transfers: int = MAX_TRANSFERS,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Earliest arrival at every stop by ``arrive_by`` (``UNREACHED`` otherwise) and
+        the changes it takes, indexed by stop code: one run of rounds for all stops.
+        """
+        tt = self.timetable
+        codes = tt.stop_codes
+        n_stops = len(tt.stop_ids)
+        best = np.full(n_stops, UNREACHED, dtype=np.int64)
+        changes = np.full(n_stops, -1, dtype=np.int64)
+        best_ready = np.full(n_stops, UNREACHED, dtype=np.int64)
+        marked = np.array(sorted({codes[s] for s in origin_ids if s in codes}), dtype=np.int64)
+        ready = np.full(n_stops, UNREACHED, dtype=np.int64)
+        ready[marked] = depart_after
+        best_ready[marked] = depart_after
+
+        for round_number in range(max_transfers + 1):
+            if not len(marked):
+                break
+            board_rows = self._board(marked, ready, trip_mask)
+            ends = tt.trip_ptr[tt.st_trip[board_rows] + 1]
+            alight = _slices(board_rows + 1, ends)
+            arrival = tt.st_arrival[alight].astype(np.int64)
+            stop = tt.st_stop[alight].astype(np.int64)
+            keep = (arrival != NO_TIME) & (arrival <= arrive_by) & (arrival < best[stop])
+            arrival, stop = arrival[keep], stop[keep]
+            winners = _first_per_key(stop, arrival)
+            improved = stop[winners]
+            best[improved] = arrival[winners]
+            changes[improved] = round_number
+
+            links = _slices(self.transfer_ptr[improved], self.transfer_ptr[improved + 1])
+            from_stop = np.repeat(improved, self.transfer_ptr[improved + 1] - self.transfer_ptr[improved])
+            to_stop = self.transfer_to[links]
+            at_time = best[from_stop] + self.transfer_seconds[links]
+            useful = (at_time < best_ready[to_stop]) & (at_time <= arrive_by)
+            to_stop, at_time = to_stop[useful], at_time[useful]
+            winners = _first_per_key(to_stop, at_time)
+            marked = to_stop[winners]
+            ready = np.full(n_stops, UNREACHED, dtype=np.int64)
+            ready[marked] = at_time[winners]
+            best_ready[marked] = at_time[winners]
+        return best, changes
+
+    def next_journeys(
+        self,
+        origin_ids: Sequence[str],
+        dest_ids: Sequence[str],
+        depart_after: int,
+        trip_mask: Optional[np.ndarray] = None,
+        max_transfers: int = MAX_TRANSFERS,
+        limit: int = 3,
+    ) -> List[Journey]:
+        """Successive earliest-arrival journeys, each leaving after the previous one."""
+        journeys: List[Journey] = []
+        while len(journeys) < limit:
+            found = self.plan(origin_ids, dest_ids, depart_after, trip_mask, max_transfers)
+            if not found:
+                break
+            journey = found[-1]
+            if journeys and journey.arrival <= journeys[-1].arrival:
+                # Same arrival with a later start: the earlier departure only waited longer
+                journeys[-1] = journey
+            else:
+                journeys.append(journey)
+            depart_after = journey.departure + 60
+        return journeys
+
+    def _journey(self, rounds: List[Tuple[np.ndarray, np.ndarray, np.ndarray]], stop: int) -> Journey:
+        tt = self.timetable
+        legs = []
+        for round_board, round_alight, ready_from in reversed(rounds):
+            board, alight = int(round_board[stop]), int(round_alight[stop])
+            trip = int(tt.st_trip[board])
+            route = int(tt.trip_route[trip])
+            from_stop, to_stop = int(tt.st_stop[board]), int(tt.st_stop[alight])
+            legs.append(
+                Leg(
+                    trip_id=tt.trip_ids[trip],
+                    route_id=tt.route_ids[route],
+                    route_short_name=tt.route_short_names[route],
+                    agency_name=tt.agency_names[route],
+                    from_stop_id=tt.stop_ids[from_stop],
+                    from_stop_name=tt.stop_names[from_stop],
+                    to_stop_id=tt.stop_ids[to_stop],
+                    to_stop_name=tt.stop_names[to_stop],
+                    departure=int(tt.st_departure[board]),
+                    arrival=int(tt.st_arrival[alight]),
+                )
+            )
+            stop = int(ready_from[from_stop])
+            if stop < 0:
+                break
+        return Journey(tuple(reversed(legs)))
+
+
+def load_journey_planner(conn: Connection, timetable: Optional[Timetable]) -> Optional[JourneyPlanner]:
+    if timetable is None:
+        return None
+    tables = inspect(conn)
+    transfers = []
+    if tables.has_table("transfers_rail"):
+        transfers = conn.execute(
+            text("SELECT from_stop_id, to_stop_id, transfer_type, min_transfer_time FROM transfers_rail")
+        ).all()
+    stations: Dict[str, List[str]] = {}
+    if tables.has_table("station_stops_rail"):
+        for station_id, stop_id in conn.execute(text("SELECT station_id, stop_id FROM station_stops_rail")):
+            stations.setdefault(station_id, []).append(stop_id)
+    return JourneyPlanner(timetable, transfers, stations)
+
+
+def get_journey_planner(session: Session) -> Optional[JourneyPlanner]:
+    """The planner for the session's feed; None when the database has no rail subset."""
+    timetable = shared_timetable(session)
+    return engine_cached(session, JOURNEY_PLANNER_KEY, lambda conn: load_journey_planner(conn, timetable))
@@ -1,18 +1,66 @@
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
+from .db import SessionLocal
+from .journey_planner import get_journey_planner
 from .router_chat import router as chat_router
+from .router_departures import router as departures_router
 from .router_health import router as health_router
+from .router_stations import router as stations_router
+from .router_trips import router as trips_router
+from .service_calendar import get_service_calendar
+from .spatial_index import get_spatial_index
+from .stop_index import get_stop_index
+from .tool_executor import shutdown as shutdown_tool_executor
+from .timetable import get_timetable
+from .trip_times import get_trip_times
 
 settings = get_settings()
 
 logging.basicConfig(level=settings.log_level)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="GTFS Sweden Chat Backend", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_feed_indexes()
+    yield
+    shutdown_tool_executor()
+
+
+def warm_feed_indexes() -> None:
+    """Build the stop and spatial indexes, service calendar, journey planner and (if enabled) timetable up front."""
+    try:
+        with SessionLocal() as session:
+            logger.info("Stop index ready: %d stations", len(get_stop_index(session)))
+            logger.info("Spatial index ready: %d stations", len(get_spatial_index(session)))
+            get_service_calendar(session)
+            timetable = get_timetable(session)
+            if timetable is not None:
+                logger.info(
+                    "In-memory timetable ready: %d stop_times, %.1f MB", len(timetable), timetable.nbytes / 1e6
+                )
+            else:
+                trip_times = get_trip_times(session)
+                if trip_times is not None:
+                    logger.info(
+                        "Trip times ready: %d trips, %d time profiles, %.1f MB",
+                        len(trip_times),
+                        trip_times.profile_count,
+                        trip_times.nbytes / 1e6,
+                    )
+            planner = get_journey_planner(session)
+            if planner is not None:
+                logger.info("Journey planner ready: %d trip patterns", planner.pattern_count)
+    except Exception as exc:  # noqa: BLE001 - a missing feed must not stop the API from starting
+        logger.warning("Could not warm feed indexes: %s", exc)
+
+
+app = FastAPI(title="GTFS Sweden Chat Backend", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,9 +79,6 @@ app.add_middleware(
 
 app.include_router(health_router)
 app.include_router(chat_router)
-
-
-@app.get("/")
-def root():
-    return {"message": "GTFS Sweden chat backend is running"}
-
+app.include_router(departures_router)
+app.include_router(trips_router)
+app.include_router(stations_router)
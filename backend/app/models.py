@@ -88,8 +88,9 @@ class StopTime(Base):
     __tablename__ = "stop_times"
 
     trip_id = Column(String, primary_key=True)
-    arrival_time = Column(String)
-    departure_time = Column(String)
+    # Seconds since service-day start; may exceed 86400 for trips past midnight
+    arrival_time = Column(Integer)
+    departure_time = Column(Integer)
     stop_id = Column(String, primary_key=True, index=True)
     stop_sequence = Column(Integer, primary_key=True)
     stop_headsign = Column(String)
@@ -1,34 +1,50 @@
 from datetime import date, time
-from typing import List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 
 from . import schemas
+from .cache import cached
+from .db import engine_cached
+from .gtfs_time import format_gtfs_time, time_to_seconds
+from .service_calendar import get_service_calendar, has_service_dates, weekday_flag_sql
+from .stop_index import Station, get_stop_index, normalize_tokens, query_terms
+from .timetable import get_timetable
+from .trip_times import get_trip_times
 
 
+def _station_key(session: Session, name: str) -> str:
+    """Cache key part for a station name: the station it resolves to, else the normalized name."""
+    station = resolve_station(session, name)
+    return station.station_id if station is not None else " ".join(normalize_tokens(name))
+
+
+@cached("search_stops", key=lambda session, name, limit: (query_terms(name), limit))
 def search_stops(session: Session, name: str, limit: int = 10) -> List[dict]:
     """
-    Rail-focused stop search against stops_rail (rail-only subset).
+    Rail-focused station search: one row per station (its station_id as ``stop_id``),
+    ranked by match quality and traffic. Served from the in-memory stop index (see
+    app.stop_index).
     """
-    sql = text(
-        """
-        SELECT stop_id, stop_name
-        FROM stops_rail
-        WHERE stop_name ILIKE :pattern
-        ORDER BY stop_name
-        LIMIT :limit
-        """
-    )
-    rows = session.execute(sql, {"pattern": f"%{name}%", "limit": limit}).mappings().all()
-    return [dict(row) for row in rows]
+    return get_stop_index(session).search(name, limit)
+
 
+def resolve_station(session: Session, name: str) -> Optional[Station]:
+    """The single best station for ``name``, carrying every rail stop_id (platform) it groups."""
+    return get_stop_index(session).resolve(name)
 
+
+@cached("active_services")
 def active_services(session: Session, target_date: date) -> List[str]:
-    """Return active service_ids for a given date using calendar + calendar_dates."""
-    dow = target_date.weekday()  # Monday=0
-    day_cols = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-    day_col = day_cols[dow]
+    """
+    Return the rail service_ids active on a date. Answered from the precomputed
+    service calendar when the date is inside the feed window, otherwise (or on a
+    database built before service_calendar existed) from calendar + calendar_dates.
+    """
+    calendar = get_service_calendar(session)
+    if calendar is not None and calendar.covers(target_date):
+        return list(calendar.active_on(target_date))
 
     sql = text(
         f"""
@@ -36,7 +52,7 @@ def active_services(session: Session, target_date: date) -> List[str]:
             SELECT service_id FROM calendar
             WHERE start_date <= :target_date
               AND end_date >= :target_date
-              AND {day_col} = true
+              AND {weekday_flag_sql(":dow")} = true
         ),
         added AS (
             SELECT service_id FROM calendar_dates
@@ -53,75 +69,168 @@ def active_services(session: Session, target_date: date) -> List[str]:
         SELECT service_id FROM removed
         """
     )
-    rows = session.execute(sql, {"target_date": target_date}).scalars().all()
+    rows = session.execute(sql, {"target_date": target_date, "dow": target_date.weekday()}).scalars().all()
     return list(rows)
 
 
-def departures_between(
-    session: Session,
-    origin_name: str,
-    destination_name: str,
-    travel_date: Optional[date],
-    after_time: Optional[time],
-    limit_rows: int = 50,
-) -> Sequence[schemas.TableData]:
-    """Find departures between two stop names, optionally filtered by date/time."""
-    origin_candidates = search_stops(session, origin_name, limit=3)
-    dest_candidates = search_stops(session, destination_name, limit=3)
-    if not origin_candidates or not dest_candidates:
-        return []
+def service_filter(session: Session, travel_date: date, trip_alias: str = "t") -> Tuple[str, str, dict]:
+    """
+    SQL restricting ``trip_alias`` to trips running on ``travel_date``, as
+    ``(join_clause, where_clause, params)``. Joins service_dates when the feed has
+    it; otherwise binds the active service_ids as an IN list.
+    """
+    if has_service_dates(session):
+        join = (
+            f"JOIN service_dates sd ON sd.service_id = {trip_alias}.service_id "
+            "AND sd.service_date = :service_date"
+        )
+        return join, "", {"service_date": travel_date}
+    services = active_services(session, travel_date)
+    if not services:
+        return "", "AND 1 = 0", {}
+    return "", f"AND {trip_alias}.service_id IN :services", {"services": tuple(services)}
 
-    origin_ids = [s["stop_id"] for s in origin_candidates]
-    dest_ids = [s["stop_id"] for s in dest_candidates]
 
-    services = active_services(session, travel_date) if travel_date else None
-    if travel_date and not services:
-        return []
+def _check_limit(limit_rows: int) -> None:
+    # Checked before picking an engine, so SQL and the in-memory timetable reject the same inputs
+    if limit_rows < 1:
+        raise ValueError(f"limit_rows must be at least 1, got {limit_rows}")
+
+
+def has_trip_patterns(session: Session) -> bool:
+    return engine_cached(session, "pattern_od_rail", lambda conn: inspect(conn).has_table("pattern_od_rail"))
+
+
+def _legs_sql(session: Session) -> str:
+    """
+    Subquery of (trip_id, origin_id, dest_id, departure, arrival): every trip calling
+    at one of :origin_ids and later at one of :dest_ids.
 
+    With trip patterns, only the trips of patterns serving the pair are read, taking
+    the times from their per-trip arrays. Databases built before patterns self-join
+    stop_times_rail on trip_id instead.
+    """
+    if has_trip_patterns(session):
+        return """
+            SELECT
+                tp.trip_id,
+                od.origin_id,
+                od.dest_id,
+                tp.departure_times[od.origin_pos + 1] AS departure,
+                tp.arrival_times[od.dest_pos + 1] AS arrival
+            FROM pattern_od_rail od
+            JOIN trip_patterns_rail tp ON tp.pattern_id = od.pattern_id
+            WHERE od.origin_id IN :origin_ids
+              AND od.dest_id IN :dest_ids
+        """
+    return """
+            SELECT
+                st_origin.trip_id,
+                st_origin.stop_id AS origin_id,
+                st_dest.stop_id AS dest_id,
+                st_origin.departure_time AS departure,
+                st_dest.arrival_time AS arrival
+            FROM stop_times_rail st_origin
+            JOIN stop_times_rail st_dest
+                ON st_origin.trip_id = st_dest.trip_id
+               AND st_origin.stop_sequence < st_dest.stop_sequence
+            WHERE st_origin.stop_id IN :origin_ids
+              AND st_dest.stop_id IN :dest_ids
+        """
+
+
+def _departures_between_sql(
+    session: Session,
+    origin: Station,
+    destination: Station,
+    travel_date: Optional[date],
+    after_time: Optional[time],
+    limit_rows: int,
+) -> List[dict]:
     params = {
-        "origin_ids": tuple(origin_ids),
-        "dest_ids": tuple(dest_ids),
+        "origin_ids": origin.stop_ids,
+        "dest_ids": destination.stop_ids,
         "limit_rows": limit_rows,
     }
     time_clause = ""
     if after_time:
-        params["after_time"] = after_time.strftime("%H:%M:%S")
-        time_clause = "AND st_origin.departure_time >= :after_time"
+        params["after_time"] = time_to_seconds(after_time)
+        time_clause = "AND legs.departure >= :after_time"
 
-    service_clause = ""
-    if services is not None:
-        params["services"] = tuple(services)
-        service_clause = "AND t.service_id IN :services"
+    service_join, service_clause = "", ""
+    if travel_date:
+        service_join, service_clause, service_params = service_filter(session, travel_date)
+        params.update(service_params)
 
     sql = text(
         f"""
         SELECT
-            st_origin.departure_time AS departure,
-            st_dest.arrival_time AS arrival,
+            legs.departure,
+            legs.arrival,
             s_origin.stop_name AS origin_name,
             s_dest.stop_name AS destination_name,
             r.agency_name,
             r.route_short_name,
             t.trip_id,
             t.route_id
-        FROM stop_times_rail st_origin
-        JOIN stop_times_rail st_dest
-            ON st_origin.trip_id = st_dest.trip_id
-           AND st_origin.stop_sequence < st_dest.stop_sequence
-        JOIN trips_rail t ON t.trip_id = st_origin.trip_id
+        FROM ({_legs_sql(session)}) legs
+        JOIN trips_rail t ON t.trip_id = legs.trip_id
+        {service_join}
         JOIN routes_rail_with_agency r ON r.route_id = t.route_id
-        JOIN stops_rail s_origin ON s_origin.stop_id = st_origin.stop_id
-        JOIN stops_rail s_dest ON s_dest.stop_id = st_dest.stop_id
-        WHERE st_origin.stop_id IN :origin_ids
-          AND st_dest.stop_id IN :dest_ids
+        JOIN stops_rail s_origin ON s_origin.stop_id = legs.origin_id
+        JOIN stops_rail s_dest ON s_dest.stop_id = legs.dest_id
+        WHERE true
           {time_clause}
           {service_clause}
-        ORDER BY st_origin.departure_time
+        ORDER BY legs.departure, legs.arrival, t.trip_id
         LIMIT :limit_rows
         """
     )
 
-    rows = session.execute(sql, params).mappings().all()
+    return session.execute(sql, params).mappings().all()
+
+
+@cached(
+    "departures_between",
+    key=lambda session, origin_name, destination_name, travel_date, after_time, limit_rows: (
+        _station_key(session, origin_name),
+        _station_key(session, destination_name),
+        travel_date,
+        after_time,
+        limit_rows,
+    ),
+)
+def departures_between(
+    session: Session,
+    origin_name: str,
+    destination_name: str,
+    travel_date: Optional[date],
+    after_time: Optional[time],
+    limit_rows: int = 50,
+) -> Sequence[schemas.TableData]:
+    """
+    Find departures between two stations, optionally filtered by date/time. Each name
+    resolves to one station and matches any of that station's platforms. Served from
+    the in-memory timetable when it is enabled (see app.timetable), otherwise by SQL.
+    ValueError for a ``limit_rows`` below 1.
+    """
+    _check_limit(limit_rows)
+    origin = resolve_station(session, origin_name)
+    destination = resolve_station(session, destination_name)
+    if origin is None or destination is None:
+        return []
+
+    timetable = get_timetable(session)
+    if timetable is not None:
+        rows = timetable.departures_between(
+            origin.stop_ids,
+            destination.stop_ids,
+            timetable.running_on(travel_date, lambda: active_services(session, travel_date)) if travel_date else None,
+            time_to_seconds(after_time) if after_time else None,
+            limit_rows,
+        )
+    else:
+        rows = _departures_between_sql(session, origin, destination, travel_date, after_time, limit_rows)
     if not rows:
         return []
 
@@ -136,7 +245,230 @@ def departures_between(
         schemas.TableColumn(id="trip_id", label="Trip"),
     ]
 
-    data_rows = [dict(row) for row in rows]
+    data_rows = [
+        {**row, "departure": format_gtfs_time(row["departure"]), "arrival": format_gtfs_time(row["arrival"])}
+        for row in rows
+    ]
     table = schemas.TableData(columns=columns, rows=data_rows, title="Departures")
     return [table]
 
+
+@cached(
+    "next_departures",
+    key=lambda session, stop_ids, travel_date, after, limit_rows, after_trip: (
+        tuple(sorted(stop_ids)),
+        travel_date,
+        after,
+        limit_rows,
+        after_trip,
+    ),
+)
+def next_departures(
+    session: Session,
+    stop_ids: Sequence[str],
+    travel_date: Optional[date],
+    after: Optional[int],
+    limit_rows: int = 20,
+    after_trip: Optional[str] = None,
+) -> List[dict]:
+    """
+    Departures from ``stop_ids`` in (departure, trip_id) order, times in seconds.
+    ``after`` keeps departures at/after it; with ``after_trip`` as well it is a keyset
+    bound, keeping only rows after (after, after_trip), so the next page of a board
+    costs the same as the first. Served from the in-memory timetable when enabled.
+    ValueError for a ``limit_rows`` below 1.
+    """
+    _check_limit(limit_rows)
+    timetable = get_timetable(session)
+    if timetable is not None:
+        running = None
+        if travel_date:
+            running = timetable.running_on(travel_date, lambda: active_services(session, travel_date))
+        return timetable.next_departures(stop_ids, running, after, limit_rows, after_trip)
+
+    params = {"station_ids": tuple(stop_ids), "limit_rows": limit_rows}
+    time_clause = ""
+    if after is not None and after_trip is not None:
+        params.update(after_time=after, after_trip=after_trip)
+        time_clause = (
+            "AND (st.departure_time > :after_time "
+            "OR (st.departure_time = :after_time AND t.trip_id > :after_trip))"
+        )
+    elif after is not None:
+        params["after_time"] = after
+        time_clause = "AND st.departure_time >= :after_time"
+
+    # Restrict to trips running on the date
+    service_join, service_clause = "", ""
+    if travel_date:
+        service_join, service_clause, service_params = service_filter(session, travel_date)
+        params.update(service_params)
+
+    sql = text(
+        f"""
+        SELECT
+            st.departure_time AS departure,
+            s.stop_name AS station_name,
+            r.agency_name,
+            r.route_short_name,
+            t.trip_id,
+            t.route_id,
+            t.trip_headsign
+        FROM stop_times_rail st
+        JOIN trips_rail t ON t.trip_id = st.trip_id
+        {service_join}
+        JOIN routes_rail_with_agency r ON r.route_id = t.route_id
+        JOIN stops_rail s ON s.stop_id = st.stop_id
+        WHERE st.stop_id IN :station_ids
+          {time_clause}
+          {service_clause}
+        ORDER BY st.departure_time, t.trip_id
+        LIMIT :limit_rows
+        """
+    )
+    return session.execute(sql, params).mappings().all()
+
+
+@cached("route_stops")
+def route_stops(session: Session, trip_id: str) -> List[dict]:
+    """
+    Stops of a trip in order, times in seconds; empty for an unknown trip. Served
+    from the in-memory timetable or the cached pattern and time profiles (see
+    app.trip_times) when available.
+    """
+    timetable = get_timetable(session)
+    if timetable is not None:
+        return timetable.route_stops(trip_id)
+    trip_times = get_trip_times(session)
+    if trip_times is not None:
+        return trip_times.route_stops(trip_id)
+    return _route_stops_sql(session, trip_id)
+
+
+def _route_stops_sql(session: Session, trip_id: str) -> List[dict]:
+    sql = text(
+        """
+        SELECT
+            st.stop_sequence,
+            s.stop_name,
+            st.arrival_time,
+            st.departure_time,
+            st.stop_id
+        FROM stop_times_rail st
+        JOIN stops_rail s ON s.stop_id = st.stop_id
+        WHERE st.trip_id = :trip_id
+        ORDER BY st.stop_sequence
+        """
+    )
+    return session.execute(sql, {"trip_id": trip_id}).mappings().all()
+
+
+def _station_values(prefix: str, station_of: Dict[str, str], params: dict) -> str:
+    """Inline (stop_id, station_id) table for ``station_of``, binding its values into ``params``."""
+    rows = []
+    for i, (stop_id, station_id) in enumerate(station_of.items()):
+        params[f"{prefix}_stop_{i}"], params[f"{prefix}_station_{i}"] = stop_id, station_id
+        rows.append(f"(:{prefix}_stop_{i}, :{prefix}_station_{i})")
+    return f"(VALUES {', '.join(rows)}) AS {prefix}(stop_id, station_id)"
+
+
+def _od_summary_sql(
+    session: Session,
+    origin_station: Dict[str, str],
+    dest_station: Dict[str, str],
+    travel_date: date,
+    after: int,
+    before: int,
+) -> List[tuple]:
+    params = {
+        "origin_ids": tuple(origin_station),
+        "dest_ids": tuple(dest_station),
+        "after": after,
+        "before": before,
+    }
+    origin_values = _station_values("os", origin_station, params)
+    dest_values = _station_values("ds", dest_station, params)
+    service_join, service_clause, service_params = service_filter(session, travel_date)
+    params.update(service_params)
+    sql = text(
+        f"""
+        SELECT
+            os.station_id,
+            ds.station_id,
+            min(legs.departure) AS first_departure,
+            min(legs.arrival) AS earliest_arrival,
+            min(legs.arrival - legs.departure) AS fastest,
+            count(DISTINCT legs.trip_id) AS trips
+        FROM ({_legs_sql(session)}) legs
+        JOIN {origin_values} ON os.stop_id = legs.origin_id
+        JOIN {dest_values} ON ds.stop_id = legs.dest_id
+        JOIN trips_rail t ON t.trip_id = legs.trip_id
+        {service_join}
+        WHERE legs.departure BETWEEN :after AND :before
+          AND legs.arrival IS NOT NULL
+          AND os.station_id <> ds.station_id
+          {service_clause}
+        GROUP BY os.station_id, ds.station_id
+        """
+    )
+    return [tuple(row) for row in session.execute(sql, params)]
+
+
+def od_matrix(
+    session: Session,
+    origin_names: Sequence[str],
+    destination_names: Sequence[str],
+    travel_date: date,
+    after_time: Optional[time] = None,
+    before_time: Optional[time] = None,
+) -> dict:
+    """
+    Direct connections between every origin and destination station in one pass.
+
+    Names resolve to stations once each. Per station pair with a direct train leaving
+    between ``after_time`` and ``before_time`` (default: the whole service day), the
+    result has the first departure, earliest arrival, shortest travel time and number
+    of trips. Pairs without a direct train are left out; unknown names are listed in
+    ``unresolved``. One grouped query (which DuckDB runs on all cores) or, with the
+    in-memory timetable, one vectorized pass answers the whole matrix.
+    """
+    stations = {}
+    unresolved = []
+    for name in dict.fromkeys([*origin_names, *destination_names]):
+        station = resolve_station(session, name)
+        if station is None:
+            unresolved.append(name)
+        else:
+            stations[name] = station
+    origins = {stations[n].station_id: stations[n] for n in origin_names if n in stations}
+    destinations = {stations[n].station_id: stations[n] for n in destination_names if n in stations}
+    result = {"origins": list(origins.values()), "destinations": list(destinations.values()), "unresolved": unresolved}
+    result["cells"] = []
+    if not origins or not destinations:
+        return result
+
+    origin_station = {stop_id: station.station_id for station in origins.values() for stop_id in station.stop_ids}
+    dest_station = {stop_id: station.station_id for station in destinations.values() for stop_id in station.stop_ids}
+    after = time_to_seconds(after_time) if after_time else 0
+    # Trips of the service day may depart past 24:00
+    before = time_to_seconds(before_time) if before_time else 2 * 86400
+
+    timetable = get_timetable(session)
+    if timetable is not None:
+        running = timetable.running_on(travel_date, lambda: active_services(session, travel_date))
+        rows = timetable.od_summary(origin_station, dest_station, running, after, before)
+    else:
+        rows = _od_summary_sql(session, origin_station, dest_station, travel_date, after, before)
+
+    result["cells"] = [
+        {
+            "origin_id": origin_id,
+            "destination_id": dest_id,
+            "first_departure": first_departure,
+            "earliest_arrival": earliest_arrival,
+            "travel_seconds": fastest,
+            "trips": trips,
+        }
+        for origin_id, dest_id, first_departure, earliest_arrival, fastest, trips in sorted(rows)
+    ]
+    return result
@@ -0,0 +1,99 @@
+"""
+Reachability ("where can I get to from Linköping within 2 hours leaving at 07:00").
+
+One ``JourneyPlanner.reachable`` run gives the earliest arrival at every rail stop
+from the origin station's platforms; platforms are then folded into stations,
+keeping each station's earliest arrival. Answering the same question with
+``departures_between`` would take one query per candidate destination and miss
+journeys with changes.
+"""
+
+from datetime import date, time
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .cache import cached
+from .db import engine_cached
+from .gtfs_time import time_to_seconds
+from .journey_planner import MAX_TRANSFERS, UNREACHED, JourneyPlanner, _first_per_key, get_journey_planner
+from .query_planner import _station_key, active_services, resolve_station
+from .stop_index import get_stop_index
+
+STOP_STATIONS_KEY = "reachability_stop_stations"
+
+
+def _stop_stations(session: Session, planner: JourneyPlanner) -> np.ndarray:
+    """Position in ``stations`` of each timetable stop's station, -1 for stops outside the stop index."""
+    stations = get_stop_index(session).stations
+
+    def load(conn):
+        codes = planner.timetable.stop_codes
+        mapping = np.full(len(planner.timetable.stop_ids), -1, dtype=np.int64)
+        for position, station in enumerate(stations):
+            for stop_id in station.stop_ids:
+                if stop_id in codes:
+                    mapping[codes[stop_id]] = position
+        return mapping
+
+    return engine_cached(session, STOP_STATIONS_KEY, load)
+
+
+@cached(
+    "reachable_stations",
+    key=lambda session, origin_name, travel_date, after_time, within_minutes, max_transfers: (
+        _station_key(session, origin_name),
+        travel_date,
+        after_time,
+        within_minutes,
+        max_transfers,
+    ),
+)
+def reachable_stations(
+    session: Session,
+    origin_name: str,
+    travel_date: date,
+    after_time: Optional[time] = None,
+    within_minutes: int = 120,
+    max_transfers: int = MAX_TRANSFERS,
+) -> Optional[dict]:
+    """
+    Stations reachable from ``origin_name`` leaving at/after ``after_time`` on
+    ``travel_date`` and arriving within ``within_minutes``, earliest arrival first.
+    Each has its arrival, minutes since the start time and the changes needed.
+    None when the origin is unknown or the database has no journey planner.
+    """
+    origin = resolve_station(session, origin_name)
+    planner = get_journey_planner(session)
+    if origin is None or planner is None:
+        return None
+    result = {"origin": origin, "stations": []}
+    if not active_services(session, travel_date):
+        return result
+
+    stations = get_stop_index(session).stations
+    stop_station = _stop_stations(session, planner)
+    start = time_to_seconds(after_time) if after_time else 0
+    running = planner.timetable.running_on(travel_date, lambda: active_services(session, travel_date))
+    arrival, changes = planner.reachable(origin.stop_ids, start, start + within_minutes * 60, running, max_transfers)
+
+    reached = np.flatnonzero((arrival != UNREACHED) & (stop_station >= 0))
+    reached = reached[_first_per_key(stop_station[reached], arrival[reached])]
+    reached = reached[np.lexsort((stop_station[reached], arrival[reached]))]
+    rows: List[dict] = []
+    for stop in reached.tolist():
+        station = stations[int(stop_station[stop])]
+        if station.station_id == origin.station_id:
+            continue
+        rows.append(
+            {
+                "station_id": station.station_id,
+                "name": station.name,
+                "arrival": int(arrival[stop]),
+                "travel_minutes": int(arrival[stop] - start) // 60,
+                "transfers": int(changes[stop]),
+            }
+        )
+    result["stations"] = rows
+    return result
@@ -0,0 +1,64 @@
+from datetime import date, time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .deps import get_db
+from .departure_board import board_page
+from .gtfs_time import format_gtfs_time
+from .query_planner import od_matrix
+
+router = APIRouter(prefix="/api", tags=["departures"])
+
+
+@router.get("/departures/board", response_model=schemas.DepartureBoardResponse)
+def departure_board_endpoint(
+    station: Optional[str] = Query(None, description="Station name; not needed with a cursor"),
+    on: Optional[date] = Query(None, alias="date", description="Start date (default: today)"),
+    after: Optional[time] = Query(None, description="Start time, HH:MM (default: 00:00)"),
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: Session = Depends(get_db),
+):
+    """One page of a station's departures, in time order across midnight and service days."""
+    if not cursor and not (station and station.strip()):
+        raise HTTPException(status_code=400, detail="Either station or cursor is required")
+    try:
+        page = board_page(db, station, on or date.today(), after, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Station '{station}' not found")
+    return schemas.DepartureBoardResponse(
+        station=page.station.name,
+        station_id=page.station.station_id,
+        departures=page.rows,
+        next_cursor=page.next_cursor,
+    )
+
+
+@router.post("/departures/matrix", response_model=schemas.ODMatrixResponse)
+def od_matrix_endpoint(payload: schemas.ODMatrixRequest, db: Session = Depends(get_db)):
+    """Direct connections between every origin and destination station, computed in one pass."""
+    matrix = od_matrix(
+        db,
+        payload.origins,
+        payload.destinations or payload.origins,
+        payload.date or date.today(),
+        payload.after,
+        payload.before,
+    )
+    return schemas.ODMatrixResponse(
+        stations={station.station_id: station.name for station in matrix["origins"] + matrix["destinations"]},
+        cells=[
+            {
+                **cell,
+                "first_departure": format_gtfs_time(cell["first_departure"]),
+                "earliest_arrival": format_gtfs_time(cell["earliest_arrival"]),
+            }
+            for cell in matrix["cells"]
+        ],
+        unresolved=matrix["unresolved"],
+    )
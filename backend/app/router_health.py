@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
+from .cache import result_cache
+from .db import active_feed_version
+
 router = APIRouter(prefix="/api", tags=["health"])
 
 
 @router.get("/health")
 def healthcheck():
-    return {"status": "ok"}
-
+    return {"status": "ok", "feed_version": active_feed_version(), "cache": result_cache().stats()}
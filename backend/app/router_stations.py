@@ -0,0 +1,82 @@
+from datetime import date, time
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .deps import get_db
+from .gtfs_time import format_gtfs_time
+from .journey_planner import MAX_TRANSFERS
+from .reachability import reachable_stations
+from .spatial_index import PlacedStation, get_spatial_index
+
+router = APIRouter(prefix="/api", tags=["stations"])
+
+
+def _station_list(found: List[PlacedStation]) -> schemas.StationListResponse:
+    return schemas.StationListResponse(
+        stations=[
+            {
+                "station_id": placed.station.station_id,
+                "name": placed.station.name,
+                "lat": placed.lat,
+                "lon": placed.lon,
+                "departures": placed.station.departures,
+                "distance_km": None if placed.distance_km is None else round(placed.distance_km, 3),
+            }
+            for placed in found
+        ]
+    )
+
+
+@router.get("/stations/nearest", response_model=schemas.StationListResponse)
+def nearest_stations_endpoint(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(5, ge=1, le=50),
+    max_km: Optional[float] = Query(None, gt=0, description="Only stations within this distance"),
+    db: Session = Depends(get_db),
+):
+    """The rail stations closest to a coordinate, nearest first."""
+    return _station_list(get_spatial_index(db).nearest(lat, lon, limit, max_km))
+
+
+@router.get("/stations/within", response_model=schemas.StationListResponse)
+def stations_within_endpoint(
+    bbox: str = Query(..., description="west,south,east,north in degrees"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Rail stations inside a map view's bounding box, busiest first."""
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(","))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north") from exc
+    if south > north or west > east:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    return _station_list(get_spatial_index(db).within(south, west, north, east, limit))
+
+
+@router.get("/stations/reachable", response_model=schemas.ReachabilityResponse)
+def reachable_stations_endpoint(
+    station: str = Query(..., min_length=1, description="Origin station name"),
+    on: Optional[date] = Query(None, alias="date", description="Travel date (default: today)"),
+    after: Optional[time] = Query(None, description="Start time, HH:MM (default: 00:00)"),
+    within: int = Query(120, ge=1, le=1440, description="Travel time budget in minutes"),
+    max_transfers: int = Query(MAX_TRANSFERS, ge=0, le=MAX_TRANSFERS),
+    db: Session = Depends(get_db),
+):
+    """Stations reachable from an origin within a travel time budget, earliest arrival first."""
+    travel_date = on or date.today()
+    reachable = reachable_stations(db, station, travel_date, after, within, max_transfers)
+    if reachable is None:
+        raise HTTPException(status_code=404, detail=f"Station '{station}' not found or journey planning unavailable")
+    return schemas.ReachabilityResponse(
+        origin=reachable["origin"].name,
+        origin_id=reachable["origin"].station_id,
+        date=travel_date,
+        after=(after or time(0, 0)).strftime("%H:%M"),
+        within_minutes=within,
+        stations=[{**row, "arrival": format_gtfs_time(row["arrival"])} for row in reachable["stations"]],
+    )
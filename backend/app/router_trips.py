@@ -0,0 +1,25 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .deps import get_db
+from .shape_geometry import has_shape_geometries, trip_geometry
+
+router = APIRouter(prefix="/api", tags=["trips"])
+
+
+@router.get("/trips/{trip_id}/geometry", response_model=schemas.TripGeometryResponse)
+def trip_geometry_endpoint(
+    trip_id: str,
+    zoom: Optional[float] = Query(None, ge=0, le=22, description="Web map zoom (default: fit the whole trip)"),
+    db: Session = Depends(get_db),
+):
+    """A trip's path as an encoded polyline, simplified for the map zoom level."""
+    if not has_shape_geometries(db):
+        raise HTTPException(status_code=404, detail="Trip geometries are not available for this database")
+    geometry = trip_geometry(db, trip_id, zoom)
+    if geometry is None:
+        raise HTTPException(status_code=404, detail=f"No geometry for trip '{trip_id}'")
+    return geometry
@@ -1,3 +1,4 @@
+import datetime as dt
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
@@ -29,3 +30,72 @@ class ChatResponse(BaseModel):
     messages: List[ChatMessage]
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
+
+
+class DepartureBoardResponse(BaseModel):
+    station: str
+    station_id: str
+    departures: List[Dict[str, Any]]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to get the next page")
+
+
+class ODMatrixRequest(BaseModel):
+    origins: List[str] = Field(..., min_length=1, max_length=100)
+    destinations: Optional[List[str]] = Field(None, max_length=100, description="Defaults to the origins")
+    date: Optional[dt.date] = Field(None, description="Travel date (default: today)")
+    after: Optional[dt.time] = Field(None, description="Earliest departure (default: 00:00)")
+    before: Optional[dt.time] = Field(None, description="Latest departure (default: end of the service day)")
+
+
+class ODMatrixCell(BaseModel):
+    origin_id: str
+    destination_id: str
+    first_departure: str
+    earliest_arrival: str
+    travel_seconds: int
+    trips: int
+
+
+class ODMatrixResponse(BaseModel):
+    stations: Dict[str, str] = Field(..., description="station_id -> name for every resolved station")
+    cells: List[ODMatrixCell]
+    unresolved: List[str] = Field(default_factory=list)
+
+
+class TripGeometryResponse(BaseModel):
+    trip_id: str
+    shape_id: str
+    tolerance_m: int = Field(..., description="Douglas-Peucker tolerance of this resolution, in metres")
+    points: int
+    polyline: str = Field(..., description="Google encoded polyline, precision 5")
+    bbox: List[float] = Field(..., description="[west, south, east, north]")
+
+
+class StationPoint(BaseModel):
+    station_id: str
+    name: str
+    lat: float
+    lon: float
+    departures: int
+    distance_km: Optional[float] = None
+
+
+class StationListResponse(BaseModel):
+    stations: List[StationPoint]
+
+
+class ReachableStation(BaseModel):
+    station_id: str
+    name: str
+    arrival: str
+    travel_minutes: int = Field(..., description="Minutes from the start time to the earliest arrival")
+    transfers: int
+
+
+class ReachabilityResponse(BaseModel):
+    origin: str
+    origin_id: str
+    date: dt.date
+    after: str
+    within_minutes: int
+    stations: List[ReachableStation]
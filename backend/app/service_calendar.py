@@ -0,0 +1,251 @@
+"""
+Precomputed service-day calendar for the rail services.
+
+Ingestion expands calendar + calendar_dates into ``service_calendar``: one row per
+rail service with a bitmap over the feed's validity window (bit ``i`` set when the
+service runs on ``window_start + i`` days). The query layer loads it once per feed
+version into a ``ServiceCalendar``, which answers "what runs on this date" with a
+list index and "which days does this run" with a bit scan.
+
+``service_dates`` holds the same days as (service_date, service_id) rows so SQL can
+restrict trips to a date with a join rather than binding the active service_ids.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .db import engine_cached
+
+SERVICE_CALENDAR_TABLE = "service_calendar"
+SERVICE_DATES_TABLE = "service_dates"
+WEEKDAY_COLUMNS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+SERVICE_CALENDAR_DDL = """
+CREATE TABLE service_calendar (
+    service_id VARCHAR PRIMARY KEY,
+    window_start DATE NOT NULL,
+    window_days INTEGER NOT NULL,
+    active_days INTEGER NOT NULL,
+    bitmap BYTEA NOT NULL
+)
+"""
+
+SERVICE_DATES_DDL = """
+CREATE TABLE service_dates (
+    service_date DATE NOT NULL,
+    service_id VARCHAR NOT NULL
+)
+"""
+
+
+def weekday_flag_sql(weekday: str, prefix: str = "") -> str:
+    """SQL picking the calendar day column for ``weekday`` (an expression, Monday=0)."""
+    branches = " ".join(f"WHEN {i} THEN {prefix}{col}" for i, col in enumerate(WEEKDAY_COLUMNS[:-1]))
+    return f"CASE {weekday} {branches} ELSE {prefix}{WEEKDAY_COLUMNS[-1]} END"
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10].replace("-", ""), "%Y%m%d").date()
+
+
+def _bit_positions(bitmap: int) -> Iterable[int]:
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class ServiceCalendar:
+    """Rail service_id -> days it runs, over ``[window_start, window_start + window_days)``."""
+
+    def __init__(self, window_start: date, window_days: int, bitmaps: Dict[str, int]):
+        self.window_start = window_start
+        self.window_days = window_days
+        self.bitmaps = bitmaps
+        by_day: List[List[str]] = [[] for _ in range(window_days)]
+        for service_id in sorted(bitmaps):
+            for day in _bit_positions(bitmaps[service_id]):
+                by_day[day].append(service_id)
+        self._by_day: List[Tuple[str, ...]] = [tuple(ids) for ids in by_day]
+
+    @property
+    def window_end(self) -> date:
+        return self.window_start + timedelta(days=self.window_days - 1)
+
+    def _offset(self, day: date) -> Optional[int]:
+        offset = (day - self.window_start).days
+        return offset if 0 <= offset < self.window_days else None
+
+    def covers(self, day: date) -> bool:
+        return self._offset(day) is not None
+
+    def active_on(self, day: date) -> Tuple[str, ...]:
+        """service_ids running on ``day`` (none outside the window)."""
+        offset = self._offset(day)
+        return self._by_day[offset] if offset is not None else ()
+
+    def runs_on(self, service_id: str, day: date) -> bool:
+        offset = self._offset(day)
+        return offset is not None and bool(self.bitmaps.get(service_id, 0) >> offset & 1)
+
+    def dates(self, service_id: str, start: Optional[date] = None, end: Optional[date] = None) -> List[date]:
+        """Days ``service_id`` runs, optionally clipped to ``[start, end]``."""
+        bitmap = self.bitmaps.get(service_id, 0)
+        if start is not None:
+            bitmap &= ~((1 << max(0, (start - self.window_start).days)) - 1)
+        if end is not None:
+            bitmap &= (1 << max(0, (end - self.window_start).days + 1)) - 1
+        return [self.window_start + timedelta(days=i) for i in _bit_positions(bitmap)]
+
+
+def expand_calendar(calendar_rows: Iterable, exception_rows: Iterable) -> ServiceCalendar:
+    """
+    Build bitmaps from calendar rows (service_id, monday..sunday, start_date, end_date)
+    and calendar_dates rows (service_id, date, exception_type).
+    """
+    calendar_rows = [dict(row) for row in calendar_rows]
+    exception_rows = [dict(row) for row in exception_rows]
+    bounds = [_as_date(r[col]) for r in calendar_rows for col in ("start_date", "end_date")]
+    bounds += [_as_date(r["date"]) for r in exception_rows]
+    if not bounds:
+        return ServiceCalendar(date.today(), 0, {})
+    window_start = min(bounds)
+    window_days = (max(bounds) - window_start).days + 1
+
+    # weekday_masks[w]: every window day falling on weekday w (Monday=0)
+    weekday_masks = [0] * 7
+    for offset in range(min(7, window_days)):
+        weekday = (window_start.weekday() + offset) % 7
+        weekday_masks[weekday] = sum(1 << i for i in range(offset, window_days, 7))
+
+    bitmaps: Dict[str, int] = {}
+    for row in calendar_rows:
+        first = (_as_date(row["start_date"]) - window_start).days
+        last = (_as_date(row["end_date"]) - window_start).days
+        days = 0
+        for weekday, column in enumerate(WEEKDAY_COLUMNS):
+            if row[column] in (True, 1, "1"):
+                days |= weekday_masks[weekday]
+        in_range = ((1 << (last + 1)) - 1) & ~((1 << first) - 1)
+        bitmaps[row["service_id"]] = bitmaps.get(row["service_id"], 0) | (days & in_range)
+
+    for row in exception_rows:
+        bit = 1 << (_as_date(row["date"]) - window_start).days
+        current = bitmaps.get(row["service_id"], 0)
+        bitmaps[row["service_id"]] = current | bit if int(row["exception_type"]) == 1 else current & ~bit
+    return ServiceCalendar(window_start, window_days, bitmaps)
+
+
+def build_service_calendar(conn: Connection) -> None:
+    """Fill ``service_calendar`` for the services used by trips_rail (table created by the rail step)."""
+    calendar_rows = conn.execute(
+        text(
+            f"""
+            SELECT service_id, {", ".join(WEEKDAY_COLUMNS)}, start_date, end_date
+            FROM calendar
+            WHERE service_id IN (SELECT DISTINCT service_id FROM trips_rail)
+            """
+        )
+    ).mappings().all()
+    exception_rows = conn.execute(
+        text(
+            """
+            SELECT service_id, date, exception_type
+            FROM calendar_dates
+            WHERE service_id IN (SELECT DISTINCT service_id FROM trips_rail)
+            """
+        )
+    ).mappings().all()
+    calendar = expand_calendar(calendar_rows, exception_rows)
+    nbytes = (calendar.window_days + 7) // 8
+    rows = [
+        {
+            "service_id": service_id,
+            "window_start": calendar.window_start,
+            "window_days": calendar.window_days,
+            "active_days": bin(bitmap).count("1"),
+            "bitmap": bitmap.to_bytes(nbytes, "little"),
+        }
+        for service_id, bitmap in sorted(calendar.bitmaps.items())
+    ]
+    if rows:
+        conn.execute(
+            text(
+                """
+                INSERT INTO service_calendar (service_id, window_start, window_days, active_days, bitmap)
+                VALUES (:service_id, :window_start, :window_days, :active_days, :bitmap)
+                """
+            ),
+            rows,
+        )
+
+
+def build_service_dates(conn: Connection) -> None:
+    """
+    Fill ``service_dates`` over the service_calendar window: calendar days joined to
+    a temporary day spine, plus added dates, minus removed dates.
+    """
+    window = conn.execute(text("SELECT window_start, window_days FROM service_calendar LIMIT 1")).first()
+    if window is None:
+        return
+    start = _as_date(window.window_start)
+    conn.execute(text("CREATE TEMP TABLE service_days (service_date DATE, weekday INTEGER)"))
+    days = [start + timedelta(days=i) for i in range(window.window_days)]
+    conn.execute(
+        text("INSERT INTO service_days VALUES (:service_date, :weekday)"),
+        [{"service_date": day, "weekday": day.weekday()} for day in days],
+    )
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO service_dates (service_date, service_id)
+            SELECT service_date, service_id FROM (
+                SELECT d.service_date, c.service_id
+                FROM calendar c
+                JOIN service_days d
+                  ON d.service_date BETWEEN c.start_date AND c.end_date
+                 AND {weekday_flag_sql("d.weekday", "c.")} = true
+                WHERE c.service_id IN (SELECT DISTINCT service_id FROM trips_rail)
+                UNION
+                SELECT date, service_id FROM calendar_dates
+                WHERE exception_type = 1
+                  AND service_id IN (SELECT DISTINCT service_id FROM trips_rail)
+                EXCEPT
+                SELECT date, service_id FROM calendar_dates
+                WHERE exception_type = 2
+            ) days
+            ORDER BY service_date, service_id
+            """
+        )
+    )
+    conn.execute(text("DROP TABLE service_days"))
+
+
+def load_service_calendar(conn: Connection) -> Optional[ServiceCalendar]:
+    """Read ``service_calendar``; None when the database predates it."""
+    if not inspect(conn).has_table(SERVICE_CALENDAR_TABLE):
+        return None
+    rows = conn.execute(text("SELECT service_id, window_start, window_days, bitmap FROM service_calendar")).all()
+    if not rows:
+        return ServiceCalendar(date.today(), 0, {})
+    return ServiceCalendar(
+        window_start=_as_date(rows[0].window_start),
+        window_days=rows[0].window_days,
+        bitmaps={row.service_id: int.from_bytes(bytes(row.bitmap), "little") for row in rows},
+    )
+
+
+def get_service_calendar(session: Session) -> Optional[ServiceCalendar]:
+    return engine_cached(session, SERVICE_CALENDAR_TABLE, load_service_calendar)
+
+
+def has_service_dates(session: Session) -> bool:
+    return engine_cached(session, SERVICE_DATES_TABLE, lambda conn: inspect(conn).has_table(SERVICE_DATES_TABLE))
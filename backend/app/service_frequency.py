@@ -0,0 +1,378 @@
+"""
+Precomputed service frequency: how often trains run, per day type.
+
+Ingestion picks one representative service day per day type (weekday, saturday,
+sunday): the day of that type in the feed window with the median number of rail
+trips, so holidays and one-off extra services do not skew it. From those days it
+materializes
+
+* ``station_frequency_rail``: departures per station, route, terminus and hour,
+  with the headway (time since the previous departure of the same route towards
+  the same terminus) summarized per hour;
+* ``od_frequency_rail``: per ordered station pair with a direct train, the number
+  of trips, first/last departure, fastest travel time, headway statistics and the
+  sorted departure times.
+
+"How often do trains run between X and Y on Saturdays" is then one indexed row
+lookup instead of listing and counting departures. Hours and times are GTFS service
+day seconds, so a 00:30 departure of the previous service day counts as hour 24.
+"""
+
+import statistics
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from .cache import cached
+from .db import engine_cached
+from .query_planner import _station_key, resolve_station
+
+DAY_TYPES = ("weekday", "saturday", "sunday")
+_DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+FREQUENCY_DAYS_SQL = """
+CREATE TABLE frequency_days_rail AS
+WITH daily AS (
+    SELECT
+        sd.service_date,
+        CASE isodow(sd.service_date) WHEN 6 THEN 'saturday' WHEN 7 THEN 'sunday' ELSE 'weekday' END AS day_type,
+        count(*) AS trips
+    FROM service_dates sd
+    JOIN trips_rail t ON t.service_id = sd.service_id
+    GROUP BY 1, 2
+),
+ranked AS (
+    SELECT
+        *,
+        row_number() OVER (PARTITION BY day_type ORDER BY trips, service_date) AS position,
+        count(*) OVER (PARTITION BY day_type) AS days
+    FROM daily
+)
+SELECT day_type, service_date, CAST(trips AS INTEGER) AS trips, CAST(days AS INTEGER) AS days
+FROM ranked
+WHERE position = (days + 1) // 2
+"""
+
+STATION_FREQUENCY_SQL = """
+CREATE TABLE station_frequency_rail AS
+WITH departures AS (
+    SELECT
+        d.day_type,
+        ss.station_id,
+        t.route_id,
+        terminus.station_id AS terminus_station_id,
+        st.departure_time,
+        st.departure_time - lag(st.departure_time) OVER (
+            PARTITION BY d.day_type, ss.station_id, t.route_id, terminus.station_id
+            ORDER BY st.departure_time
+        ) AS headway
+    FROM frequency_days_rail d
+    JOIN service_dates sd ON sd.service_date = d.service_date
+    JOIN trips_rail t ON t.service_id = sd.service_id
+    JOIN trip_patterns_rail tp ON tp.trip_id = t.trip_id
+    JOIN pattern_stops_rail last_stop
+      ON last_stop.pattern_id = tp.pattern_id
+     AND last_stop.stop_pos = len(tp.departure_times) - 1
+    JOIN station_stops_rail terminus ON terminus.stop_id = last_stop.stop_id
+    JOIN stop_times_rail st ON st.trip_id = t.trip_id
+    JOIN station_stops_rail ss ON ss.stop_id = st.stop_id
+    -- The last stop of a trip is an arrival only
+    WHERE st.stop_pos < last_stop.stop_pos
+)
+SELECT
+    station_id,
+    day_type,
+    route_id,
+    terminus_station_id,
+    CAST(departure_time // 3600 AS INTEGER) AS departure_hour,
+    CAST(count(*) AS INTEGER) AS departures,
+    min(headway) AS headway_min,
+    CAST(floor(median(headway)) AS INTEGER) AS headway_median,
+    max(headway) AS headway_max
+FROM departures
+GROUP BY ALL
+ORDER BY station_id, day_type, route_id, terminus_station_id, departure_hour
+"""
+
+OD_FREQUENCY_SQL = """
+CREATE TABLE od_frequency_rail AS
+WITH pairs AS (
+    -- Station pairs each pattern serves, boarding at its first platform of the origin
+    SELECT
+        od.pattern_id,
+        so.station_id AS origin_station_id,
+        sd.station_id AS dest_station_id,
+        min(od.origin_pos) AS origin_pos,
+        min(od.dest_pos) AS dest_pos
+    FROM pattern_od_rail od
+    JOIN station_stops_rail so ON so.stop_id = od.origin_id
+    JOIN station_stops_rail sd ON sd.stop_id = od.dest_id
+    WHERE so.station_id <> sd.station_id
+    GROUP BY ALL
+),
+legs AS (
+    SELECT
+        d.day_type,
+        p.origin_station_id,
+        p.dest_station_id,
+        tp.departure_times[p.origin_pos + 1] AS departure,
+        tp.arrival_times[p.dest_pos + 1] AS arrival
+    FROM frequency_days_rail d
+    JOIN service_dates sd ON sd.service_date = d.service_date
+    JOIN trips_rail t ON t.service_id = sd.service_id
+    JOIN trip_patterns_rail tp ON tp.trip_id = t.trip_id
+    JOIN pairs p ON p.pattern_id = tp.pattern_id
+),
+summary AS (
+    SELECT
+        origin_station_id,
+        dest_station_id,
+        day_type,
+        list(departure ORDER BY departure) AS departures,
+        min(arrival - departure) AS fastest_seconds
+    FROM legs
+    GROUP BY ALL
+),
+gaps AS (
+    SELECT *, list_transform(range(1, len(departures)), i -> departures[i + 1] - departures[i]) AS headways
+    FROM summary
+)
+SELECT
+    origin_station_id,
+    dest_station_id,
+    day_type,
+    CAST(len(departures) AS INTEGER) AS trips,
+    departures[1] AS first_departure,
+    departures[-1] AS last_departure,
+    fastest_seconds,
+    list_min(headways) AS headway_min,
+    CAST(floor(list_median(headways)) AS INTEGER) AS headway_median,
+    list_max(headways) AS headway_max,
+    departures
+FROM gaps
+ORDER BY origin_station_id, dest_station_id, day_type
+"""
+
+
+@dataclass(frozen=True)
+class FrequencyDay:
+    day_type: str
+    # The representative day the aggregates were computed from
+    service_date: date
+    # Days of this type in the feed window
+    days: int
+
+
+def has_frequency_tables(session: Session) -> bool:
+    return engine_cached(session, "od_frequency_rail", lambda conn: inspect(conn).has_table("od_frequency_rail"))
+
+
+def resolve_day_type(value: str) -> str:
+    """
+    Day type for "weekday"/"weekdays", "saturday"/"sunday" (or any weekday name, also
+    plural) or a YYYY-MM-DD date; ValueError otherwise.
+    """
+    name = value.strip().lower()
+    singular = name[:-1] if name.endswith("s") else name
+    if name in DAY_TYPES or singular in DAY_TYPES:
+        return name if name in DAY_TYPES else singular
+    if singular in _DAY_NAMES:
+        return day_type_of_weekday(_DAY_NAMES.index(singular))
+    try:
+        return day_type_of_weekday(date.fromisoformat(name).weekday())
+    except ValueError:
+        raise ValueError(f"Unknown day: {value!r} (use weekday, saturday, sunday or YYYY-MM-DD)") from None
+
+
+def day_type_of_weekday(weekday: int) -> str:
+    return DAY_TYPES[max(weekday - 4, 0)]
+
+
+def frequency_days(session: Session) -> Dict[str, FrequencyDay]:
+    def load(conn) -> Dict[str, FrequencyDay]:
+        rows = conn.execute(text("SELECT day_type, service_date, days FROM frequency_days_rail")).all()
+        return {row.day_type: FrequencyDay(row.day_type, row.service_date, row.days) for row in rows}
+
+    return engine_cached(session, "frequency_days_rail", load)
+
+
+def _headways(departures: Sequence[int]) -> dict:
+    gaps = [later - earlier for earlier, later in zip(departures, departures[1:])]
+    if not gaps:
+        return {"headway_min": None, "headway_median": None, "headway_max": None}
+    return {"headway_min": min(gaps), "headway_median": int(statistics.median(gaps)), "headway_max": max(gaps)}
+
+
+@cached(
+    "od_frequency",
+    key=lambda session, origin_name, destination_name, day_type, after, before: (
+        _station_key(session, origin_name),
+        _station_key(session, destination_name),
+        day_type,
+        after,
+        before,
+    ),
+)
+def od_frequency(
+    session: Session,
+    origin_name: str,
+    destination_name: str,
+    day_type: str,
+    after: int = 0,
+    before: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    How often direct trains run from one station to another on a representative day
+    of ``day_type``, counting departures between ``after`` and ``before`` (seconds,
+    default: the whole service day). None when either station is unknown.
+
+    Without a window the stored whole-day figures are returned as they are; with one,
+    the counts and headways are recomputed from the pair's stored departure times.
+    """
+    origin = resolve_station(session, origin_name)
+    destination = resolve_station(session, destination_name)
+    if origin is None or destination is None:
+        return None
+    day = frequency_days(session).get(day_type)
+    result = {
+        "origin": origin,
+        "destination": destination,
+        "day_type": day_type,
+        "service_date": day.service_date if day else None,
+        "trips": 0,
+        "first_departure": None,
+        "last_departure": None,
+        "fastest_seconds": None,
+        "headway_min": None,
+        "headway_median": None,
+        "headway_max": None,
+        "hourly": {},
+    }
+    row = session.execute(
+        text(
+            """
+            SELECT trips, first_departure, last_departure, fastest_seconds,
+                   headway_min, headway_median, headway_max, departures
+            FROM od_frequency_rail
+            WHERE origin_station_id = :origin AND dest_station_id = :destination AND day_type = :day_type
+            """
+        ),
+        {"origin": origin.station_id, "destination": destination.station_id, "day_type": day_type},
+    ).first()
+    if row is None:
+        return result
+
+    departures = list(row.departures)
+    if after or before is not None:
+        departures = [t for t in departures if t >= after and (before is None or t <= before)]
+        summary = {"trips": len(departures), **_headways(departures)}
+        if departures:
+            summary.update(first_departure=departures[0], last_departure=departures[-1])
+    else:
+        summary = {
+            "trips": row.trips,
+            "first_departure": row.first_departure,
+            "last_departure": row.last_departure,
+            "headway_min": row.headway_min,
+            "headway_median": row.headway_median,
+            "headway_max": row.headway_max,
+        }
+    if departures:
+        result.update(summary, fastest_seconds=row.fastest_seconds)
+    result["hourly"] = dict(sorted(Counter(t // 3600 for t in departures).items()))
+    return result
+
+
+@cached(
+    "station_frequency",
+    key=lambda session, station_name, day_type, after, before: (
+        _station_key(session, station_name),
+        day_type,
+        after,
+        before,
+    ),
+)
+def station_frequency(
+    session: Session,
+    station_name: str,
+    day_type: str,
+    after: int = 0,
+    before: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    Departures from a station on a representative day of ``day_type``: per hour and
+    per route and terminus, in the hours from ``after`` to ``before`` (seconds,
+    rounded to whole hours; default: the whole service day). None when the station
+    is unknown.
+    """
+    station = resolve_station(session, station_name)
+    if station is None:
+        return None
+    rows = session.execute(
+        text(
+            """
+            SELECT
+                f.route_id,
+                r.route_short_name,
+                r.agency_name,
+                terminus.station_name AS terminus,
+                f.departure_hour,
+                f.departures,
+                f.headway_min,
+                f.headway_max
+            FROM station_frequency_rail f
+            LEFT JOIN routes_rail_with_agency r ON r.route_id = f.route_id
+            LEFT JOIN (
+                SELECT DISTINCT station_id, station_name FROM station_stops_rail
+            ) terminus ON terminus.station_id = f.terminus_station_id
+            WHERE f.station_id = :station
+              AND f.day_type = :day_type
+              AND f.departure_hour BETWEEN :first_hour AND :last_hour
+            ORDER BY f.route_id, f.terminus_station_id, f.departure_hour
+            """
+        ),
+        {
+            "station": station.station_id,
+            "day_type": day_type,
+            "first_hour": after // 3600,
+            "last_hour": (before // 3600) if before is not None else 1_000,
+        },
+    ).all()
+
+    hourly: Counter = Counter()
+    routes: Dict[tuple, dict] = {}
+    for row in rows:
+        hourly[row.departure_hour] += row.departures
+        route = routes.setdefault(
+            (row.route_id, row.terminus),
+            {
+                "route_id": row.route_id,
+                "route_short_name": row.route_short_name,
+                "agency_name": row.agency_name,
+                "terminus": row.terminus,
+                "departures": 0,
+                "busiest_hour_departures": 0,
+                "headway_min": None,
+                "headway_max": None,
+            },
+        )
+        route["departures"] += row.departures
+        route["busiest_hour_departures"] = max(route["busiest_hour_departures"], row.departures)
+        for key, pick in (("headway_min", min), ("headway_max", max)):
+            value = getattr(row, key)
+            if value is not None:
+                route[key] = value if route[key] is None else pick(route[key], value)
+
+    day = frequency_days(session).get(day_type)
+    return {
+        "station": station,
+        "day_type": day_type,
+        "service_date": day.service_date if day else None,
+        "departures": sum(hourly.values()),
+        "hourly": dict(sorted(hourly.items())),
+        "routes": sorted(routes.values(), key=lambda route: (-route["departures"], route["route_id"])),
+    }
@@ -0,0 +1,234 @@
+"""
+Precomputed, simplified trip geometries for map rendering.
+
+Ingestion turns every rail shape into encoded polylines (Google's polyline
+format, 1e-5 degree precision) at several Douglas-Peucker tolerances, stored
+with the shape's bounding box in ``shape_geometries_rail``. Douglas-Peucker
+runs once per shape: each point records the distance at which it would be
+split off, capped by its parent's, so the points kept at tolerance ``t`` are
+exactly those whose distance exceeds ``t`` and every level nests in the finer
+ones.
+
+A request picks the coarsest level that is still finer than a screen pixel at
+the requested web-map zoom (or, without a zoom, than one of ``FIT_PIXELS``
+across the shape's bounding box) from the shape's few stored levels: no point
+rows are scanned per request.
+"""
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .cache import cached
+from .db import engine_cached
+
+SHAPE_GEOMETRIES_TABLE = "shape_geometries_rail"
+# Simplification tolerances in metres, finest first
+TOLERANCES_M = (1, 10, 50, 250, 1000)
+# Width in pixels a shape is fitted to when no zoom level is given
+FIT_PIXELS = 1000
+EARTH_RADIUS_M = 6_371_008.8
+# Metres per pixel at zoom 0 on the equator (256 px Web Mercator tiles)
+ZOOM0_METRES_PER_PIXEL = 2 * math.pi * EARTH_RADIUS_M / 256
+
+SHAPE_GEOMETRIES_DDL = """
+CREATE TABLE shape_geometries_rail (
+    shape_id VARCHAR NOT NULL,
+    tolerance_m INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    polyline VARCHAR NOT NULL,
+    min_lat DOUBLE PRECISION NOT NULL,
+    min_lon DOUBLE PRECISION NOT NULL,
+    max_lat DOUBLE PRECISION NOT NULL,
+    max_lon DOUBLE PRECISION NOT NULL
+)
+"""
+
+
+def split_distances(lats: np.ndarray, lons: np.ndarray, floor: float = 0.0) -> np.ndarray:
+    """
+    Douglas-Peucker significance of every point, in metres: the point is kept at
+    any tolerance below it. Endpoints are infinitely significant. Segments are not
+    split below ``floor``, leaving their points at 0 (fine for tolerances >= floor).
+    """
+    n = len(lats)
+    significance = np.zeros(n)
+    significance[[0, -1]] = np.inf
+    if n < 3:
+        return significance
+    # Local equirectangular projection, accurate to well under a metre per shape
+    scale = EARTH_RADIUS_M * math.pi / 180
+    x = lons * scale * math.cos(math.radians(float(np.mean(lats))))
+    y = lats * scale
+
+    stack = [(0, n - 1, math.inf)]
+    while stack:
+        start, end, cap = stack.pop()
+        if end - start < 2:
+            continue
+        px, py = x[start + 1 : end], y[start + 1 : end]
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        length = dx * dx + dy * dy
+        if length == 0:
+            distance = np.hypot(px - x[start], py - y[start])
+        else:
+            along = np.clip(((px - x[start]) * dx + (py - y[start]) * dy) / length, 0, 1)
+            distance = np.hypot(px - x[start] - along * dx, py - y[start] - along * dy)
+        split = int(np.argmax(distance))
+        value = min(float(distance[split]), cap)
+        if value <= floor:
+            continue
+        split += start + 1
+        significance[split] = value
+        stack.append((start, split, value))
+        stack.append((split, end, value))
+    return significance
+
+
+def _encode_values(values: np.ndarray) -> str:
+    chunks = []
+    for value in values.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def encode_polyline(lats: Sequence[float], lons: Sequence[float]) -> str:
+    """Google encoded polyline of the points (precision 5)."""
+    coords = np.round(np.column_stack([lats, lons]) * 1e5).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return _encode_values(deltas.ravel())
+
+
+def decode_polyline(polyline: str) -> List[Tuple[float, float]]:
+    """(lat, lon) pairs of a Google encoded polyline (precision 5)."""
+    values, value, shift = [], 0, 0
+    for char in polyline:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 1e5
+    return [(lat, lon) for lat, lon in coords.tolist()]
+
+
+def shape_levels(lats: np.ndarray, lons: np.ndarray) -> List[Tuple[int, int, str]]:
+    """(tolerance_m, points, polyline) per tolerance in ``TOLERANCES_M``."""
+    significance = split_distances(lats, lons, floor=TOLERANCES_M[0])
+    levels = []
+    for tolerance in TOLERANCES_M:
+        kept = significance > tolerance
+        levels.append((tolerance, int(kept.sum()), encode_polyline(lats[kept], lons[kept])))
+    return levels
+
+
+def build_shape_geometries(conn: Connection) -> None:
+    """Fill ``shape_geometries_rail`` (created by the rail step) from ``shapes_rail``."""
+    rows = conn.execute(
+        text(
+            """
+            SELECT shape_id, shape_pt_lat, shape_pt_lon
+            FROM shapes_rail
+            WHERE shape_pt_lat IS NOT NULL AND shape_pt_lon IS NOT NULL
+            ORDER BY shape_id, shape_pt_sequence
+            """
+        )
+    ).all()
+    if not rows:
+        return
+    shape_ids = np.array([row[0] for row in rows], dtype=object)
+    coords = np.array([(row[1], row[2]) for row in rows], dtype=np.float64)
+    starts = np.flatnonzero(np.r_[True, shape_ids[1:] != shape_ids[:-1]])
+    ends = np.r_[starts[1:], len(shape_ids)]
+
+    records = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        lats, lons = coords[start:end, 0], coords[start:end, 1]
+        bbox = {
+            "min_lat": float(lats.min()),
+            "min_lon": float(lons.min()),
+            "max_lat": float(lats.max()),
+            "max_lon": float(lons.max()),
+        }
+        for tolerance, points, polyline in shape_levels(lats, lons):
+            records.append(
+                {"shape_id": shape_ids[start], "tolerance_m": tolerance, "points": points, "polyline": polyline, **bbox}
+            )
+    conn.execute(
+        text(
+            """
+            INSERT INTO shape_geometries_rail
+            VALUES (:shape_id, :tolerance_m, :points, :polyline, :min_lat, :min_lon, :max_lat, :max_lon)
+            """
+        ),
+        records,
+    )
+
+
+def has_shape_geometries(session: Session) -> bool:
+    return engine_cached(
+        session, SHAPE_GEOMETRIES_TABLE, lambda conn: inspect(conn).has_table(SHAPE_GEOMETRIES_TABLE)
+    )
+
+
+def metres_per_pixel(zoom: float, latitude: float) -> float:
+    return ZOOM0_METRES_PER_PIXEL * math.cos(math.radians(latitude)) / 2**zoom
+
+
+def pick_tolerance(pixel_m: float) -> int:
+    """The coarsest stored tolerance no larger than a pixel (the finest if all are)."""
+    fitting = [tolerance for tolerance in TOLERANCES_M if tolerance <= pixel_m]
+    return fitting[-1] if fitting else TOLERANCES_M[0]
+
+
+@cached("trip_geometry")
+def trip_geometry(session: Session, trip_id: str, zoom: Optional[float] = None) -> Optional[dict]:
+    """
+    The simplified geometry of a trip's shape for a web-map ``zoom`` (default: the
+    whole shape fitted to ``FIT_PIXELS``), as an encoded polyline with its bounding
+    box. None when the trip is unknown or has no shape.
+    """
+    levels = {
+        row.tolerance_m: row
+        for row in session.execute(
+            text(
+                """
+                SELECT g.*
+                FROM trips_rail t
+                JOIN shape_geometries_rail g ON g.shape_id = t.shape_id
+                WHERE t.trip_id = :trip_id
+                """
+            ),
+            {"trip_id": trip_id},
+        )
+    }
+    if not levels:
+        return None
+    bbox = next(iter(levels.values()))
+    middle = (bbox.min_lat + bbox.max_lat) / 2
+    if zoom is not None:
+        pixel_m = metres_per_pixel(zoom, middle)
+    else:
+        scale = EARTH_RADIUS_M * math.pi / 180
+        width = (bbox.max_lon - bbox.min_lon) * scale * math.cos(math.radians(middle))
+        height = (bbox.max_lat - bbox.min_lat) * scale
+        pixel_m = math.hypot(width, height) / FIT_PIXELS
+    level = levels[pick_tolerance(pixel_m)]
+    return {
+        "trip_id": trip_id,
+        "shape_id": level.shape_id,
+        "tolerance_m": level.tolerance_m,
+        "points": level.points,
+        "polyline": level.polyline,
+        # GeoJSON order: west, south, east, north
+        "bbox": [level.min_lon, level.min_lat, level.max_lon, level.max_lat],
+    }
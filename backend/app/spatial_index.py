@@ -0,0 +1,211 @@
+"""
+In-memory spatial index of rail stations for nearest-station and map lookups.
+
+Each station sits at the mean position of its platforms (``stops_rail``). Stations
+are bucketed into a uniform grid of ``CELL_DEGREES`` latitude by the longitude
+span of the same ground width at the feed's mean latitude, with station positions
+sorted by cell (row-major), so every grid row of a window is one contiguous slice.
+
+A k-nearest query doubles a square window of cells around the query until the
+k-th best great-circle distance is shorter than the distance to any cell outside
+it; distances are computed for the window's candidates in one vectorized
+haversine.
+Small indexes (under ``SCAN_ALL_BELOW`` stations, e.g. Sweden's ~1,200 rail
+stations) answer k-nearest queries with a single vectorized pass instead.
+A bounding-box query reads the slices of the rows it overlaps and filters them.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .db import engine_cached
+from .stop_index import STATION_STOPS_TABLE, Station, StopIndex, get_stop_index
+
+SPATIAL_INDEX_KEY = "spatial_index"
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+# Grid cell height (~28 km)
+CELL_DEGREES = 0.25
+# Up to this many stations one vectorized pass over all of them beats walking the grid
+SCAN_ALL_BELOW = 2000
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km from (lat, lon) to every (lats, lons)."""
+    phi, phis = math.radians(lat), np.radians(lats)
+    dphi = phis - phi
+    dlambda = np.radians(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi) * np.cos(phis) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+@dataclass(frozen=True)
+class PlacedStation:
+    station: Station
+    lat: float
+    lon: float
+    # Distance from the query point, for nearest-station lookups
+    distance_km: Optional[float] = None
+
+
+class SpatialIndex:
+    """Uniform-grid index over station coordinates."""
+
+    def __init__(self, stations: Sequence[Station], lats: Sequence[float], lons: Sequence[float]):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        self.lat0 = float(lats.min()) if len(lats) else 0.0
+        self.lon0 = float(lons.min()) if len(lons) else 0.0
+        mean_lat = float(lats.mean()) if len(lats) else 0.0
+        self.cell_lat = CELL_DEGREES
+        self.cell_lon = CELL_DEGREES / max(math.cos(math.radians(mean_lat)), 0.01)
+        rows, cols = self._cells(lats, lons)
+        self.rows = int(rows.max()) + 1 if len(lats) else 0
+        self.cols = int(cols.max()) + 1 if len(lats) else 0
+        self.north = self.lat0 + self.rows * self.cell_lat
+
+        cells = rows * self.cols + cols
+        order = np.argsort(cells, kind="stable")
+        self.stations: List[Station] = [stations[i] for i in order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        # offsets[c]: first position of cell c in the sorted arrays
+        self.offsets = np.searchsorted(cells[order], np.arange(self.rows * self.cols + 1))
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def _cells(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.floor((np.asarray(lats) - self.lat0) / self.cell_lat).astype(np.int64)
+        cols = np.floor((np.asarray(lons) - self.lon0) / self.cell_lon).astype(np.int64)
+        return rows, cols
+
+    def _placed(self, position: int, distance_km: Optional[float] = None) -> PlacedStation:
+        return PlacedStation(
+            self.stations[position], float(self.lats[position]), float(self.lons[position]), distance_km
+        )
+
+    def _ring_km(self, lat: float) -> float:
+        """Lower bound on the ground distance one ring of cells adds, anywhere between the query and the grid."""
+        poleward = min(max(abs(lat), abs(self.lat0), abs(self.north)), 89.0)
+        return min(self.cell_lat, self.cell_lon * math.cos(math.radians(poleward))) * KM_PER_DEGREE
+
+    def _window(self, row0: int, row1: int, col0: int, col1: int) -> np.ndarray:
+        """Positions of the stations in cells [row0, row1] x [col0, col1], clipped to the grid."""
+        row0, row1 = max(row0, 0), min(row1, self.rows - 1)
+        col0, col1 = max(col0, 0), min(col1, self.cols - 1)
+        if row0 > row1 or col0 > col1:
+            return np.empty(0, dtype=np.int64)
+        first_cells = np.arange(row0, row1 + 1) * self.cols + col0
+        starts = self.offsets[first_cells]
+        lengths = self.offsets[first_cells + (col1 - col0 + 1)] - starts
+        # Concatenated aranges of the row slices
+        total = int(lengths.sum())
+        return np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 5, max_km: Optional[float] = None
+    ) -> List[PlacedStation]:
+        """Up to ``k`` stations closest to (lat, lon), nearest first, with distances in km."""
+        if not self.stations or k <= 0:
+            return []
+        if len(self.stations) < SCAN_ALL_BELOW:
+            found = np.arange(len(self.stations))
+            distances = haversine_km(lat, lon, self.lats, self.lons)
+            if max_km is not None:
+                keep = distances <= max_km
+                found, distances = found[keep], distances[keep]
+            return self._ranked(found, distances, k)
+        (row,), (col,) = self._cells([lat], [lon])
+        # Rings needed before the window covers the whole grid from wherever the query is,
+        # and before it reaches the grid at all
+        last_ring = int(max(abs(row), abs(row - self.rows + 1), abs(col), abs(col - self.cols + 1)))
+        first_ring = int(max(-row, row - self.rows + 1, -col, col - self.cols + 1, 1))
+        ring_km = self._ring_km(lat)
+        ring = first_ring
+        while True:
+            found = self._window(row - ring, row + ring, col - ring, col + ring)
+            if len(found):
+                distances = haversine_km(lat, lon, self.lats[found], self.lons[found])
+                # Anything outside the window is at least `ring` whole cells away
+                reach = ring * ring_km
+                if max_km is not None:
+                    keep = distances <= max_km
+                    found, distances = found[keep], distances[keep]
+                if len(found) >= k:
+                    best = np.argpartition(distances, k - 1)[:k]
+                    if distances[best].max() <= reach:
+                        break
+                if max_km is not None and reach >= max_km:
+                    break
+            if ring >= last_ring:
+                break
+            ring = min(ring * 2, last_ring)
+        return self._ranked(found, distances, k)
+
+    def _ranked(self, found: np.ndarray, distances: np.ndarray, k: int) -> List[PlacedStation]:
+        if k < len(found):
+            # Ties at the k-th distance are settled by position below
+            cutoff = np.partition(distances, k - 1)[k - 1]
+            close = distances <= cutoff
+            found, distances = found[close], distances[close]
+        best = np.lexsort((found, distances))[:k]
+        return [self._placed(int(found[i]), float(distances[i])) for i in best.tolist()]
+
+    def within(
+        self, south: float, west: float, north: float, east: float, limit: Optional[int] = None
+    ) -> List[PlacedStation]:
+        """Stations inside the bounding box, busiest first."""
+        if not self.stations:
+            return []
+        (row0, row1), (col0, col1) = self._cells([south, north], [west, east])
+        found = self._window(int(row0), int(row1), int(col0), int(col1))
+        inside = (
+            (self.lats[found] >= south)
+            & (self.lats[found] <= north)
+            & (self.lons[found] >= west)
+            & (self.lons[found] <= east)
+        )
+        found = found[inside]
+        ranked = sorted(found.tolist(), key=lambda i: (-self.stations[i].departures, self.stations[i].station_id))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self._placed(i) for i in ranked]
+
+
+def load_spatial_index(conn: Connection, stop_index: StopIndex) -> SpatialIndex:
+    if inspect(conn).has_table(STATION_STOPS_TABLE):
+        sql = """
+            SELECT ss.station_id, avg(s.stop_lat) AS lat, avg(s.stop_lon) AS lon
+            FROM station_stops_rail ss
+            JOIN stops_rail s ON s.stop_id = ss.stop_id
+            WHERE s.stop_lat IS NOT NULL AND s.stop_lon IS NOT NULL
+            GROUP BY ss.station_id
+        """
+    else:
+        # Databases built before station_stops_rail: stops sharing a name form a station
+        sql = """
+            SELECT stop_name AS station_id, avg(stop_lat) AS lat, avg(stop_lon) AS lon
+            FROM stops_rail
+            WHERE stop_lat IS NOT NULL AND stop_lon IS NOT NULL
+            GROUP BY stop_name
+        """
+    stations, lats, lons = [], [], []
+    for station_id, lat, lon in conn.execute(text(sql)):
+        station = stop_index.station(station_id)
+        if station is not None:
+            stations.append(station)
+            lats.append(lat)
+            lons.append(lon)
+    return SpatialIndex(stations, lats, lons)
+
+
+def get_spatial_index(session: Session) -> SpatialIndex:
+    stop_index = get_stop_index(session)
+    return engine_cached(session, SPATIAL_INDEX_KEY, lambda conn: load_spatial_index(conn, stop_index))
@@ -0,0 +1,294 @@
+"""
+Rail stations and the in-memory index that finds them by name.
+
+Ingestion groups every rail stop into a station in ``station_stops_rail``: the
+stop's parent_station, else the parent station of another stop in the same stop
+area, else the area itself (stop_areas/areas), else the stop on its own. A name
+resolves to one station and then to exactly that station's platform stop_ids.
+
+Names are normalized once per feed version: lower-cased, Swedish diacritics folded
+("Göteborg" -> "goteborg"), punctuation dropped and common abbreviations expanded
+("C", "Centralstation" -> "central"; "St" -> "sankt"; "station" is dropped). Every
+prefix of every token maps to the names containing it, so a query is a dict lookup
+per token plus a set intersection. The last query token may be half-typed, so it
+matches both as written and expanded ("St" finds Stockholm and St Eriksplan). Matches are ranked by how well they match, then
+by how many departures the station has, so "Stockholm" finds Stockholm Central
+before a suburb.
+"""
+
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .db import engine_cached
+
+STOP_INDEX_KEY = "stop_index"
+STATION_STOPS_TABLE = "station_stops_rail"
+RECENT_QUERIES = 4096
+
+# Token -> canonical form; None drops the token
+ABBREVIATIONS: Dict[str, Optional[str]] = {
+    "c": "central",
+    "cst": "central",
+    "centralstation": "central",
+    "centralen": "central",
+    "station": None,
+    "stn": None,
+    # In Swedish station names "St" is "Sankt" (St Eriksplan), not "station"
+    "st": "sankt",
+    "järnvägsstation": None,
+    "jarnvagsstation": None,
+}
+
+_SEPARATORS = re.compile(r"[^\w]+")
+
+STATION_STOPS_DDL = """
+CREATE TABLE station_stops_rail (
+    station_id VARCHAR NOT NULL,
+    station_name VARCHAR,
+    stop_id VARCHAR NOT NULL
+)
+"""
+
+
+def _fold(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _canonical(token: str) -> Optional[str]:
+    token = ABBREVIATIONS.get(token, token)
+    if token is None:
+        return None
+    folded = _fold(token)
+    return ABBREVIATIONS.get(folded, folded) or None
+
+
+def normalize_tokens(value: str) -> Tuple[str, ...]:
+    """'Göteborg C' -> ('goteborg', 'central')."""
+    return tuple(
+        canonical
+        for canonical in (_canonical(token) for token in _SEPARATORS.split(value.casefold()) if token)
+        if canonical is not None
+    )
+
+
+def query_terms(value: str) -> Tuple[Tuple[str, ...], ...]:
+    """
+    Per query token, the prefixes that satisfy it: 'Göteborg St' -> (('goteborg',), ('sankt', 'st')).
+
+    Only complete words are expanded; the trailing token may still be typed, so it
+    also matches as written ("St" -> Stockholm, "C" -> Cst). A trailing abbreviation
+    that is dropped ("station") adds no term, as in ``normalize_tokens``.
+    """
+    words = [token for token in _SEPARATORS.split(value.casefold()) if token]
+    terms = []
+    for position, token in enumerate(words):
+        canonical = _canonical(token)
+        if canonical is None:
+            continue
+        alternatives = (canonical,)
+        raw = _fold(token)
+        if position == len(words) - 1 and raw and raw != canonical:
+            alternatives += (raw,)
+        terms.append(alternatives)
+    return tuple(terms)
+
+
+@dataclass(frozen=True)
+class Station:
+    station_id: str
+    name: str
+    # Platform-level stop_ids, busiest first
+    stop_ids: Tuple[str, ...]
+    departures: int
+    tokens: Tuple[str, ...]
+    token_set: FrozenSet[str]
+    normalized: str
+
+
+class StopIndex:
+    """Ranked, accent- and abbreviation-insensitive lookup of rail stations by name."""
+
+    def __init__(self, stops: List[Tuple[str, str, str, str, int]]):
+        """``stops``: (station_id, station_name, stop_id, stop_name, departures) rows."""
+        grouped: Dict[str, List[Tuple[str, str, str, int]]] = defaultdict(list)
+        for station_id, station_name, stop_id, stop_name, departures in stops:
+            grouped[station_id].append((station_name or stop_name or "", stop_id, stop_name or "", departures or 0))
+
+        self._stations: List[Station] = []
+        prefixes: Dict[str, Set[int]] = defaultdict(set)
+        for station_id in sorted(grouped):
+            members = sorted(grouped[station_id], key=lambda m: (-m[3], m[1]))
+            name = members[0][0]
+            if not name:
+                continue
+            tokens = normalize_tokens(name)
+            position = len(self._stations)
+            self._stations.append(
+                Station(
+                    station_id=station_id,
+                    name=name,
+                    stop_ids=tuple(stop_id for _, stop_id, _, _ in members),
+                    departures=sum(deps for _, _, _, deps in members),
+                    tokens=tokens,
+                    token_set=frozenset(tokens),
+                    normalized=" ".join(tokens),
+                )
+            )
+            # Platform names that differ from the station's still find it
+            for alias in {tokens} | {normalize_tokens(stop_name) for _, _, stop_name, _ in members}:
+                for token in alias:
+                    for end in range(1, len(token) + 1):
+                        prefixes[token[:end]].add(position)
+        self._prefixes: Dict[str, FrozenSet[int]] = {key: frozenset(value) for key, value in prefixes.items()}
+        self._by_id: Dict[str, Station] = {station.station_id: station for station in self._stations}
+        # Recent (query terms, limit) -> result; the index is immutable so entries never go stale
+        self._recent: Dict[Tuple[Tuple[str, ...], int], List[Station]] = {}
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    @property
+    def stations(self) -> Tuple[Station, ...]:
+        return tuple(self._stations)
+
+    @staticmethod
+    def _rank(station: Station, query: Tuple[Tuple[str, ...], ...], substring: bool) -> Tuple:
+        if substring:
+            tier = 4
+        elif len(station.tokens) == len(query) and all(t in alts for t, alts in zip(station.tokens, query)):
+            tier = 0
+        elif all(any(alt in station.token_set for alt in alts) for alts in query):
+            tier = 1
+        elif station.tokens and station.tokens[0].startswith(query[0]):
+            tier = 2
+        else:
+            tier = 3
+        return (tier, -station.departures, len(station.tokens), station.name, station.station_id)
+
+    def search_stations(self, query: str, limit: int = 10) -> List[Station]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        cached = self._recent.get((terms, limit))
+        if cached is not None:
+            return cached
+
+        matches: Optional[FrozenSet[int]] = None
+        for alternatives in terms:
+            hits = frozenset().union(*(self._prefixes.get(alt, frozenset()) for alt in alternatives))
+            matches = hits if matches is None else matches & hits
+            if not matches:
+                break
+
+        substring = not matches
+        if substring:
+            # Mid-word queries ("borg") still match, like the ILIKE '%name%' this replaces
+            needle = " ".join(alternatives[0] for alternatives in terms)
+            matches = frozenset(i for i, station in enumerate(self._stations) if needle in station.normalized)
+
+        ranked = heapq.nsmallest(
+            limit,
+            (self._stations[i] for i in matches),
+            key=lambda station: self._rank(station, terms, substring),
+        )
+        if len(self._recent) >= RECENT_QUERIES:
+            self._recent.clear()
+        self._recent[(terms, limit)] = ranked
+        return ranked
+
+    def station(self, station_id: str) -> Optional[Station]:
+        return self._by_id.get(station_id)
+
+    def resolve(self, query: str) -> Optional[Station]:
+        """The single best station for ``query``."""
+        ranked = self.search_stations(query, limit=1)
+        return ranked[0] if ranked else None
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Best-ranked stations as ``{"stop_id", "stop_name"}`` rows (station-level ids)."""
+        return [
+            {"stop_id": station.station_id, "stop_name": station.name}
+            for station in self.search_stations(query, limit)
+        ]
+
+
+def build_station_stops(conn: Connection) -> None:
+    """Fill ``station_stops_rail`` (created by the rail step); stop_areas/areas are optional."""
+    tables = inspect(conn)
+    with_areas = tables.has_table("stop_areas")
+    area_join, area_columns = "", ("NULL", "NULL", "NULL")
+    if with_areas:
+        area_join = """
+            LEFT JOIN (
+                SELECT stop_id, min(area_id) AS area_id FROM stop_areas GROUP BY stop_id
+            ) sa ON sa.stop_id = s.stop_id AND p.stop_id IS NULL
+            LEFT JOIN (
+                SELECT sa2.area_id, min(s2.parent_station) AS parent_station
+                FROM stop_areas sa2
+                JOIN stops s2 ON s2.stop_id = sa2.stop_id
+                WHERE s2.parent_station IS NOT NULL AND s2.parent_station <> ''
+                GROUP BY sa2.area_id
+            ) ap ON ap.area_id = sa.area_id
+            LEFT JOIN stops ap_stop ON ap_stop.stop_id = ap.parent_station
+        """
+        area_columns = ("ap_stop.stop_id", "ap_stop.stop_name", "sa.area_id")
+        if tables.has_table("areas"):
+            area_join += " LEFT JOIN areas a ON a.area_id = sa.area_id"
+            area_name = "a.area_name"
+        else:
+            area_name = "NULL"
+    else:
+        area_name = "NULL"
+    area_parent_id, area_parent_name, area_id = area_columns
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO station_stops_rail (station_id, station_name, stop_id)
+            SELECT
+                coalesce(p.stop_id, {area_parent_id}, {area_id}, s.stop_id),
+                coalesce(p.stop_name, {area_parent_name}, {area_name}, s.stop_name),
+                s.stop_id
+            FROM stops_rail s
+            LEFT JOIN stops p ON p.stop_id = s.parent_station
+            {area_join}
+            """
+        )
+    )
+
+
+def load_stop_index(conn: Connection) -> StopIndex:
+    departures = """
+        LEFT JOIN (
+            SELECT stop_id, count(*) AS departures FROM stop_times_rail GROUP BY stop_id
+        ) d ON d.stop_id = s.stop_id
+    """
+    if inspect(conn).has_table(STATION_STOPS_TABLE):
+        sql = f"""
+            SELECT ss.station_id, ss.station_name, s.stop_id, s.stop_name, coalesce(d.departures, 0) AS departures
+            FROM station_stops_rail ss
+            JOIN stops_rail s ON s.stop_id = ss.stop_id
+            {departures}
+        """
+    else:
+        # Databases built before station_stops_rail: stops sharing a name form a station
+        sql = f"""
+            SELECT s.stop_name AS station_id, s.stop_name AS station_name, s.stop_id, s.stop_name,
+                   coalesce(d.departures, 0) AS departures
+            FROM stops_rail s
+            {departures}
+        """
+    rows = conn.execute(text(sql)).all()
+    return StopIndex([tuple(row) for row in rows])
+
+
+def get_stop_index(session: Session) -> StopIndex:
+    return engine_cached(session, STOP_INDEX_KEY, load_stop_index)
@@ -0,0 +1,407 @@
+"""
+In-memory timetable for the rail subset (``TIMETABLE_ENGINE=memory``).
+
+The ``*_rail`` tables are loaded once per feed version into NumPy arrays with
+integer-encoded stops, trips and routes. stop_times rows are stored in trip order
+(``trip_ptr`` delimits each trip, so a trip's rows are one slice), and a second,
+CSR-style view groups row numbers by stop sorted by departure (``stop_ptr`` /
+``stop_rows``), so "what leaves these platforms after 14:00" is a binary search
+per platform. Because rows are in trip order, a later row of the same trip is a
+later stop, which is all a point-to-point match needs.
+
+The SQL path in ``app.query_planner`` stays the default and the fallback: with
+``TIMETABLE_ENGINE=sql`` or a database without the rail tables, ``get_timetable``
+returns None.
+"""
+
+import bisect
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .db import engine_cached
+from .service_calendar import ServiceCalendar, load_service_calendar
+
+TIMETABLE_KEY = "timetable"
+# Trip masks kept per travel date; the timetable is immutable so entries never go stale
+RECENT_DATES = 64
+# Stored for stop_times without a time (non-timepoints); listed last, as SQL lists NULLs,
+# and never matched by a time filter
+NO_TIME = -1
+
+
+def _fetch_columns(conn: Connection, sql: str) -> Dict[str, np.ndarray]:
+    """Run ``sql`` and return its columns as arrays (DuckDB hands them over without row objects)."""
+    result = conn.execute(text(sql))
+    if hasattr(result.cursor, "fetchnumpy"):
+        return {name: np.asarray(values) for name, values in result.cursor.fetchnumpy().items()}
+    rows = result.all()
+    return {
+        name: np.array([row[i] for row in rows]) if rows else np.array([])
+        for i, name in enumerate(result.keys())
+    }
+
+
+def _nulls_last(times: np.ndarray) -> np.ndarray:
+    """Sort keys for ``times`` with missing times after all others, like NULLs in SQL."""
+    return np.where(times == NO_TIME, np.iinfo(np.int32).max, times)
+
+
+def _time_or_none(value) -> Optional[int]:
+    return int(value) if value != NO_TIME else None
+
+
+def _slices(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate ``arange(start, end)`` for each pair, without a Python loop."""
+    counts = ends - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+class Timetable:
+    """Rail stop_times as arrays, indexed by trip and by stop."""
+
+    def __init__(
+        self,
+        stops: Dict[str, np.ndarray],
+        trips: Dict[str, np.ndarray],
+        routes: Dict[str, np.ndarray],
+        stop_times: Dict[str, np.ndarray],
+        calendar: Optional[ServiceCalendar] = None,
+    ):
+        # Stops and trips are sorted by id; a code is the position in that order
+        self.stop_ids: List[str] = stops["stop_id"].tolist()
+        self.stop_names: List[str] = stops["stop_name"].tolist()
+        self.stop_codes: Dict[str, int] = {stop_id: code for code, stop_id in enumerate(self.stop_ids)}
+        self.trip_ids: List[str] = trips["trip_id"].tolist()
+        self.trip_codes: Dict[str, int] = {trip_id: code for code, trip_id in enumerate(self.trip_ids)}
+        self.trip_headsigns: List[Optional[str]] = trips["trip_headsign"].tolist()
+        self.trip_route: np.ndarray = trips["route"].astype(np.int32)
+        self.trip_service: np.ndarray = trips["service"].astype(np.int32)
+        self.service_codes: Dict[str, int] = dict(zip(trips["service_id"].tolist(), trips["service"].tolist()))
+        self.route_ids: List[str] = routes["route_id"].tolist()
+        self.route_short_names: List[Optional[str]] = routes["route_short_name"].tolist()
+        self.agency_names: List[Optional[str]] = routes["agency_name"].tolist()
+
+        # stop_times in (trip, stop_sequence) order
+        self.st_trip: np.ndarray = stop_times["trip"].astype(np.int32)
+        self.st_stop: np.ndarray = stop_times["stop"].astype(np.int32)
+        self.st_sequence: np.ndarray = stop_times["stop_sequence"].astype(np.int32)
+        self.st_arrival: np.ndarray = stop_times["arrival_time"].astype(np.int32)
+        self.st_departure: np.ndarray = stop_times["departure_time"].astype(np.int32)
+        self.trip_ptr = np.zeros(len(self.trip_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.st_trip, minlength=len(self.trip_ids)), out=self.trip_ptr[1:])
+
+        # Row numbers grouped by stop, each group sorted by departure then trip
+        self.stop_rows: np.ndarray = np.lexsort((self.st_trip, self.st_departure, self.st_stop)).astype(np.int64)
+        self.stop_departures: np.ndarray = self.st_departure[self.stop_rows]
+        self.stop_ptr = np.zeros(len(self.stop_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.st_stop, minlength=len(self.stop_ids)), out=self.stop_ptr[1:])
+
+        # service_days[service, day]: the service calendar unpacked over its window
+        self.calendar = calendar
+        self.service_days = np.zeros((len(self.service_codes), 0), dtype=bool)
+        if calendar is not None and calendar.window_days:
+            nbytes = (calendar.window_days + 7) // 8
+            packed = np.zeros((max(self.service_codes.values(), default=-1) + 1, nbytes), dtype=np.uint8)
+            for service_id, code in self.service_codes.items():
+                bitmap = calendar.bitmaps.get(service_id, 0)
+                packed[code] = np.frombuffer(bitmap.to_bytes(nbytes, "little"), dtype=np.uint8)
+            self.service_days = np.unpackbits(packed, axis=1, bitorder="little")[:, : calendar.window_days].astype(bool)
+        # Trip masks for dates outside the calendar window
+        self._running: Dict[date, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.st_trip)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (
+            self.trip_route, self.trip_service, self.st_trip, self.st_stop, self.st_sequence,
+            self.st_arrival, self.st_departure, self.trip_ptr, self.stop_rows, self.stop_departures, self.stop_ptr,
+            self.service_days,
+        )
+        return sum(array.nbytes for array in arrays)
+
+    def running_on(self, travel_date: date, active_services: Callable[[], Sequence[str]]) -> np.ndarray:
+        """
+        Boolean mask over trips running on ``travel_date``. Inside the calendar window
+        this is a column of ``service_days``; otherwise ``active_services`` is called
+        (once per date) for the ids.
+        """
+        if self.calendar is not None and self.calendar.covers(travel_date):
+            return self.service_days[:, (travel_date - self.calendar.window_start).days][self.trip_service]
+        mask = self._running.get(travel_date)
+        if mask is None:
+            active = np.zeros(max(self.service_codes.values(), default=-1) + 1, dtype=bool)
+            codes = [self.service_codes[s] for s in active_services() if s in self.service_codes]
+            active[codes] = True
+            mask = active[self.trip_service]
+            if len(self._running) >= RECENT_DATES:
+                self._running.clear()
+            self._running[travel_date] = mask
+        return mask
+
+    def _rows_at(self, stop_ids: Sequence[str], after: Optional[int], trip_mask: Optional[np.ndarray]) -> np.ndarray:
+        """stop_times rows at ``stop_ids`` departing at/after ``after`` on running trips."""
+        codes = np.array([self.stop_codes[s] for s in stop_ids if s in self.stop_codes], dtype=np.int64)
+        starts, ends = self.stop_ptr[codes], self.stop_ptr[codes + 1]
+        if after is not None:
+            # Groups are sorted by departure: skip the earlier ones with a binary search each
+            starts = np.array(
+                [start + np.searchsorted(self.stop_departures[start:end], after) for start, end in zip(starts, ends)],
+                dtype=np.int64,
+            ).reshape(-1)
+        rows = self.stop_rows[_slices(starts, ends)]
+        if trip_mask is not None:
+            rows = rows[trip_mask[self.st_trip[rows]]]
+        return rows
+
+    def _trip_fields(self, trip: int) -> dict:
+        route = int(self.trip_route[trip])
+        return {
+            "agency_name": self.agency_names[route],
+            "route_short_name": self.route_short_names[route],
+            "trip_id": self.trip_ids[trip],
+            "route_id": self.route_ids[route],
+        }
+
+    def departures_between(
+        self,
+        origin_ids: Sequence[str],
+        dest_ids: Sequence[str],
+        trip_mask: Optional[np.ndarray],
+        after: Optional[int],
+        limit: int,
+    ) -> List[dict]:
+        """Rows shaped like ``query_planner.departures_between``'s SQL, same order."""
+        origin_rows = self._rows_at(origin_ids, after, trip_mask)
+        dest_rows = self._rows_at(dest_ids, None, trip_mask)
+        if not len(origin_rows) or not len(dest_rows):
+            return []
+
+        # Pair every origin row with the destination rows of the same trip
+        dest_rows = dest_rows[np.argsort(self.st_trip[dest_rows], kind="stable")]
+        dest_trips = self.st_trip[dest_rows]
+        origin_trips = self.st_trip[origin_rows]
+        lo = np.searchsorted(dest_trips, origin_trips, side="left")
+        hi = np.searchsorted(dest_trips, origin_trips, side="right")
+        origin_pairs = np.repeat(origin_rows, hi - lo)
+        dest_pairs = dest_rows[_slices(lo, hi)]
+        # Rows are in trip order, so a later row is a later stop
+        later = dest_pairs > origin_pairs
+        origin_pairs, dest_pairs = origin_pairs[later], dest_pairs[later]
+
+        order = np.lexsort(
+            (
+                self.st_trip[origin_pairs],
+                _nulls_last(self.st_arrival[dest_pairs]),
+                _nulls_last(self.st_departure[origin_pairs]),
+            )
+        )
+        rows = []
+        for i in order[:limit]:
+            origin, dest = int(origin_pairs[i]), int(dest_pairs[i])
+            rows.append(
+                {
+                    "departure": _time_or_none(self.st_departure[origin]),
+                    "arrival": _time_or_none(self.st_arrival[dest]),
+                    "origin_name": self.stop_names[self.st_stop[origin]],
+                    "destination_name": self.stop_names[self.st_stop[dest]],
+                    **self._trip_fields(int(self.st_trip[origin])),
+                }
+            )
+        return rows
+
+    def next_departures(
+        self,
+        stop_ids: Sequence[str],
+        trip_mask: Optional[np.ndarray],
+        after: Optional[int],
+        limit: int,
+        after_trip: Optional[str] = None,
+    ) -> List[dict]:
+        """Rows shaped like ``query_planner.next_departures``'s SQL, same order and keyset bound."""
+        rows = self._rows_at(stop_ids, after, trip_mask)
+        if after is not None and after_trip is not None:
+            # Trip codes follow trip_id order: at ``after`` itself keep only trips sorting after it
+            first_trip = bisect.bisect_right(self.trip_ids, after_trip)
+            rows = rows[(self.st_departure[rows] > after) | (self.st_trip[rows] >= first_trip)]
+        if not len(rows):
+            return []
+        departures = _nulls_last(self.st_departure[rows])
+        if len(rows) > limit:
+            # Only the earliest ``limit`` need a full sort
+            cutoff = np.partition(departures, limit - 1)[limit - 1]
+            keep = departures <= cutoff
+            rows, departures = rows[keep], departures[keep]
+        rows = rows[np.lexsort((self.st_trip[rows], departures))][:limit]
+        result = []
+        for row in rows:
+            trip = int(self.st_trip[row])
+            result.append(
+                {
+                    "departure": _time_or_none(self.st_departure[row]),
+                    "station_name": self.stop_names[self.st_stop[row]],
+                    **self._trip_fields(trip),
+                    "trip_headsign": self.trip_headsigns[trip],
+                }
+            )
+        return result
+
+    def od_summary(
+        self,
+        origin_station: Dict[str, str],
+        dest_station: Dict[str, str],
+        trip_mask: Optional[np.ndarray],
+        after: int,
+        before: int,
+    ) -> List[tuple]:
+        """
+        Rows shaped like ``query_planner._od_summary_sql``: per (origin station,
+        destination station) served directly by a trip leaving the origin within
+        [after, before], the first departure, earliest arrival, shortest ride and number
+        of distinct trips. ``origin_station``/``dest_station`` map stop_ids to stations.
+        """
+        stations = sorted({*origin_station.values(), *dest_station.values()})
+        station_codes = {station: code for code, station in enumerate(stations)}
+        origin_of = np.full(len(self.stop_ids), -1, dtype=np.int64)
+        dest_of = np.full(len(self.stop_ids), -1, dtype=np.int64)
+        for station_of, codes in ((origin_station, origin_of), (dest_station, dest_of)):
+            for stop_id, station in station_of.items():
+                if stop_id in self.stop_codes:
+                    codes[self.stop_codes[stop_id]] = station_codes[station]
+
+        origin_rows = self._rows_at(list(origin_station), after, trip_mask)
+        origin_rows = origin_rows[self.st_departure[origin_rows] <= before]
+        if not len(origin_rows) or not (dest_of >= 0).any():
+            return []
+
+        # Every later stop of each boarded trip is reachable without changing
+        ends = self.trip_ptr[self.st_trip[origin_rows] + 1]
+        dest_rows = _slices(origin_rows + 1, ends)
+        board_rows = np.repeat(origin_rows, ends - origin_rows - 1)
+        origin_code = origin_of[self.st_stop[board_rows]]
+        dest_code = dest_of[self.st_stop[dest_rows]]
+        keep = (dest_code >= 0) & (dest_code != origin_code) & (self.st_arrival[dest_rows] != NO_TIME)
+        board_rows, dest_rows = board_rows[keep], dest_rows[keep]
+        if not len(board_rows):
+            return []
+
+        n_stations = len(stations)
+        pair = origin_code[keep] * n_stations + dest_code[keep]
+        departure = self.st_departure[board_rows].astype(np.int64)
+        arrival = self.st_arrival[dest_rows].astype(np.int64)
+        pairs, group = np.unique(pair, return_inverse=True)
+        first_departure = np.full(len(pairs), np.iinfo(np.int64).max)
+        earliest_arrival = np.full(len(pairs), np.iinfo(np.int64).max)
+        fastest = np.full(len(pairs), np.iinfo(np.int64).max)
+        np.minimum.at(first_departure, group, departure)
+        np.minimum.at(earliest_arrival, group, arrival)
+        np.minimum.at(fastest, group, arrival - departure)
+        # A trip calling at several platforms of a station pair counts once
+        trips = np.bincount(
+            np.unique(group * len(self.trip_ids) + self.st_trip[board_rows]) // len(self.trip_ids), minlength=len(pairs)
+        )
+        return [
+            (
+                stations[int(p) // n_stations],
+                stations[int(p) % n_stations],
+                int(first_departure[i]),
+                int(earliest_arrival[i]),
+                int(fastest[i]),
+                int(trips[i]),
+            )
+            for i, p in enumerate(pairs)
+        ]
+
+    def route_stops(self, trip_id: str) -> List[dict]:
+        """Rows shaped like the ``get_route_stops`` tool's SQL; empty for an unknown trip."""
+        trip = self.trip_codes.get(trip_id)
+        if trip is None:
+            return []
+        rows = []
+        for row in range(self.trip_ptr[trip], self.trip_ptr[trip + 1]):
+            arrival, departure = int(self.st_arrival[row]), int(self.st_departure[row])
+            rows.append(
+                {
+                    "stop_sequence": int(self.st_sequence[row]),
+                    "stop_name": self.stop_names[self.st_stop[row]],
+                    "arrival_time": arrival if arrival != NO_TIME else None,
+                    "departure_time": departure if departure != NO_TIME else None,
+                    "stop_id": self.stop_ids[self.st_stop[row]],
+                }
+            )
+        return rows
+
+
+def load_timetable(conn: Connection) -> Optional[Timetable]:
+    """Read the rail tables into a ``Timetable``; None when the database has no rail subset."""
+    if not inspect(conn).has_table("stop_times_rail"):
+        return None
+    stops = _fetch_columns(conn, "SELECT stop_id, stop_name FROM stops_rail ORDER BY stop_id")
+    routes = _fetch_columns(
+        conn, "SELECT route_id, route_short_name, agency_name FROM routes_rail_with_agency ORDER BY route_id"
+    )
+    trips = _fetch_columns(
+        conn,
+        """
+        WITH routes AS (
+            SELECT route_id, CAST(row_number() OVER (ORDER BY route_id) - 1 AS INTEGER) AS code
+            FROM routes_rail_with_agency
+        ),
+        services AS (
+            SELECT service_id, CAST(row_number() OVER (ORDER BY service_id) - 1 AS INTEGER) AS code
+            FROM (SELECT DISTINCT service_id FROM trips_rail) distinct_services
+        )
+        SELECT t.trip_id, t.trip_headsign, t.service_id, r.code AS route, s.code AS service
+        FROM trips_rail t
+        JOIN routes r ON r.route_id = t.route_id
+        JOIN services s ON s.service_id = t.service_id
+        ORDER BY t.trip_id
+        """,
+    )
+    stop_times = _fetch_columns(
+        conn,
+        f"""
+        WITH stops AS (
+            SELECT stop_id, CAST(row_number() OVER (ORDER BY stop_id) - 1 AS INTEGER) AS code FROM stops_rail
+        ),
+        trips AS (
+            SELECT trip_id, CAST(row_number() OVER (ORDER BY trip_id) - 1 AS INTEGER) AS code
+            FROM trips_rail
+            WHERE route_id IN (SELECT route_id FROM routes_rail_with_agency)
+        )
+        SELECT
+            t.code AS trip,
+            s.code AS stop,
+            st.stop_sequence,
+            coalesce(st.arrival_time, {NO_TIME}) AS arrival_time,
+            coalesce(st.departure_time, {NO_TIME}) AS departure_time
+        FROM stop_times_rail st
+        JOIN trips t ON t.trip_id = st.trip_id
+        JOIN stops s ON s.stop_id = st.stop_id
+        ORDER BY t.code, st.stop_sequence
+        """,
+    )
+    return Timetable(stops, trips, routes, stop_times, load_service_calendar(conn))
+
+
+def shared_timetable(session: Session) -> Optional[Timetable]:
+    """The timetable whatever ``TIMETABLE_ENGINE`` says, for features that only exist in memory."""
+    return engine_cached(session, TIMETABLE_KEY, load_timetable)
+
+
+def get_timetable(session: Session) -> Optional[Timetable]:
+    """The in-memory timetable when ``TIMETABLE_ENGINE=memory``, else None (use SQL)."""
+    if get_settings().timetable_engine != "memory":
+        return None
+    return shared_timetable(session)
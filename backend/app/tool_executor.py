@@ -0,0 +1,75 @@
+"""
+Runs the synchronous ADK tools off the event loop.
+
+ADK calls a plain function tool directly on the event loop, so one slow query in
+a chat request stalls every other request of the worker. ``offloaded(tool)`` wraps
+a tool in a coroutine with the same name, signature and docstring (what ADK builds
+the function declaration from) that runs it on a shared pool of ``TOOL_WORKERS``
+threads. Calls beyond that wait for a free thread instead of piling more queries
+onto the database.
+
+Tool calls sharing one request's database session run one at a time: a SQLAlchemy
+session must not be used from two threads at once.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+from weakref import WeakKeyDictionary
+
+from .config import get_settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_session_locks: "WeakKeyDictionary[Any, threading.Lock]" = WeakKeyDictionary()
+_session_locks_lock = threading.Lock()
+
+
+def tool_executor() -> ThreadPoolExecutor:
+    """The process-wide tool thread pool, sized from settings on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_settings().tool_workers, thread_name_prefix="adk-tool")
+        return _executor
+
+
+def shutdown() -> None:
+    """Wait for running tool calls and release the threads (on app shutdown)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _session_lock(session: Any) -> threading.Lock:
+    with _session_locks_lock:
+        lock = _session_locks.get(session)
+        if lock is None:
+            lock = _session_locks[session] = threading.Lock()
+        return lock
+
+
+def _call(tool: Callable[..., Any], session: Any, args: tuple, kwargs: dict) -> Any:
+    if session is None:
+        return tool(*args, **kwargs)
+    with _session_lock(session):
+        return tool(*args, **kwargs)
+
+
+def offloaded(tool: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    """``tool`` as a coroutine function that runs it on the tool thread pool."""
+
+    @functools.wraps(tool)
+    async def run(*args, **kwargs):
+        context = kwargs.get("tool_context")
+        session = context.state.get("session") if context is not None else None
+        call = functools.partial(_call, tool, session, args, kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(tool_executor(), contextvars.copy_context().run, call)
+
+    return run
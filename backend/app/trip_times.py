@@ -0,0 +1,203 @@
+"""
+Compact trip times: stop patterns plus shared time profiles.
+
+``stop_times_rail`` repeats a line's stop sequence, with new times, for every trip.
+Ingestion factors it into:
+
+- ``pattern_stops_rail``: each distinct stop sequence once (see ``trip_patterns_rail``);
+- ``time_profiles_rail``: each distinct (pattern, stop_sequence numbers, arrival and
+  departure offsets from the trip's start) once; trips of a line running to the same
+  schedule share a profile;
+- ``trip_times_rail``: one row per trip, its pattern, profile and start time.
+
+A trip's stop times are its profile's offsets plus its start time. ``TripTimes``
+keeps all three in memory as flat arrays, so ``route_stops`` answers from a cached
+pattern and time vector instead of scanning ``stop_times_rail``.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .db import engine_cached
+from .timetable import _fetch_columns
+
+TRIP_TIMES_KEY = "trip_times"
+TRIP_TIMES_TABLE = "trip_times_rail"
+# Stored for missing times (non-timepoints); offsets may be negative, so not NO_TIME
+NO_OFFSET = np.iinfo(np.int32).min
+
+# Per trip: start time (the first time the trip has, departure before arrival) and
+# times relative to it. Leading stops may have no times (non-timepoints); a trip with
+# no times at all starts at 0 and has only missing offsets.
+_TRIP_OFFSETS_SQL = """
+    SELECT
+        tp.trip_id,
+        tp.pattern_id,
+        sq.start_time,
+        list_transform(tp.arrival_times, t -> t - sq.start_time) AS arrival_offsets,
+        list_transform(tp.departure_times, t -> t - sq.start_time) AS departure_offsets,
+        sq.stop_sequences
+    FROM trip_patterns_rail tp
+    JOIN (
+        SELECT
+            trip_id,
+            array_agg(stop_sequence ORDER BY stop_pos) AS stop_sequences,
+            CAST(coalesce(
+                min_by(coalesce(departure_time, arrival_time), stop_pos)
+                    FILTER (WHERE coalesce(departure_time, arrival_time) IS NOT NULL),
+                0
+            ) AS INTEGER) AS start_time
+        FROM stop_times_rail
+        GROUP BY trip_id
+    ) sq ON sq.trip_id = tp.trip_id
+"""
+
+TIME_PROFILES_SQL = f"""
+CREATE TABLE time_profiles_rail AS
+WITH offsets AS ({_TRIP_OFFSETS_SQL})
+SELECT
+    CAST(row_number() OVER (ORDER BY pattern_id, stop_sequences, arrival_offsets, departure_offsets) - 1 AS INTEGER)
+        AS profile_id,
+    pattern_id,
+    stop_sequences,
+    arrival_offsets,
+    departure_offsets
+FROM (SELECT DISTINCT pattern_id, stop_sequences, arrival_offsets, departure_offsets FROM offsets) profiles
+"""
+
+TRIP_TIMES_SQL = f"""
+CREATE TABLE trip_times_rail AS
+WITH offsets AS ({_TRIP_OFFSETS_SQL})
+SELECT o.trip_id, o.pattern_id, p.profile_id, o.start_time
+FROM offsets o
+JOIN time_profiles_rail p
+  ON p.pattern_id = o.pattern_id
+ AND p.stop_sequences = o.stop_sequences
+ AND p.arrival_offsets IS NOT DISTINCT FROM o.arrival_offsets
+ AND p.departure_offsets IS NOT DISTINCT FROM o.departure_offsets
+ORDER BY o.trip_id
+"""
+
+
+class TripTimes:
+    """Every rail trip's stops and times as pattern, profile and start time."""
+
+    def __init__(
+        self,
+        stops: Dict[str, np.ndarray],
+        pattern_stops: Dict[str, np.ndarray],
+        profiles: Dict[str, np.ndarray],
+        trips: Dict[str, np.ndarray],
+    ):
+        """
+        Column dicts: ``stops`` (stop_id, stop_name); ``pattern_stops`` (pattern_id,
+        stop_id) ordered by pattern and position; ``profiles`` (profile_id, pattern_id,
+        stop_sequence, arrival_offset, departure_offset) ordered by profile and
+        position; ``trips`` (trip_id, profile_id, start_time).
+        """
+        self.stop_ids: List[str] = stops["stop_id"].tolist()
+        self.stop_names: List[str] = stops["stop_name"].tolist()
+        stop_codes = {stop_id: code for code, stop_id in enumerate(self.stop_ids)}
+
+        n_patterns = int(pattern_stops["pattern_id"].max()) + 1 if len(pattern_stops["pattern_id"]) else 0
+        self.pattern_ptr = np.zeros(n_patterns + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pattern_stops["pattern_id"], minlength=n_patterns), out=self.pattern_ptr[1:])
+        self.pattern_stop = np.array([stop_codes[s] for s in pattern_stops["stop_id"].tolist()], dtype=np.int32)
+
+        n_profiles = int(profiles["profile_id"].max()) + 1 if len(profiles["profile_id"]) else 0
+        self.profile_ptr = np.zeros(n_profiles + 1, dtype=np.int64)
+        np.cumsum(np.bincount(profiles["profile_id"], minlength=n_profiles), out=self.profile_ptr[1:])
+        self.profile_pattern = np.zeros(n_profiles, dtype=np.int32)
+        self.profile_pattern[profiles["profile_id"]] = profiles["pattern_id"]
+        self.profile_sequence = profiles["stop_sequence"].astype(np.int32)
+        self.profile_arrival = profiles["arrival_offset"].astype(np.int32)
+        self.profile_departure = profiles["departure_offset"].astype(np.int32)
+
+        self.trip_codes: Dict[str, int] = {trip_id: code for code, trip_id in enumerate(trips["trip_id"].tolist())}
+        self.trip_profile = trips["profile_id"].astype(np.int32)
+        self.trip_start = trips["start_time"].astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.trip_codes)
+
+    @property
+    def profile_count(self) -> int:
+        return len(self.profile_ptr) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in the arrays (trip and stop id strings not included)."""
+        arrays = (
+            self.pattern_ptr,
+            self.pattern_stop,
+            self.profile_ptr,
+            self.profile_pattern,
+            self.profile_sequence,
+            self.profile_arrival,
+            self.profile_departure,
+            self.trip_profile,
+            self.trip_start,
+        )
+        return sum(array.nbytes for array in arrays)
+
+    def route_stops(self, trip_id: str) -> List[dict]:
+        """Rows shaped like the ``get_route_stops`` tool's SQL; empty for an unknown trip."""
+        trip = self.trip_codes.get(trip_id)
+        if trip is None:
+            return []
+        profile = int(self.trip_profile[trip])
+        start = int(self.trip_start[trip])
+        pattern = int(self.profile_pattern[profile])
+        stops = self.pattern_stop[self.pattern_ptr[pattern] : self.pattern_ptr[pattern + 1]].tolist()
+        span = slice(self.profile_ptr[profile], self.profile_ptr[profile + 1])
+        rows = []
+        for stop, sequence, arrival, departure in zip(
+            stops,
+            self.profile_sequence[span].tolist(),
+            self.profile_arrival[span].tolist(),
+            self.profile_departure[span].tolist(),
+        ):
+            rows.append(
+                {
+                    "stop_sequence": sequence,
+                    "stop_name": self.stop_names[stop],
+                    "arrival_time": start + arrival if arrival != NO_OFFSET else None,
+                    "departure_time": start + departure if departure != NO_OFFSET else None,
+                    "stop_id": self.stop_ids[stop],
+                }
+            )
+        return rows
+
+
+def load_trip_times(conn: Connection) -> Optional[TripTimes]:
+    """Read the compact trip tables; None for databases built before them."""
+    if not inspect(conn).has_table(TRIP_TIMES_TABLE):
+        return None
+    stops = _fetch_columns(conn, "SELECT stop_id, stop_name FROM stops_rail ORDER BY stop_id")
+    pattern_stops = _fetch_columns(
+        conn, "SELECT pattern_id, stop_id FROM pattern_stops_rail ORDER BY pattern_id, stop_pos"
+    )
+    profiles = _fetch_columns(
+        conn,
+        f"""
+        SELECT
+            profile_id,
+            pattern_id,
+            unnest(stop_sequences) AS stop_sequence,
+            unnest(list_transform(arrival_offsets, t -> coalesce(t, {NO_OFFSET}))) AS arrival_offset,
+            unnest(list_transform(departure_offsets, t -> coalesce(t, {NO_OFFSET}))) AS departure_offset,
+            unnest(range(len(stop_sequences))) AS position
+        FROM time_profiles_rail
+        ORDER BY profile_id, position
+        """,
+    )
+    trips = _fetch_columns(conn, "SELECT trip_id, profile_id, start_time FROM trip_times_rail ORDER BY trip_id")
+    return TripTimes(stops, pattern_stops, profiles, trips)
+
+
+def get_trip_times(session: Session) -> Optional[TripTimes]:
+    return engine_cached(session, TRIP_TIMES_KEY, load_trip_times)
@@ -0,0 +1,157 @@
+"""
+Load test for ADK tool calls from concurrent chat requests on one event loop.
+
+Usage (from backend/):
+    python -m benchmarks.chat_load_bench --preset sweden --workdir /tmp/bench-sweden
+    python -m benchmarks.chat_load_bench --database /data/gtfs.duckdb --users 1 4 16 --model-ms 300
+
+Each simulated chat request waits ``--model-ms`` for the model, calls one tool with
+its own database session (like ``deps.get_db``) and waits for the model again.
+Tools are called the way ADK calls them: a plain function runs on the event loop
+("blocking"), a coroutine from ``app.tool_executor.offloaded`` is awaited
+("offloaded", ``TOOL_WORKERS`` threads). For each number of concurrent users the
+script reports requests per second, request latency and the longest event-loop
+stall seen by a 5 ms heartbeat. The result cache is off unless RESULT_CACHE_SIZE
+is set, so every tool call reaches the database.
+
+DuckDB work is CPU-bound, so on a single core offloading keeps the loop responsive
+but cannot add throughput. ``--tool-ms`` replaces the tool with a wait of that many
+milliseconds outside the GIL, standing in for a query to a networked database, to
+show how far the pool scales with concurrent users.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL", "duckdb:///:memory:")
+os.environ.setdefault("TRAFIKLAB_API_KEY", "benchmark")
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import adk_tools  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.tool_executor import offloaded, shutdown  # noqa: E402
+from benchmarks.query_bench import _hhmm, build_database, latency_stats, sample_queries  # noqa: E402
+from benchmarks.synthetic_gtfs import PRESETS  # noqa: E402
+
+HEARTBEAT_SECONDS = 0.005
+
+
+def _waiting_tool(seconds: float):
+    def wait(origin_name, destination_name, travel_date, after_time, tool_context=None):
+        time.sleep(seconds)
+        return {"departures": []}
+
+    return wait
+
+
+def _tool_args(query) -> tuple:
+    return query.origin, query.destination, query.travel_date.isoformat(), _hhmm(query.after_time)
+
+
+async def _heartbeat(stalls: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        stalls.append(time.perf_counter() - started - HEARTBEAT_SECONDS)
+
+
+async def _load(bench_engine, queries, users: int, requests: int, model_seconds: float, offload: bool, tool) -> dict:
+    tool = offloaded(tool) if offload else tool
+    pending = list(queries[: users * requests])
+    latencies: list = []
+
+    async def user() -> None:
+        while pending:
+            query = pending.pop()
+            started = time.perf_counter()
+            await asyncio.sleep(model_seconds)
+            with Session(bind=bench_engine) as session:
+                context = SimpleNamespace(state={"session": session})
+                if offload:
+                    await tool(*_tool_args(query), tool_context=context)
+                else:
+                    tool(*_tool_args(query), tool_context=context)
+            await asyncio.sleep(model_seconds)
+            latencies.append(time.perf_counter() - started)
+
+    stalls: list = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stalls, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+    return {
+        "throughput": len(latencies) / elapsed,
+        "latency": latency_stats(latencies),
+        "max_stall_ms": max(stalls, default=0.0) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--database", type=Path, default=None, help="Existing DuckDB file instead of a preset")
+    parser.add_argument("--workdir", type=Path, default=None, help="Keep the generated feed and DB here")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=10, help="Chat requests per user")
+    parser.add_argument("--model-ms", type=float, default=200.0, help="Simulated model time before and after the tool")
+    parser.add_argument("--tool-ms", type=float, default=None, help="Replace the tool with a wait this long")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    tool = adk_tools.get_departures if args.tool_ms is None else _waiting_tool(args.tool_ms / 1000)
+
+    workdir = None
+    if args.database:
+        bench_engine = create_engine(f"duckdb:///{args.database}", connect_args={"read_only": True})
+    else:
+        workdir = args.workdir or Path(tempfile.mkdtemp(prefix="chat-load-bench-"))
+        workdir.mkdir(parents=True, exist_ok=True)
+        bench_engine = build_database(PRESETS[args.preset], workdir)
+
+    try:
+        with Session(bind=bench_engine) as session:
+            queries = sample_queries(session, PRESETS[args.preset], max(args.users) * args.requests, args.seed)
+            # Load the per-feed indexes once, outside the timed runs
+            adk_tools.get_departures(*_tool_args(queries[0]), tool_context=SimpleNamespace(state={"session": session}))
+        random.Random(args.seed).shuffle(queries)
+
+        tool_name = "get_departures" if args.tool_ms is None else f"{args.tool_ms:.0f} ms wait"
+        print(
+            f"TOOL_WORKERS={get_settings().tool_workers}, tool {tool_name}, "
+            f"model {args.model_ms:.0f} ms before and after it"
+        )
+        print(f"{'mode':<12}{'users':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max stall ms':>14}")
+        for users in args.users:
+            for mode in ("blocking", "offloaded"):
+                result = asyncio.run(
+                    _load(bench_engine, queries, users, args.requests, args.model_ms / 1000, mode == "offloaded", tool)
+                )
+                latency = result["latency"]
+                print(
+                    f"{mode:<12}{users:>6}{result['throughput']:>10.2f}{latency['p50']:>10.1f}"
+                    f"{latency['p95']:>10.1f}{result['max_stall_ms']:>14.1f}"
+                )
+    finally:
+        shutdown()
+        bench_engine.dispose()
+        if workdir is not None and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Latency benchmark for the journey planner (``app.journey_planner``) on random
+station pairs, most of which need one or more changes.
+
+Usage (from backend/):
+    python -m benchmarks.journey_bench --preset sweden --workdir /tmp/bench-sweden
+    python -m benchmarks.journey_bench --database /data/gtfs.duckdb --queries 500   # a loaded real feed
+
+Pairs, dates and departure times are drawn with a fixed seed from the stations of
+the loaded feed. Reports the one-off planner build time, plan() and
+next_journeys() latency in milliseconds, the share of pairs with a journey and
+the mean number of changes of the fastest one.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "duckdb:///:memory:")
+os.environ.setdefault("TRAFIKLAB_API_KEY", "benchmark")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.journey_planner import MAX_TRANSFERS, get_journey_planner  # noqa: E402
+from app.query_planner import active_services  # noqa: E402
+from app.service_calendar import get_service_calendar  # noqa: E402
+from app.stop_index import get_stop_index  # noqa: E402
+from benchmarks.query_bench import PERCENTILES, build_database, latency_stats  # noqa: E402
+from benchmarks.synthetic_gtfs import PRESETS  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--database", type=Path, default=None, help="Existing DuckDB file instead of a preset")
+    parser.add_argument("--workdir", type=Path, default=None, help="Keep the generated feed and DB here")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-transfers", type=int, default=MAX_TRANSFERS)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = None
+    if args.database:
+        bench_engine = create_engine(f"duckdb:///{args.database}", connect_args={"read_only": True})
+    else:
+        workdir = args.workdir or Path(tempfile.mkdtemp(prefix="journey-bench-"))
+        workdir.mkdir(parents=True, exist_ok=True)
+        bench_engine = build_database(PRESETS[args.preset], workdir)
+
+    rng = random.Random(args.seed)
+    try:
+        with Session(bind=bench_engine) as session:
+            started = time.perf_counter()
+            planner = get_journey_planner(session)
+            build_seconds = time.perf_counter() - started
+            if planner is None:
+                sys.exit("The database has no rail subset")
+            calendar = get_service_calendar(session)
+            stations = [station for station in get_stop_index(session).stations if station.departures]
+            days = max(calendar.window_days, 1)
+            dates = [calendar.window_start + timedelta(days=rng.randrange(days)) for _ in range(args.queries)]
+            masks = {
+                day: planner.timetable.running_on(day, lambda: active_services(session, day)) for day in set(dates)
+            }
+    finally:
+        if workdir is not None and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+    bench_engine.dispose()
+
+    queries = [(*rng.sample(stations, 2), day, rng.randrange(5 * 3600, 20 * 3600)) for day in dates]
+    plan_samples, next_samples, changes = [], [], []
+    for origin, destination, day, depart_after in queries:
+        plan_args = (origin.stop_ids, destination.stop_ids, depart_after, masks[day])
+        started = time.perf_counter()
+        journeys = planner.plan(*plan_args, max_transfers=args.max_transfers)
+        plan_samples.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        planner.next_journeys(*plan_args, max_transfers=args.max_transfers)
+        next_samples.append(time.perf_counter() - started)
+        if journeys:
+            changes.append(journeys[-1].transfers)
+
+    print(
+        f"{len(stations)} stations, {planner.pattern_count} patterns, {len(planner.timetable):,} stop_times; "
+        f"planner built in {build_seconds:.2f}s"
+    )
+    print(f"{'operation':<28}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'mean':>10}{'max':>10}")
+    for name, samples in (("plan", plan_samples), ("next_journeys (3)", next_samples)):
+        stats = latency_stats(samples)
+        cols = [stats[f"p{p}"] for p in PERCENTILES] + [stats["mean"], stats["max"]]
+        print(f"{name:<28}" + "".join(f"{value:>10.2f}" for value in cols))
+    mean_changes = statistics.fmean(changes) if changes else 0.0
+    print(f"journey found for {len(changes)}/{len(queries)} pairs, {mean_changes:.2f} changes on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare GTFS loader throughput (rows/sec) between the native DuckDB bulk loader and
+the pandas chunked ``to_sql`` path.
+
+Usage (from backend/):
+    python -m benchmarks.loader_bench /path/to/extracted/gtfs [--tables stop_times shapes]
+    python -m benchmarks.loader_bench /path/to/sweden.zip      # members streamed from the zip
+
+Each loader writes into its own scratch DuckDB file so the runs do not share caches.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "duckdb:///:memory:")
+os.environ.setdefault("TRAFIKLAB_API_KEY", "benchmark")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from app.ingestion.feed_archive import FeedArchive  # noqa: E402
+from app.ingestion.gtfs_loader import GTFS_FILES, load_csv_to_table  # noqa: E402
+
+
+def feed_sources(feed: Path, tables):
+    if feed.suffix == ".zip":
+        archive = FeedArchive(feed)
+        members = {table: archive.member(f"{table}.txt") for table in tables}
+        return {table: member for table, member in members.items() if member is not None}
+    return {table: feed / f"{table}.txt" for table in tables if (feed / f"{table}.txt").exists()}
+
+
+def run(feed: Path, tables, methods):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for method in methods:
+            bench_engine = create_engine(f"duckdb:///{Path(tmpdir) / f'{method}.duckdb'}")
+            for table, source in feed_sources(feed, tables).items():
+                started = time.perf_counter()
+                rows = load_csv_to_table(source, table, bind=bench_engine, method=method)
+                results[(table, method)] = (rows, time.perf_counter() - started)
+            bench_engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("feed", type=Path, help="GTFS zip, or a directory with extracted .txt files")
+    parser.add_argument("--tables", nargs="+", default=list(GTFS_FILES))
+    parser.add_argument("--methods", nargs="+", default=["pandas", "duckdb"], choices=["pandas", "duckdb"])
+    args = parser.parse_args()
+
+    results = run(args.feed, args.tables, args.methods)
+
+    print(f"{'table':<16}{'method':<8}{'rows':>12}{'seconds':>10}{'rows/s':>14}")
+    for (table, method), (rows, elapsed) in results.items():
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        print(f"{table:<16}{method:<8}{rows:>12}{elapsed:>10.2f}{rate:>14,.0f}")
+
+    if set(args.methods) == {"pandas", "duckdb"}:
+        print()
+        for table in args.tables:
+            if (table, "pandas") in results and (table, "duckdb") in results:
+                speedup = results[(table, "pandas")][1] / max(results[(table, "duckdb")][1], 1e-9)
+                print(f"{table:<16}duckdb speedup x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Latency benchmark for the query layer (query_planner and the ADK tools) on a
+synthetic feed from ``benchmarks.synthetic_gtfs``.
+
+Usage (from backend/):
+    python -m benchmarks.query_bench --preset small --out baseline.json
+    python -m benchmarks.query_bench --preset small --compare baseline.json --fail-on-regression 20
+    python -m benchmarks.query_bench --preset sweden --workdir /tmp/bench-sweden   # keep the DB between runs
+    TIMETABLE_ENGINE=memory python -m benchmarks.query_bench --preset small       # in-memory timetable
+
+The query mix (station pairs on the same trip, dates, times, trip ids) is sampled
+from the loaded feed with a fixed seed, so two runs on the same preset issue the
+same queries. Each operation reports p50/p90/p95/p99/mean/max in milliseconds.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import date, time as dtime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("DATABASE_URL", "duckdb:///:memory:")
+os.environ.setdefault("TRAFIKLAB_API_KEY", "benchmark")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import duckdb  # noqa: E402
+import sqlalchemy  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import adk_tools, query_planner  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.gtfs_time import format_gtfs_time  # noqa: E402
+from app.ingestion.gtfs_loader import GTFS_FILES, load_feed, rail_steps  # noqa: E402
+from benchmarks.synthetic_gtfs import PRESETS, FeedSpec, generate_feed  # noqa: E402
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass(frozen=True)
+class BenchQuery:
+    origin: str
+    destination: str
+    travel_date: date
+    after_time: dtime
+    trip_id: str
+
+
+def _spec_json(spec: FeedSpec) -> dict:
+    return {key: str(value) for key, value in asdict(spec).items()}
+
+
+def build_database(spec: FeedSpec, workdir: Path) -> Engine:
+    """Generate and load the feed for ``spec`` into ``workdir``, reusing a build of the same spec and schema."""
+    db_path = workdir / "bench.duckdb"
+    spec_path = workdir / "feed_spec.json"
+    build_key = {
+        "spec": _spec_json(spec),
+        "rail_steps": [[step.name, *step.statements, *step.indexes] for step in rail_steps()],
+    }
+    if db_path.exists() and spec_path.exists() and json.loads(spec_path.read_text()) == build_key:
+        return create_engine(f"duckdb:///{db_path}")
+
+    db_path.unlink(missing_ok=True)
+    feed_dir = workdir / "feed"
+    generate_feed(spec, feed_dir)
+    bench_engine = create_engine(f"duckdb:///{db_path}")
+    sources = {table: feed_dir / f"{table}.txt" for table in GTFS_FILES if (feed_dir / f"{table}.txt").exists()}
+    timings = load_feed(sources, bind=bench_engine)
+    print(f"Built {db_path} in {timings.wall_seconds:.1f}s")
+    spec_path.write_text(json.dumps(build_key))
+    return bench_engine
+
+
+def _search_term(stop_name: str) -> str:
+    # What a user would type: "Göteborg", not "Göteborg Centralstation"
+    return stop_name.split()[0]
+
+
+def sample_queries(session: Session, spec: FeedSpec, n: int, seed: int) -> List[BenchQuery]:
+    rng = random.Random(seed)
+    trip_ids = session.execute(text("SELECT trip_id FROM trips_rail ORDER BY trip_id")).scalars().all()
+    queries = []
+    for trip_id in rng.choices(trip_ids, k=n):
+        stops = session.execute(
+            text(
+                """
+                SELECT s.stop_name, st.departure_time
+                FROM stop_times_rail st
+                JOIN stops_rail s ON s.stop_id = st.stop_id
+                WHERE st.trip_id = :trip_id
+                ORDER BY st.stop_sequence
+                """
+            ),
+            {"trip_id": trip_id},
+        ).all()
+        i, j = sorted(rng.sample(range(len(stops)), 2))
+        # Ask a little before the train leaves, the way a traveller would
+        after = max(0, stops[i].departure_time - rng.randint(0, 7200)) % 86400
+        queries.append(
+            BenchQuery(
+                origin=_search_term(stops[i].stop_name),
+                destination=_search_term(stops[j].stop_name),
+                travel_date=spec.start_date + timedelta(days=rng.randrange(spec.days)),
+                after_time=dtime(after // 3600, after % 3600 // 60),
+                trip_id=trip_id,
+            )
+        )
+    return queries
+
+
+def _tool_context(session: Session) -> SimpleNamespace:
+    return SimpleNamespace(state={"session": session})
+
+
+def _hhmm(value: dtime) -> str:
+    return format_gtfs_time(value.hour * 3600 + value.minute * 60)[:5]
+
+
+# Operation name -> call issuing one query
+OPERATIONS: Dict[str, Callable[[Session, BenchQuery], object]] = {
+    "search_stops": lambda s, q: query_planner.search_stops(s, q.origin),
+    "active_services": lambda s, q: query_planner.active_services(s, q.travel_date),
+    "departures_between": lambda s, q: query_planner.departures_between(
+        s, q.origin, q.destination, q.travel_date, q.after_time
+    ),
+    "tool:search_rail_stops": lambda s, q: adk_tools.search_rail_stops(q.origin, tool_context=_tool_context(s)),
+    "tool:get_departures": lambda s, q: adk_tools.get_departures(
+        q.origin, q.destination, q.travel_date.isoformat(), _hhmm(q.after_time), tool_context=_tool_context(s)
+    ),
+    "tool:get_next_departures": lambda s, q: adk_tools.get_next_departures(
+        q.origin, q.travel_date.isoformat(), _hhmm(q.after_time), tool_context=_tool_context(s)
+    ),
+    "tool:get_route_stops": lambda s, q: adk_tools.get_route_stops(q.trip_id, tool_context=_tool_context(s)),
+    "tool:get_departure_board": lambda s, q: adk_tools.get_departure_board(
+        q.origin, q.travel_date.isoformat(), _hhmm(q.after_time), tool_context=_tool_context(s)
+    ),
+    "tool:plan_journey": lambda s, q: adk_tools.plan_journey(
+        q.origin, q.destination, q.travel_date.isoformat(), _hhmm(q.after_time), tool_context=_tool_context(s)
+    ),
+    "tool:get_service_frequency": lambda s, q: adk_tools.get_service_frequency(
+        q.origin, q.destination, q.travel_date.isoformat(), tool_context=_tool_context(s)
+    ),
+    "tool:get_reachable_stations": lambda s, q: adk_tools.get_reachable_stations(
+        q.origin, 120, q.travel_date.isoformat(), _hhmm(q.after_time), tool_context=_tool_context(s)
+    ),
+}
+
+
+def latency_stats(samples: List[float]) -> dict:
+    ms = sorted(sample * 1000 for sample in samples)
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    stats = {f"p{p}": round(cuts[p - 1], 3) for p in PERCENTILES}
+    stats.update(n=len(ms), mean=round(statistics.fmean(ms), 3), max=round(ms[-1], 3))
+    return stats
+
+
+def run(bench_engine: Engine, queries: List[BenchQuery], operations: List[str], warmup: int) -> Dict[str, dict]:
+    results = {}
+    with Session(bind=bench_engine) as session:
+        for name in operations:
+            op = OPERATIONS[name]
+            for query in queries[:warmup]:
+                op(session, query)
+            samples = []
+            for query in queries:
+                started = time.perf_counter()
+                op(session, query)
+                samples.append(time.perf_counter() - started)
+            results[name] = latency_stats(samples)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], metric: str) -> Dict[str, float]:
+    """Percent change of ``metric`` per operation present in both runs (positive = slower)."""
+    return {
+        name: 100.0 * (stats[metric] - baseline[name][metric]) / max(baseline[name][metric], 1e-9)
+        for name, stats in results.items()
+        if name in baseline
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=None, help="Feed seed (default: the preset's)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--operations", nargs="+", default=list(OPERATIONS), choices=list(OPERATIONS))
+    parser.add_argument("--workdir", type=Path, default=None, help="Keep the generated feed and DB here")
+    parser.add_argument("--out", type=Path, default=None, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline JSON from an earlier --out")
+    parser.add_argument("--metric", choices=[f"p{p}" for p in PERCENTILES] + ["mean"], default="p50")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="PCT")
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]
+    if args.seed is not None:
+        spec = replace(spec, seed=args.seed)
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="query-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        bench_engine = build_database(spec, workdir)
+        with Session(bind=bench_engine) as session:
+            queries = sample_queries(session, spec, args.queries, seed=spec.seed)
+        results = run(bench_engine, queries, args.operations, args.warmup)
+        bench_engine.dispose()
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'operation':<28}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'mean':>10}{'max':>10}")
+    for name, stats in results.items():
+        cols = [stats[f"p{p}"] for p in PERCENTILES] + [stats["mean"], stats["max"]]
+        print(f"{name:<28}" + "".join(f"{value:>10.2f}" for value in cols))
+
+    report = {
+        "preset": args.preset,
+        "spec": _spec_json(spec),
+        "queries": len(queries),
+        "environment": {
+            "python": platform.python_version(),
+            "duckdb": duckdb.__version__,
+            "sqlalchemy": sqlalchemy.__version__,
+            "machine": platform.machine(),
+            "timetable_engine": get_settings().timetable_engine,
+        },
+        "operations": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline.get("spec") != report["spec"]:
+            print("warning: baseline was recorded on a different feed spec")
+        changes = compare(results, baseline["operations"], args.metric)
+        print()
+        for name, pct in changes.items():
+            print(f"{name:<28}{args.metric} {pct:+.1f}%")
+        limit: Optional[float] = args.fail_on_regression
+        regressed = [name for name, pct in changes.items() if limit is not None and pct > limit]
+        if regressed:
+            print(f"Regression over {limit}% in: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
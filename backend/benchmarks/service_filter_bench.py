@@ -0,0 +1,84 @@
+"""
+Compare the two ways departure queries restrict trips to a travel date:
+
+- ``in_list``: bind every active service_id as ``t.service_id IN :services``
+- ``join``:    join the materialized ``service_dates`` table on (service_date, service_id)
+
+Usage (from backend/):
+    python -m benchmarks.service_filter_bench --preset sweden --workdir /tmp/bench-sweden
+    python -m benchmarks.service_filter_bench --preset medium --services 12000   # more services per day
+
+Both strategies run the same seeded query mix (see ``benchmarks.query_bench``)
+through ``departures_between`` and the ``get_next_departures`` tool.
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+from dataclasses import replace
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+# query_bench first: it sets the environment defaults app.config needs
+from benchmarks import query_bench
+from app import query_planner
+from benchmarks.synthetic_gtfs import PRESETS
+
+STRATEGIES = {"in_list": False, "join": True}
+BENCH_OPERATIONS = ["departures_between", "tool:get_next_departures"]
+
+
+def run(bench_engine, queries, warmup: int) -> dict:
+    """Latency stats per (operation, strategy); the strategy is forced through has_service_dates."""
+    results = {}
+    original = query_planner.has_service_dates
+    try:
+        for strategy, use_join in STRATEGIES.items():
+            query_planner.has_service_dates = lambda session, use_join=use_join: use_join
+            for name, stats in query_bench.run(bench_engine, queries, BENCH_OPERATIONS, warmup).items():
+                results[(name, strategy)] = stats
+    finally:
+        query_planner.has_service_dates = original
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="sweden")
+    parser.add_argument("--services", type=int, default=None, help="Override the preset's service count")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--workdir", type=Path, default=None, help="Keep the generated feed and DB here")
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]
+    if args.services is not None:
+        spec = replace(spec, services=args.services)
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="service-filter-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        bench_engine = query_bench.build_database(spec, workdir)
+        with Session(bind=bench_engine) as session:
+            queries = query_bench.sample_queries(session, spec, args.queries, seed=spec.seed)
+            active = [len(query_planner.active_services(session, q.travel_date)) for q in queries]
+        results = run(bench_engine, queries, args.warmup)
+        bench_engine.dispose()
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"active rail services per queried date: median {statistics.median(active):.0f}, max {max(active)}")
+    print(f"{'operation':<28}{'strategy':<10}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for (name, strategy), stats in results.items():
+        print(f"{name:<28}{strategy:<10}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['mean']:>10.2f}")
+    print()
+    for name in BENCH_OPERATIONS:
+        speedup = results[(name, "in_list")]["p50"] / max(results[(name, "join")]["p50"], 1e-9)
+        print(f"{name:<28}join speedup x{speedup:.2f} (p50)")
+
+
+if __name__ == "__main__":
+    main()
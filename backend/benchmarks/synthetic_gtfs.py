@@ -0,0 +1,328 @@
+"""
+Deterministic synthetic GTFS feed generator.
+
+Produces a Sweden-shaped feed (stations with platforms, rail and bus routes, services
+with weekday patterns and calendar exceptions, shapes, stop areas and transfers)
+from a seed, at sizes from a toy feed for unit tests up to a national rail network:
+
+    python -m benchmarks.synthetic_gtfs out_dir --preset sweden [--seed 7] [--zip]
+
+The same spec and seed always produce byte-identical files.
+"""
+
+import argparse
+import csv
+import math
+import random
+import zipfile
+from dataclasses import asdict, dataclass, replace
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Real station names first so queries like "Stockholm" or "Göteborg" hit something
+KNOWN_STATIONS = [
+    ("Stockholm Centralstation", 59.3303, 18.0580),
+    ("Göteborg Centralstation", 57.7089, 11.9730),
+    ("Malmö Centralstation", 55.6090, 13.0000),
+    ("Uppsala Centralstation", 59.8586, 17.6460),
+    ("Linköping Centralstation", 58.4163, 15.6254),
+    ("Norrköping Centralstation", 58.5962, 16.1833),
+    ("Örebro Centralstation", 59.2793, 15.2115),
+    ("Västerås Centralstation", 59.6079, 16.5520),
+    ("Lund Centralstation", 55.7050, 13.1866),
+    ("Sundsvall Centralstation", 62.3864, 17.3240),
+    ("Umeå Centralstation", 63.8300, 20.2650),
+    ("Luleå Centralstation", 65.5848, 22.1610),
+    ("Kiruna station", 67.8600, 20.2250),
+    ("Gävle Centralstation", 60.6749, 17.1470),
+    ("Jönköping Centralstation", 57.7840, 14.1600),
+    ("Karlstad Centralstation", 59.3780, 13.4990),
+    ("Helsingborg Centralstation", 56.0430, 12.6950),
+    ("Falun Centralstation", 60.6030, 15.6250),
+    ("Borlänge Centralstation", 60.4840, 15.4340),
+    ("Södertälje Syd station", 59.1630, 17.6450),
+]
+NAME_PREFIXES = ["Å", "Ä", "Ö", "Berg", "Sjö", "Lill", "Stor", "Norr", "Söder", "Väster", "Öster", "Kungs"]
+NAME_STEMS = ["by", "holm", "sund", "vik", "köping", "torp", "hult", "näs", "dal", "ås", "berga", "fors"]
+NAME_SUFFIXES = ["station", "station", "station", "Centralstation", "C"]
+
+RAIL_ROUTE_TYPES = [101, 102, 103, 106, 401]
+BUS_ROUTE_TYPE = 700
+WEEKDAY_PATTERNS = [
+    (1, 1, 1, 1, 1, 0, 0),
+    (1, 1, 1, 1, 1, 1, 1),
+    (0, 0, 0, 0, 0, 1, 0),
+    (0, 0, 0, 0, 0, 0, 1),
+    (0, 0, 0, 0, 0, 1, 1),
+    (1, 1, 1, 1, 0, 0, 0),
+    (0, 0, 0, 0, 1, 0, 0),
+]
+
+
+@dataclass(frozen=True)
+class FeedSpec:
+    stations: int = 20
+    platforms_per_station: int = 2
+    rail_routes: int = 4
+    bus_routes: int = 1
+    trips_per_route: int = 8
+    min_stops_per_trip: int = 3
+    max_stops_per_trip: int = 8
+    services: int = 4
+    calendar_exceptions: int = 6
+    start_date: date = date(2026, 1, 1)
+    days: int = 365
+    seed: int = 42
+
+
+PRESETS: Dict[str, FeedSpec] = {
+    "toy": FeedSpec(),
+    "small": FeedSpec(
+        stations=150, rail_routes=40, bus_routes=10, trips_per_route=40,
+        max_stops_per_trip=20, services=120, calendar_exceptions=600,
+    ),
+    "medium": FeedSpec(
+        stations=500, platforms_per_station=3, rail_routes=200, bus_routes=50, trips_per_route=60,
+        min_stops_per_trip=4, max_stops_per_trip=30, services=800, calendar_exceptions=5000,
+    ),
+    # Roughly the size of the Swedish rail subset: ~1.4M stop_times, thousands of services
+    "sweden": FeedSpec(
+        stations=1200, platforms_per_station=3, rail_routes=600, bus_routes=150, trips_per_route=100,
+        min_stops_per_trip=4, max_stops_per_trip=44, services=4000, calendar_exceptions=30000,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class Station:
+    stop_id: str
+    name: str
+    lat: float
+    lon: float
+    platforms: Tuple[str, ...]
+
+
+def _fmt_time(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _distance_km(a: Station, b: Station) -> float:
+    dlat = (a.lat - b.lat) * 111.0
+    dlon = (a.lon - b.lon) * 111.0 * math.cos(math.radians((a.lat + b.lat) / 2))
+    return math.hypot(dlat, dlon)
+
+
+def _stations(spec: FeedSpec, rng: random.Random) -> List[Station]:
+    stations = []
+    used_names = set()
+    for i in range(spec.stations):
+        if i < len(KNOWN_STATIONS):
+            name, lat, lon = KNOWN_STATIONS[i]
+        else:
+            name = f"{rng.choice(NAME_PREFIXES)}{rng.choice(NAME_STEMS)} {rng.choice(NAME_SUFFIXES)}"
+            while name in used_names:
+                name = f"{rng.choice(NAME_PREFIXES)}{rng.choice(NAME_STEMS)}{rng.choice(NAME_STEMS)} station"
+            lat, lon = rng.uniform(55.4, 68.0), rng.uniform(11.5, 23.5)
+        used_names.add(name)
+        stop_id = f"7400{i:05d}"
+        platforms = tuple(f"9022{i:05d}{p:02d}" for p in range(1, spec.platforms_per_station + 1))
+        stations.append(Station(stop_id, name, round(lat, 6), round(lon, 6), platforms))
+    return stations
+
+
+def _neighbours(stations: List[Station], k: int = 24) -> List[List[int]]:
+    """Indices of the ``k`` nearest stations for each station."""
+    result = []
+    for i, a in enumerate(stations):
+        dists = sorted((_distance_km(a, b), j) for j, b in enumerate(stations) if j != i)
+        result.append([j for _, j in dists[:k]])
+    return result
+
+
+def _route_stations(
+    spec: FeedSpec, rng: random.Random, stations: List[Station], neighbours: List[List[int]]
+) -> List[Station]:
+    """A plausible line: a random walk to nearby stations, heading roughly one way."""
+    n_stops = rng.randint(spec.min_stops_per_trip, min(spec.max_stops_per_trip, len(stations)))
+    current = rng.randrange(len(stations))
+    line = [current]
+    used = {current}
+    heading = rng.choice([-1, 1])
+    while len(line) < n_stops:
+        candidates = [j for j in neighbours[current] if j not in used]
+        ahead = [j for j in candidates if (stations[j].lat - stations[current].lat) * heading > -0.2]
+        candidates = ahead or candidates
+        if not candidates:
+            break
+        current = candidates[min(len(candidates) - 1, int(rng.expovariate(1.0)))]
+        used.add(current)
+        line.append(current)
+    return [stations[i] for i in line]
+
+
+def generate_feed(spec: FeedSpec, out_dir: Path) -> Dict[str, int]:
+    """Write the GTFS .txt files for ``spec`` to ``out_dir``; returns row counts per file."""
+    rng = random.Random(spec.seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts: Dict[str, int] = {}
+    end_date = spec.start_date + timedelta(days=spec.days - 1)
+
+    def write(name: str, header: List[str], rows) -> None:
+        with (out_dir / f"{name}.txt").open("w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh, lineterminator="\n")
+            writer.writerow(header)
+            n = 0
+            for row in rows:
+                writer.writerow(row)
+                n += 1
+        counts[name] = n
+
+    stations = _stations(spec, rng)
+    neighbours = _neighbours(stations)
+    agencies = [("A1", "SJ"), ("A2", "Mälartåg"), ("A3", "Norrtåg"), ("A4", "Länstrafiken")]
+    write(
+        "agency",
+        ["agency_id", "agency_name", "agency_url", "agency_timezone", "agency_lang"],
+        ((aid, name, "https://example.se", "Europe/Stockholm", "sv") for aid, name in agencies),
+    )
+
+    def stop_rows():
+        for st in stations:
+            yield (st.stop_id, st.name, st.lat, st.lon, 1, "", "")
+            for idx, platform in enumerate(st.platforms, start=1):
+                yield (platform, st.name, st.lat, st.lon, 0, st.stop_id, str(idx))
+
+    write(
+        "stops",
+        ["stop_id", "stop_name", "stop_lat", "stop_lon", "location_type", "parent_station", "platform_code"],
+        stop_rows(),
+    )
+    write("areas", ["area_id", "area_name", "area_type"], ((f"A{st.stop_id}", st.name, "stop_area") for st in stations))
+    write(
+        "stop_areas",
+        ["area_id", "stop_id"],
+        ((f"A{st.stop_id}", platform) for st in stations for platform in st.platforms),
+    )
+    write(
+        "transfers",
+        ["from_stop_id", "to_stop_id", "transfer_type", "min_transfer_time"],
+        (
+            (a, b, 2, 180 if a == b else 300)
+            for st in stations
+            for a in st.platforms
+            for b in st.platforms
+        ),
+    )
+
+    services = [f"S{i:05d}" for i in range(spec.services)]
+    calendar_rows = []
+    for service_id in services:
+        pattern = rng.choice(WEEKDAY_PATTERNS)
+        start = spec.start_date + timedelta(days=rng.randint(0, spec.days // 4))
+        end = end_date - timedelta(days=rng.randint(0, spec.days // 4))
+        calendar_rows.append((service_id, *pattern, start.strftime("%Y%m%d"), end.strftime("%Y%m%d")))
+    write(
+        "calendar",
+        ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+         "start_date", "end_date"],
+        calendar_rows,
+    )
+    exceptions = {}
+    for _ in range(spec.calendar_exceptions):
+        key = (rng.choice(services), spec.start_date + timedelta(days=rng.randrange(spec.days)))
+        exceptions[key] = rng.choice((1, 2))
+    write(
+        "calendar_dates",
+        ["service_id", "date", "exception_type"],
+        ((sid, day.strftime("%Y%m%d"), kind) for (sid, day), kind in sorted(exceptions.items())),
+    )
+
+    routes, trips, shapes = [], [], []
+    stop_times_path = out_dir / "stop_times.txt"
+    n_stop_times = 0
+    with stop_times_path.open("w", newline="", encoding="utf-8") as fh:
+        st_writer = csv.writer(fh, lineterminator="\n")
+        st_writer.writerow(
+            ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence", "pickup_type",
+             "drop_off_type", "shape_dist_traveled"]
+        )
+        for r in range(spec.rail_routes + spec.bus_routes):
+            is_rail = r < spec.rail_routes
+            route_id = f"R{r:05d}"
+            route_type = rng.choice(RAIL_ROUTE_TYPES) if is_rail else BUS_ROUTE_TYPE
+            agency_id = rng.choice(agencies[:3] if is_rail else agencies[3:])[0]
+            line = _route_stations(spec, rng, stations, neighbours)
+            routes.append((route_id, agency_id, str(r % 100 + 1), f"{line[0].name} - {line[-1].name}", route_type))
+            speed_kmh = rng.uniform(70, 160) if is_rail else 45
+            first_departure = rng.randint(4 * 3600, 8 * 3600)
+            # Spread the trips over the service day; late ones run past 24:00:00
+            span = rng.randint(14, 19) * 3600
+            headway = max(300, span // max(1, spec.trips_per_route // 2) // 60 * 60)
+            for direction in (0, 1):
+                stops = line if direction == 0 else line[::-1]
+                shape_id = f"SH{r:05d}_{direction}"
+                dist = 0.0
+                for seq, st in enumerate(stops, start=1):
+                    if seq > 1:
+                        dist += _distance_km(stops[seq - 2], st)
+                    shapes.append((shape_id, st.lat, st.lon, seq, round(dist * 1000, 1)))
+                platform = [st.platforms[(r + direction) % len(st.platforms)] for st in stops]
+                for k in range(spec.trips_per_route // 2 + (direction == 0 and spec.trips_per_route % 2)):
+                    trip_id = f"T{r:05d}_{direction}_{k:03d}"
+                    service_id = rng.choice(services)
+                    trips.append((route_id, service_id, trip_id, stops[-1].name, direction, shape_id))
+                    clock = first_departure + k * headway + direction * 600
+                    dist = 0.0
+                    for seq, st in enumerate(stops, start=1):
+                        if seq > 1:
+                            leg = _distance_km(stops[seq - 2], st)
+                            dist += leg
+                            clock += max(120, int(leg / speed_kmh * 3600) // 60 * 60)
+                        arrival = clock
+                        if 1 < seq < len(stops):
+                            clock += 120
+                        st_writer.writerow(
+                            [trip_id, _fmt_time(arrival), _fmt_time(clock), platform[seq - 1], seq,
+                             0, 0, round(dist * 1000, 1)]
+                        )
+                        n_stop_times += 1
+    counts["stop_times"] = n_stop_times
+
+    write("routes", ["route_id", "agency_id", "route_short_name", "route_long_name", "route_type"], routes)
+    write("trips", ["route_id", "service_id", "trip_id", "trip_headsign", "direction_id", "shape_id"], trips)
+    write("shapes", ["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence", "shape_dist_traveled"], shapes)
+    return counts
+
+
+def generate_feed_zip(spec: FeedSpec, zip_path: Path) -> Dict[str, int]:
+    """Like generate_feed, but packs the files into a zip next to ``zip_path``."""
+    zip_path = Path(zip_path)
+    work_dir = zip_path.with_suffix(".d")
+    counts = generate_feed(spec, work_dir)
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in sorted(counts):
+            zf.write(work_dir / f"{name}.txt", f"{name}.txt")
+            (work_dir / f"{name}.txt").unlink()
+    work_dir.rmdir()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", type=Path, help="Output directory (or .zip path with --zip)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="toy")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--zip", action="store_true", help="Write a zip archive instead of a directory")
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]
+    if args.seed is not None:
+        spec = replace(spec, seed=args.seed)
+    counts = generate_feed_zip(spec, args.out) if args.zip else generate_feed(spec, args.out)
+    print({"spec": {k: str(v) for k, v in asdict(spec).items()}, "rows": counts})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Storage benchmark for compact trip times (``app.trip_times``): stop patterns plus
+shared time profiles against the per-row ``stop_times_rail`` they factor.
+
+Usage (from backend/):
+    python -m benchmarks.trip_storage_bench --preset sweden --workdir /tmp/bench-sweden
+    python -m benchmarks.trip_storage_bench --database /data/gtfs.duckdb   # a loaded real feed
+
+Reports rows and on-disk size of each representation (each table set copied into
+a fresh DuckDB file), the memory the per-row trip arrays of the in-memory
+timetable take against ``TripTimes``, and ``route_stops`` latency from SQL and
+from the cached profiles.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "duckdb:///:memory:")
+os.environ.setdefault("TRAFIKLAB_API_KEY", "benchmark")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import duckdb  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import query_planner  # noqa: E402
+from app.timetable import shared_timetable  # noqa: E402
+from app.trip_times import get_trip_times  # noqa: E402
+from benchmarks.query_bench import PERCENTILES, build_database, latency_stats  # noqa: E402
+from benchmarks.synthetic_gtfs import PRESETS  # noqa: E402
+
+ROW_TABLES = ("stop_times_rail",)
+COMPACT_TABLES = ("pattern_stops_rail", "time_profiles_rail", "trip_times_rail")
+
+
+def disk_bytes(database: Path, tables, scratch: Path) -> int:
+    """Size of a fresh DuckDB file holding copies of ``tables``."""
+    target = scratch / f"{'-'.join(tables)}.duckdb"
+    with duckdb.connect(str(target)) as conn:
+        conn.execute(f"ATTACH '{database}' AS source (READ_ONLY)")
+        for table in tables:
+            conn.execute(f"CREATE TABLE {table} AS SELECT * FROM source.{table}")
+        conn.execute("DETACH source")
+        conn.execute("CHECKPOINT")
+    size = target.stat().st_size
+    target.unlink()
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--database", type=Path, default=None, help="Existing DuckDB file instead of a preset")
+    parser.add_argument("--workdir", type=Path, default=None, help="Keep the generated feed and DB here")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = None
+    if args.database:
+        database = args.database
+    else:
+        workdir = args.workdir or Path(tempfile.mkdtemp(prefix="trip-storage-bench-"))
+        workdir.mkdir(parents=True, exist_ok=True)
+        build_database(PRESETS[args.preset], workdir).dispose()
+        database = workdir / "bench.duckdb"
+
+    scratch = Path(tempfile.mkdtemp(prefix="trip-storage-"))
+    try:
+        bench_engine = create_engine(f"duckdb:///{database}", connect_args={"read_only": True})
+        with Session(bind=bench_engine) as session:
+            rows = {
+                table: session.execute(text(f"SELECT count(*) FROM {table}")).scalar_one()
+                for table in ROW_TABLES + COMPACT_TABLES
+            }
+            trip_times = get_trip_times(session)
+            if trip_times is None:
+                sys.exit("The database has no trip_times_rail; re-run ingestion")
+            timetable = shared_timetable(session)
+            trip_ids = list(trip_times.trip_codes)
+            rng = random.Random(args.seed)
+            queries = [rng.choice(trip_ids) for _ in range(args.queries)]
+            samples = {"route_stops (sql)": [], "route_stops (profiles)": []}
+            for trip_id in queries:
+                started = time.perf_counter()
+                query_planner._route_stops_sql(session, trip_id)
+                samples["route_stops (sql)"].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                trip_times.route_stops(trip_id)
+                samples["route_stops (profiles)"].append(time.perf_counter() - started)
+        bench_engine.dispose()
+        row_disk = disk_bytes(database, ROW_TABLES, scratch)
+        compact_disk = disk_bytes(database, COMPACT_TABLES, scratch)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if workdir is not None and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # The timetable's per-row arrays that route_stops reads
+    row_arrays = (
+        timetable.st_trip,
+        timetable.st_stop,
+        timetable.st_sequence,
+        timetable.st_arrival,
+        timetable.st_departure,
+        timetable.trip_ptr,
+    )
+    row_memory = sum(array.nbytes for array in row_arrays)
+    print(
+        f"{len(trip_times):,} trips, {trip_times.profile_count:,} time profiles, "
+        + ", ".join(f"{table} {count:,} rows" for table, count in rows.items())
+    )
+    print(f"{'representation':<28}{'disk MB':>10}{'memory MB':>12}")
+    print(f"{'stop_times_rail':<28}{row_disk / 1e6:>10.2f}{row_memory / 1e6:>12.2f}")
+    print(f"{'patterns + profiles':<28}{compact_disk / 1e6:>10.2f}{trip_times.nbytes / 1e6:>12.2f}")
+    print(f"{'operation':<28}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'mean':>10}{'max':>10}")
+    for name, values in samples.items():
+        stats = latency_stats(values)
+        cols = [stats[f"p{p}"] for p in PERCENTILES] + [stats["mean"], stats["max"]]
+        print(f"{name:<28}" + "".join(f"{value:>10.2f}" for value in cols))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,61 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 # Provide minimal env defaults for settings during tests
 os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
 os.environ.setdefault("TRAFIKLAB_API_KEY", "test-key")
+# Tests compare query paths on the same inputs; caching is enabled explicitly where tested
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
 
 # Ensure the backend package is importable in tests
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
+
+
+@pytest.fixture(scope="session")
+def synthetic_feed_dir(tmp_path_factory):
+    """The toy synthetic GTFS feed as extracted .txt files."""
+    from benchmarks.synthetic_gtfs import PRESETS, generate_feed
+
+    feed_dir = tmp_path_factory.mktemp("synthetic-feed")
+    generate_feed(PRESETS["toy"], feed_dir)
+    return feed_dir
+
+
+@pytest.fixture(scope="session")
+def synthetic_engine(synthetic_feed_dir, tmp_path_factory):
+    """DuckDB engine with the toy feed loaded and the rail subset built."""
+    from sqlalchemy import create_engine
+
+    from app.ingestion.gtfs_loader import load_feed
+
+    eng = create_engine(f"duckdb:///{tmp_path_factory.mktemp('synthetic-db') / 'gtfs.duckdb'}")
+    load_feed({path.stem: path for path in synthetic_feed_dir.glob("*.txt")}, bind=eng, max_workers=2)
+    yield eng
+    eng.dispose()
+
+
+@pytest.fixture
+def synthetic_client(synthetic_engine):
+    """TestClient for the API with every request's session bound to ``synthetic_engine``."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import Session
+
+    from app.deps import get_db
+    from app.main import app
+
+    def session_override():
+        with Session(bind=synthetic_engine) as session:
+            yield session
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = session_override
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
@@ -0,0 +1,124 @@
+from datetime import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import cache, query_planner
+from app.cache import ResultCache, feed_key
+from app.config import get_settings
+from app.db import engine_cached
+from app.main import app
+from app.service_calendar import get_service_calendar
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    enabled = ResultCache(max_entries=64, ttl_seconds=60)
+    monkeypatch.setattr(cache, "_cache", enabled)
+    return enabled
+
+
+def test_lru_eviction_ttl_and_counters():
+    clock = FakeClock()
+    lru = ResultCache(max_entries=2, ttl_seconds=10, clock=clock)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert lru.get_or_compute("ns", "a", lambda: compute(1)) == 1
+    assert lru.get_or_compute("ns", "b", lambda: compute(2)) == 2
+    assert lru.get_or_compute("ns", "a", lambda: compute(99)) == 1  # hit, "a" now most recent
+    lru.get_or_compute("ns", "c", lambda: compute(3))  # evicts "b"
+    assert lru.get_or_compute("ns", "b", lambda: compute(4)) == 4
+    clock.now = 11
+    assert lru.get_or_compute("ns", "b", lambda: compute(5)) == 5  # expired
+    assert calls == [1, 2, 3, 4, 5]
+
+    stats = lru.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 5, 2)
+    assert (stats["evictions"], stats["expirations"]) == (2, 1)
+    assert stats["namespaces"] == {"ns": {"hits": 1, "misses": 5}}
+    lru.clear()
+    assert lru.stats()["entries"] == 0
+    assert not ResultCache(max_entries=0, ttl_seconds=10).enabled
+
+
+def test_queries_hit_the_cache_with_normalized_keys(synthetic_engine, result_cache):
+    with Session(bind=synthetic_engine) as session:
+        travel_date = get_service_calendar(session).window_start
+        first = query_planner.departures_between(session, "Göteborg C", "Stockholm C", travel_date, time(7))
+        # Same stations spelled differently
+        again = query_planner.departures_between(session, "goteborg centralstation", "STOCKHOLM", travel_date, time(7))
+        query_planner.departures_between(session, "Göteborg C", "Stockholm C", travel_date, time(8))
+        assert first == query_planner.departures_between.uncached(
+            session, "Göteborg C", "Stockholm C", travel_date, time(7)
+        )
+        stops = query_planner.search_stops(session, "Göteborg")
+        assert query_planner.search_stops(session, "goteborg") is stops
+    assert again is first
+    stats = result_cache.stats()["namespaces"]
+    assert stats["departures_between"] == {"hits": 1, "misses": 2}
+    assert stats["search_stops"] == {"hits": 1, "misses": 1}
+
+
+def test_keys_follow_the_feed_version(tmp_path, result_cache):
+    feed = create_engine(f"duckdb:///{tmp_path / 'feed.duckdb'}")
+    with Session(bind=feed) as session:
+        unversioned = feed_key(session)
+    with feed.begin() as conn:
+        conn.execute(text("CREATE TABLE feed_version (version VARCHAR)"))
+        conn.execute(text("INSERT INTO feed_version VALUES ('20261018T031500Z')"))
+    feed.dispose()
+    # A swap binds sessions to a new engine, which reads its version once
+    swapped = create_engine(f"duckdb:///{tmp_path / 'feed.duckdb'}")
+    with Session(bind=swapped) as session:
+        versioned = feed_key(session)
+    assert unversioned[1] is None and versioned[1] == "20261018T031500Z"
+    assert unversioned != versioned
+
+    result_cache.get_or_compute("ns", (versioned, 1), lambda: "answer")
+    cache.invalidate()
+    assert result_cache.stats()["entries"] == 0
+    swapped.dispose()
+
+
+def test_in_place_reload_is_seen_by_other_processes(tmp_path, monkeypatch):
+    feed = create_engine(f"duckdb:///{tmp_path / 'feed.duckdb'}")
+
+    def stamp(version: str) -> None:
+        with feed.begin() as conn:
+            conn.execute(text("CREATE OR REPLACE TABLE feed_version (version VARCHAR)"))
+            conn.execute(text("INSERT INTO feed_version VALUES (:version)"), {"version": version})
+
+    def read() -> tuple:
+        with Session(bind=feed) as session:
+            return feed_key(session)[1], engine_cached(session, "probe", lambda conn: object())
+
+    stamp("v1")
+    version, loaded = read()
+    # Reloaded by another process: no invalidate() here, only a new stamp
+    stamp("v2")
+    assert read() == (version, loaded) == ("v1", loaded)
+    monkeypatch.setattr(get_settings(), "feed_version_check_interval", 0.0)
+    version, reloaded = read()
+    assert version == "v2" and reloaded is not loaded
+    feed.dispose()
+
+
+def test_health_reports_cache_stats(result_cache):
+    result_cache.get_or_compute("ns", "a", lambda: 1)
+    result_cache.get_or_compute("ns", "a", lambda: 1)
+    body = TestClient(app).get("/api/health").json()
+    assert body["cache"]["hits"] == 1 and body["cache"]["misses"] == 1
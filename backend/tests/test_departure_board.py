@@ -0,0 +1,134 @@
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+from typing import Tuple
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.config import get_settings
+from app.departure_board import board_page, decode_cursor, departure_board, encode_cursor
+from app.stop_index import get_stop_index
+
+
+@pytest.fixture(params=["sql", "memory"])
+def engine_setting(request, monkeypatch):
+    monkeypatch.setattr(get_settings(), "timetable_engine", request.param)
+    return request.param
+
+
+def overnight_board(session: Session) -> Tuple[str, date]:
+    """A station and date whose board mixes that day's trains with the previous day's past-24:00 ones."""
+    row = session.execute(
+        text(
+            """
+            WITH daily AS (
+                SELECT sd.service_date, count(*) AS trips
+                FROM service_dates sd JOIN trips_rail t ON t.service_id = sd.service_id
+                GROUP BY 1
+            ),
+            day AS (
+                SELECT d.service_date FROM daily d
+                JOIN daily p ON p.service_date = d.service_date - INTERVAL 1 DAY
+                JOIN daily n ON n.service_date = d.service_date + INTERVAL 1 DAY
+                ORDER BY least(d.trips, p.trips, n.trips) DESC, 1
+                LIMIT 1
+            )
+            SELECT s.stop_name, day.service_date
+            FROM day
+            JOIN service_dates sd ON sd.service_date = day.service_date - INTERVAL 1 DAY
+            JOIN trips_rail t ON t.service_id = sd.service_id
+            JOIN stop_times_rail st ON st.trip_id = t.trip_id AND st.departure_time >= 86400
+            JOIN stops_rail s ON s.stop_id = st.stop_id
+            GROUP BY 1, 2
+            ORDER BY count(*) DESC, 1
+            LIMIT 1
+            """
+        )
+    ).one()
+    return row.stop_name, row.service_date
+
+
+def key(row: dict) -> tuple:
+    return row["date"], row["departure"], row["trip_id"]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    cursor = encode_cursor("740000001", 12345, "trip/Ö 1")
+    assert decode_cursor(cursor) == ("740000001", 12345, "trip/Ö 1")
+    for garbage in ["not a cursor", encode_cursor("a", 1, "b")[:-3], "WzEsMiwzXQ"]:
+        with pytest.raises(ValueError):
+            decode_cursor(garbage)
+
+
+def test_pages_concatenate_to_the_whole_board(synthetic_engine, engine_setting):
+    with Session(bind=synthetic_engine) as session:
+        station, start = overnight_board(session)
+        whole = board_page(session, station, start, time(21, 0), limit=60)
+        paged, cursor = [], None
+        while len(paged) < len(whole.rows):
+            page = board_page(session, station, start, time(21, 0), limit=7, cursor=cursor)
+            paged.extend(page.rows)
+            cursor = page.next_cursor
+    assert [key(row) for row in paged[: len(whole.rows)]] == [key(row) for row in whole.rows]
+    # In time order across midnight, never repeating a departure
+    assert [key(row) for row in whole.rows] == sorted(key(row) for row in whole.rows)
+    assert len({key(row) for row in paged}) == len(paged)
+    assert {start.isoformat(), (start + timedelta(days=1)).isoformat()} <= {row["date"] for row in whole.rows}
+
+
+def test_board_after_midnight_includes_the_previous_service_day(synthetic_engine, engine_setting):
+    with Session(bind=synthetic_engine) as session:
+        station, start = overnight_board(session)
+        page = board_page(session, station, start, time(0, 0), limit=50)
+    previous = [row for row in page.rows if row["service_date"] == (start - timedelta(days=1)).isoformat()]
+    assert previous and all(row["date"] == start.isoformat() for row in previous)
+    assert all(row["departure"] < "24:00:00" for row in page.rows)
+
+
+def test_board_matches_across_engines(synthetic_engine, monkeypatch):
+    with Session(bind=synthetic_engine) as session:
+        station, start = overnight_board(session)
+        pages = {}
+        for engine in ("sql", "memory"):
+            monkeypatch.setattr(get_settings(), "timetable_engine", engine)
+            first = board_page(session, station, start, time(23, 15), limit=9)
+            pages[engine] = [first.rows, board_page(session, None, start, limit=9, cursor=first.next_cursor).rows]
+    assert pages["sql"] == pages["memory"]
+
+
+def test_board_page_size_is_bounded(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        station, start = overnight_board(session)
+        context = SimpleNamespace(state={"session": session})
+        smallest = adk_tools.get_departure_board(
+            station, start.isoformat(), "22:00", limit_rows=0, tool_context=context
+        )
+        with pytest.raises(ValueError):
+            departure_board(session, get_stop_index(session).resolve(station), 0, limit=0)
+    assert smallest["count"] == 1 and smallest["next_cursor"]
+
+
+def test_departure_board_tool_and_endpoint(synthetic_engine, synthetic_client):
+    with Session(bind=synthetic_engine) as session:
+        station, start = overnight_board(session)
+        start = start.isoformat()
+        context = SimpleNamespace(state={"session": session})
+        first = adk_tools.get_departure_board(station, start, "22:00", limit_rows=5, tool_context=context)
+        second = adk_tools.get_departure_board(station, cursor=first["next_cursor"], limit_rows=5, tool_context=context)
+        invalid = adk_tools.get_departure_board(station, cursor="nonsense", tool_context=context)
+    assert first["count"] == second["count"] == 5
+    assert key(first["departures"][-1]) < key(second["departures"][0])
+    assert "cursor" in invalid["error"]
+
+    params = {"station": station, "date": start, "after": "22:00", "limit": 5}
+    resp = synthetic_client.get("/api/departures/board", params=params)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["departures"] == first["departures"] and body["next_cursor"] == first["next_cursor"]
+    resp = synthetic_client.get("/api/departures/board", params={"cursor": body["next_cursor"], "limit": 5})
+    assert resp.json()["departures"] == second["departures"]
+    assert synthetic_client.get("/api/departures/board").status_code == 400
+    assert synthetic_client.get("/api/departures/board", params={"cursor": "nonsense"}).status_code == 400
+    assert synthetic_client.get("/api/departures/board", params={"station": "Nowhere at all"}).status_code == 404
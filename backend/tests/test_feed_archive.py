@@ -0,0 +1,45 @@
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.ingestion.feed_archive import FeedArchive, readable_path
+from app.ingestion.gtfs_loader import load_csv_to_table
+
+STOP_TIMES = (
+    "﻿trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+    + "".join(f"T{i},08:{i % 60:02d}:00,08:{i % 60:02d}:30,S{i % 7},{i}\n" for i in range(5000))
+)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    zip_path = tmp_path / "sweden.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("gtfs/stop_times.txt", STOP_TIMES)
+        zf.writestr("gtfs/agency.txt", "agency_id,agency_name\nA,SJ\n")
+    return FeedArchive(zip_path)
+
+
+@pytest.mark.parametrize("method", ["duckdb", "pandas"])
+def test_loads_members_without_extracting(tmp_path, archive, method):
+    eng = create_engine(f"duckdb:///{tmp_path / 'gtfs.duckdb'}")
+    member = archive.member("stop_times.txt")
+    assert member.size == len(STOP_TIMES.encode())
+
+    assert load_csv_to_table(member, "stop_times", bind=eng, method=method) == 5000
+    with eng.connect() as conn:
+        max_dep = conn.execute(text("SELECT max(departure_time) FROM stop_times")).scalar_one()
+    assert max_dep == 8 * 3600 + 59 * 60 + 30
+    assert not list(tmp_path.rglob("*.txt"))
+    eng.dispose()
+
+
+def test_missing_member(archive):
+    assert archive.member("shapes.txt") is None
+
+
+def test_unread_pipe_does_not_block(archive):
+    # The reader never opens the pipe (e.g. the load failed early); the writer must exit
+    with readable_path(archive.member("agency.txt")) as path:
+        assert path.exists()
@@ -0,0 +1,114 @@
+import hashlib
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.config import get_settings
+from app.ingestion import gtfs_loader
+from app.ingestion.gtfs_loader import download_gtfs_zip, ingest, read_feed_state, write_feed_state
+
+ARCHIVE = b"PK\x03\x04" + bytes(range(256)) * 4096
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Stand-in for the Trafiklab feed host; honours If-None-Match."""
+
+    etag = '"v1"'
+    send_validators = True
+
+    def do_GET(self):
+        if self.send_validators and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(ARCHIVE)))
+        if self.send_validators:
+            self.send_header("ETag", self.etag)
+            self.send_header("Last-Modified", "Sat, 17 Oct 2026 02:00:00 GMT")
+        self.end_headers()
+        self.wfile.write(ARCHIVE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/sweden.zip"
+    server.shutdown()
+    FeedHandler.send_validators = True
+    FeedHandler.etag = '"v1"'
+
+
+def test_streams_archive_to_disk(tmp_path, feed_server):
+    dest = tmp_path / "sweden.zip"
+    download = download_gtfs_zip(dest, url=feed_server, chunk_size=4096)
+    assert download.changed
+    assert dest.read_bytes() == ARCHIVE
+    assert download.sha256 == hashlib.sha256(ARCHIVE).hexdigest()
+    assert download.etag == '"v1"'
+    assert not (tmp_path / "sweden.zip.part").exists()
+
+
+def test_conditional_fetch_not_modified(tmp_path, feed_server):
+    first = download_gtfs_zip(tmp_path / "a.zip", url=feed_server)
+    second = download_gtfs_zip(tmp_path / "b.zip", previous_state=first.state(), url=feed_server)
+    assert not second.changed
+    assert not (tmp_path / "b.zip").exists()
+
+
+def test_content_hash_detects_unchanged_feed_without_validators(tmp_path, feed_server):
+    FeedHandler.send_validators = False
+    first = download_gtfs_zip(tmp_path / "a.zip", url=feed_server)
+    second = download_gtfs_zip(tmp_path / "b.zip", previous_state=first.state(), url=feed_server)
+    assert first.changed
+    assert not second.changed
+    assert second.sha256 == first.sha256
+
+
+def test_unchanged_content_under_new_etag_refreshes_feed_state(tmp_path, feed_server, monkeypatch):
+    monkeypatch.setattr(get_settings(), "gtfs_data_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "gtfs_feed_url", feed_server)
+    write_feed_state(download_gtfs_zip(tmp_path / "a.zip", url=feed_server))
+    FeedHandler.etag = '"v2"'
+
+    assert ingest() is False
+    state = read_feed_state()
+    assert state["etag"] == '"v2"'
+    assert state["sha256"] == hashlib.sha256(ARCHIVE).hexdigest()
+    assert state["size_bytes"] == len(ARCHIVE)
+    # The refreshed validator now short-circuits to a 304
+    assert not download_gtfs_zip(tmp_path / "b.zip", previous_state=state, url=feed_server).changed
+    assert not (tmp_path / "b.zip").exists()
+
+
+def test_failed_build_leaves_no_version_files(tmp_path, feed_server, monkeypatch):
+    monkeypatch.setattr(get_settings(), "gtfs_data_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "gtfs_feed_url", feed_server)
+    monkeypatch.setattr(get_settings(), "database_url", f"duckdb:///{tmp_path / 'gtfs.duckdb'}")
+
+    writers = []
+
+    def broken_archive(path):
+        # A writer still holding the version file keeps its write-ahead log on disk
+        (version_file,) = (tmp_path / "versions").glob("*.duckdb")
+        writer = create_engine(f"duckdb:///{version_file}").connect()
+        writer.execute(text("CREATE TABLE half_built AS SELECT range AS n FROM range(1000)"))
+        writer.commit()
+        writers.append(writer)
+        raise zipfile.BadZipFile("truncated archive")
+
+    monkeypatch.setattr(gtfs_loader, "FeedArchive", broken_archive)
+    with pytest.raises(zipfile.BadZipFile):
+        ingest()
+    assert list((tmp_path / "versions").iterdir()) == []
+    assert read_feed_state() == {}
+    writers[0].close()
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import db
+from app.feed_versions import FeedStore
+
+
+def build_version(store: FeedStore, version: str) -> None:
+    store.versions_dir.mkdir(parents=True, exist_ok=True)
+    eng = create_engine(store.version_url(version))
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE feed_version AS SELECT :v AS version"), {"v": version})
+    eng.dispose()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = FeedStore(tmp_path)
+    monkeypatch.setattr(db, "_feed_store", store)
+    monkeypatch.setattr(db, "_version_engines", {})
+    yield store
+    for eng in db._version_engines.values():
+        eng.dispose()
+
+
+def current_version() -> str:
+    session = db.SessionLocal()
+    try:
+        return session.execute(text("SELECT version FROM feed_version")).scalar_one()
+    finally:
+        session.close()
+
+
+def test_swap_and_rollback(store):
+    build_version(store, "v1")
+    store.activate("v1")
+    assert current_version() == "v1"
+
+    in_flight = db.SessionLocal()
+    build_version(store, "v2")
+    store.activate("v2")
+    assert db.active_feed_version() == "v2"
+    assert current_version() == "v2"
+    # A session opened before the swap keeps reading the version it started on
+    assert in_flight.execute(text("SELECT version FROM feed_version")).scalar_one() == "v1"
+    in_flight.close()
+
+    store.rollback()
+    assert current_version() == "v1"
+    assert store.pointer()["previous"] == "v2"
+
+
+def test_prune_keeps_active_and_previous(store):
+    for version in ("v1", "v2", "v3", "v4"):
+        build_version(store, version)
+    store.activate("v1")
+    store.activate("v2")
+    removed = store.prune(keep=1)
+    assert removed == ["v3"]
+    assert store.versions() == ["v1", "v2", "v4"]
+
+
+def test_activate_unknown_version(store):
+    with pytest.raises(FileNotFoundError):
+        store.activate("missing")
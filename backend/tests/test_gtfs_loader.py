@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.ingestion.gtfs_loader import load_csv_to_table, load_feed, rail_steps
+from app.models import Base
+from app.query_planner import has_trip_patterns, route_stops
+
+
+@pytest.fixture
+def duck_engine(tmp_path):
+    eng = create_engine(f"duckdb:///{tmp_path / 'gtfs.duckdb'}")
+    yield eng
+    eng.dispose()
+
+
+@pytest.mark.parametrize("method", ["duckdb", "pandas"])
+def test_calendar_fixups(tmp_path, duck_engine, method):
+    csv = tmp_path / "calendar.txt"
+    csv.write_text(
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+        "S1,1,1,1,1,1,0,0,20250101,20251231\n"
+    )
+    assert load_csv_to_table(csv, "calendar", bind=duck_engine, method=method) == 1
+    with duck_engine.connect() as conn:
+        row = conn.execute(text("SELECT monday, saturday, CAST(start_date AS DATE) FROM calendar")).one()
+    assert row[0] is True
+    assert row[1] is False
+    assert str(row[2]) == "2025-01-01"
+
+
+@pytest.mark.parametrize("method", ["duckdb", "pandas"])
+def test_stops_projection_and_stop_areas_dedup(tmp_path, duck_engine, method):
+    stops = tmp_path / "stops.txt"
+    stops.write_text(
+        "stop_id,stop_name,stop_lat,stop_lon,stop_desc\n"
+        "1,Stockholm Centralstation,59.33,18.05,x\n"
+        "2,Uppsala Centralstation,bad,17.64,y\n"
+    )
+    areas = tmp_path / "stop_areas.txt"
+    areas.write_text("area_id,stop_id\nA,1\nA,1\nA,2\n")
+
+    assert load_csv_to_table(stops, "stops", bind=duck_engine, method=method) == 2
+    assert load_csv_to_table(areas, "stop_areas", bind=duck_engine, method=method) == 2
+    with duck_engine.connect() as conn:
+        columns = [row[0] for row in conn.execute(text("DESCRIBE stops"))]
+        lat = conn.execute(text("SELECT stop_lat FROM stops WHERE stop_id = '2'")).scalar_one()
+    assert columns == [
+        "stop_id",
+        "stop_name",
+        "stop_lat",
+        "stop_lon",
+        "location_type",
+        "parent_station",
+        "platform_code",
+    ]
+    assert lat is None
+
+
+def test_missing_file_is_skipped(tmp_path, duck_engine):
+    assert load_csv_to_table(tmp_path / "transfers.txt", "transfers", bind=duck_engine) == 0
+
+
+@pytest.mark.parametrize("method", ["duckdb", "pandas"])
+def test_stop_times_are_typed(tmp_path, duck_engine, method):
+    csv = tmp_path / "stop_times.txt"
+    csv.write_text(
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        "T1,7:05:00,7:06:00,A,9\n"
+        "T1,25:10:00,25:10:00,B,10\n"
+        "T1,,,C,11\n"
+    )
+    assert load_csv_to_table(csv, "stop_times", bind=duck_engine, method=method) == 3
+    with duck_engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT departure_time, stop_sequence FROM stop_times ORDER BY stop_sequence")
+        ).all()
+    assert [tuple(r) for r in rows] == [(25560, 9), (90600, 10), (None, 11)]
+
+
+def test_rail_subset_builds_on_other_databases(tmp_path, synthetic_feed_dir):
+    # DuckDB-only steps and the steps built on them are left out; queries fall back
+    eng = create_engine(f"sqlite:///{tmp_path / 'gtfs.sqlite'}")
+    Base.metadata.create_all(bind=eng)
+    load_feed({path.stem: path for path in synthetic_feed_dir.glob("*.txt")}, bind=eng, max_workers=2)
+    tables = set(inspect(eng).get_table_names())
+    duckdb_only = {step.name for step in rail_steps() if step.duckdb_only}
+    assert {"stop_times_rail", "service_dates", "station_stops_rail", "shape_geometries_rail"} <= tables
+    assert not tables & (duckdb_only | {"pattern_stops_rail", "pattern_od_rail"})
+    with Session(bind=eng) as session:
+        trip_id = session.execute(text("SELECT min(trip_id) FROM trips_rail")).scalar_one()
+        assert not has_trip_patterns(session)
+        assert route_stops(session, trip_id)
+    eng.dispose()
@@ -0,0 +1,17 @@
+from datetime import time
+
+from app.gtfs_time import format_gtfs_time, parse_gtfs_time, time_to_seconds
+
+
+def test_parse_handles_unpadded_and_past_midnight_times():
+    assert parse_gtfs_time("7:05:00") == 7 * 3600 + 5 * 60
+    assert parse_gtfs_time("25:10:00") == 25 * 3600 + 10 * 60
+    assert parse_gtfs_time(" ") is None
+    assert parse_gtfs_time("7:05:00") < parse_gtfs_time("10:00:00")
+
+
+def test_format_round_trips():
+    assert format_gtfs_time(90600) == "25:10:00"
+    assert format_gtfs_time(parse_gtfs_time("7:05:00")) == "07:05:00"
+    assert format_gtfs_time(None) is None
+    assert time_to_seconds(time(14, 0)) == 50400
@@ -0,0 +1,39 @@
+import json
+
+from sqlalchemy import create_engine
+
+from app.ingestion.gtfs_loader import load_feed
+from app.ingestion.report import RssMonitor, build_report, compare_reports, list_reports, write_report
+
+
+def test_report_covers_tables_stages_and_statements(synthetic_feed_dir, tmp_path):
+    sources = {path.stem: path for path in synthetic_feed_dir.glob("*.txt")}
+    eng = create_engine(f"duckdb:///{tmp_path / 'gtfs.duckdb'}")
+    with RssMonitor(interval=0.01) as rss:
+        timings = load_feed(sources, bind=eng, max_workers=2)
+    eng.dispose()
+
+    report = build_report(timings, sources, rss, feed_version="v1", loader="duckdb", workers=2)
+
+    tables = {t.table: t for t in report.tables}
+    stop_times_lines = (synthetic_feed_dir / "stop_times.txt").read_text().count("\n") - 1
+    assert tables["stop_times"].rows == stop_times_lines
+    assert tables["stop_times"].bytes_read == (synthetic_feed_dir / "stop_times.txt").stat().st_size
+    assert report.peak_rss_bytes and all(t.peak_rss_bytes for t in report.tables)
+    assert {s.name for s in report.stages} == set(timings.tasks)
+
+    labels = {(s.step, s.kind, s.label) for s in report.statements}
+    assert ("stop_times_rail", "statement", "CREATE TABLE stop_times_rail AS") in labels
+    assert (
+        "stop_times_rail",
+        "index",
+        "CREATE INDEX IF NOT EXISTS idx_stop_times_rail_departure ON stop_times_rail(departure_time)",
+    ) in labels
+
+    first = write_report(report, tmp_path / "reports")
+    report.feed_version = "v2"
+    second = write_report(report, tmp_path / "reports")
+    assert list_reports(tmp_path / "reports") == [first, second]
+    saved = json.loads(second.read_text())
+    assert saved["schema_version"] == 1
+    assert "stop_times rows/s" in compare_reports(json.loads(first.read_text()), saved)
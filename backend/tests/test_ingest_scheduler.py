@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from app.ingestion.scheduler import Task, run_tasks
+
+
+def test_respects_dependencies_and_runs_independent_tasks_concurrently():
+    order = []
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def work(name, seconds=0.05):
+        def fn():
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(seconds)
+            with lock:
+                active["now"] -= 1
+                order.append(name)
+            return name
+
+        return fn
+
+    tasks = [
+        Task("load:routes", work("load:routes")),
+        Task("load:trips", work("load:trips")),
+        Task("load:stop_times", work("load:stop_times", 0.1), weight=100),
+        Task("rail:routes_rail", work("rail:routes_rail"), depends_on=["load:routes"]),
+        Task("rail:trips_rail", work("rail:trips_rail"), depends_on=["load:trips", "rail:routes_rail"]),
+    ]
+    timings = run_tasks(tasks, max_workers=3)
+
+    assert set(timings.tasks) == {t.name for t in tasks}
+    assert order.index("rail:routes_rail") > order.index("load:routes")
+    assert order.index("rail:trips_rail") > order.index("rail:routes_rail")
+    assert active["max"] > 1
+    assert timings.tasks["load:stop_times"].started <= timings.tasks["load:routes"].started
+    assert timings.wall_seconds < sum(t.seconds for t in timings.tasks.values())
+
+
+def test_failure_stops_dependents():
+    ran = []
+
+    def boom():
+        raise RuntimeError("bad file")
+
+    tasks = [
+        Task("load:routes", boom),
+        Task("rail:routes_rail", lambda: ran.append("rail"), depends_on=["load:routes"]),
+    ]
+    with pytest.raises(RuntimeError, match="bad file"):
+        run_tasks(tasks, max_workers=2)
+    assert ran == []
+
+
+def test_unknown_dependency_rejected():
+    with pytest.raises(ValueError):
+        run_tasks([Task("a", lambda: None, depends_on=["missing"])])
@@ -0,0 +1,215 @@
+from datetime import time
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.gtfs_time import parse_gtfs_time
+from app.journey_planner import (
+    DEFAULT_TRANSFER_SECONDS,
+    UNREACHED,
+    JourneyPlanner,
+    _first_per_key,
+    get_journey_planner,
+)
+from app.query_planner import active_services, departures_between, resolve_station
+from app.service_calendar import get_service_calendar
+from app.timetable import Timetable
+
+STOPS = ["A", "B", "B2", "C", "D"]
+
+
+def make_timetable(trips):
+    """Timetable from {trip_id: [(stop_id, "HH:MM"), ...]}; one route, one service."""
+    trip_ids = sorted(trips)
+    columns = {"trip": [], "stop": [], "stop_sequence": [], "arrival_time": [], "departure_time": []}
+    for code, trip_id in enumerate(trip_ids):
+        for sequence, (stop_id, clock) in enumerate(trips[trip_id]):
+            seconds = parse_gtfs_time(f"{clock}:00")
+            columns["trip"].append(code)
+            columns["stop"].append(STOPS.index(stop_id))
+            columns["stop_sequence"].append(sequence)
+            columns["arrival_time"].append(seconds)
+            columns["departure_time"].append(seconds)
+    return Timetable(
+        stops={"stop_id": np.array(STOPS, dtype=object), "stop_name": np.array(STOPS, dtype=object)},
+        trips={
+            "trip_id": np.array(trip_ids, dtype=object),
+            "trip_headsign": np.array([None] * len(trip_ids), dtype=object),
+            "service_id": np.array(["S"] * len(trip_ids), dtype=object),
+            "route": np.zeros(len(trip_ids), dtype=np.int32),
+            "service": np.zeros(len(trip_ids), dtype=np.int32),
+        },
+        routes={
+            "route_id": np.array(["R"], dtype=object),
+            "route_short_name": np.array(["1"], dtype=object),
+            "agency_name": np.array(["SJ"], dtype=object),
+        },
+        stop_times={name: np.array(values, dtype=np.int32) for name, values in columns.items()},
+    )
+
+
+TRIPS = {
+    "T1": [("A", "08:00"), ("B", "08:30")],
+    # Leaves B two minutes after T1 arrives: too tight for the default change time
+    "T2": [("B", "08:32"), ("C", "09:00")],
+    "T3": [("B", "08:40"), ("C", "09:10")],
+    # Slow direct train
+    "T4": [("A", "07:50"), ("D", "08:20"), ("C", "09:30")],
+}
+
+
+def trips_of(journey):
+    return [leg.trip_id for leg in journey.legs]
+
+
+def test_first_per_key_at_national_scale():
+    # int32 trip codes times a row span past 2**31, as when _board dedups Sweden-sized rows
+    rng = np.random.default_rng(7)
+    keys = rng.integers(40_000, 60_000, 20_000).astype(np.int32)
+    values = rng.permutation(1_400_000)[:20_000]
+    best = {}
+    for i, (key, value) in enumerate(zip(keys.tolist(), values.tolist())):
+        if key not in best or value < values[best[key]]:
+            best[key] = i
+    assert sorted(_first_per_key(keys, values).tolist()) == sorted(best.values())
+    # Ties keep the first
+    assert _first_per_key(np.array([3, 3], dtype=np.int32), np.array([9, 9])).tolist() == [0]
+
+
+def test_changes_respect_the_minimum_transfer_time():
+    planner = JourneyPlanner(make_timetable(TRIPS))
+    journeys = planner.plan(["A"], ["C"], parse_gtfs_time("07:45:00"))
+    # Pareto set: the direct train, then a faster journey with one change
+    assert [trips_of(journey) for journey in journeys] == [["T4"], ["T1", "T3"]]
+    direct, changing = journeys
+    assert direct.transfers == 0 and changing.transfers == 1
+    first, second = changing.legs
+    assert (first.to_stop_id, second.from_stop_id) == ("B", "B")
+    assert second.departure - first.arrival >= DEFAULT_TRANSFER_SECONDS
+    # After the direct train has left only the change remains
+    assert [trips_of(journey) for journey in planner.plan(["A"], ["C"], parse_gtfs_time("07:55:00"))] == [
+        ["T1", "T3"]
+    ]
+    assert planner.plan(["A"], ["C"], parse_gtfs_time("07:45:00"), max_transfers=0) == [journeys[0]]
+
+
+def test_feed_transfers_override_the_default():
+    timetable = make_timetable(TRIPS)
+    timed = JourneyPlanner(timetable, transfers=[("B", "B", 1, None)])
+    assert trips_of(timed.plan(["A"], ["C"], parse_gtfs_time("07:55:00"))[0]) == ["T1", "T2"]
+    forbidden = JourneyPlanner(timetable, transfers=[("B", "B", 3, None)])
+    assert [trips_of(journey) for journey in forbidden.plan(["A"], ["C"], parse_gtfs_time("07:45:00"))] == [["T4"]]
+
+
+def test_changes_between_platforms_of_a_station():
+    trips = {"T1": [("A", "08:00"), ("B", "08:30")], "T2": [("B2", "08:40"), ("C", "09:10")]}
+    timetable = make_timetable(trips)
+    assert JourneyPlanner(timetable).plan(["A"], ["C"], 0) == []
+    planner = JourneyPlanner(timetable, stations={"station-b": ["B", "B2"]})
+    (journey,) = planner.plan(["A"], ["C"], 0)
+    assert [(leg.from_stop_id, leg.to_stop_id) for leg in journey.legs] == [("A", "B"), ("B2", "C")]
+
+
+def test_only_running_trips_are_used():
+    timetable = make_timetable(TRIPS)
+    planner = JourneyPlanner(timetable)
+    running = np.ones(len(timetable.trip_ids), dtype=bool)
+    running[timetable.trip_codes["T3"]] = False
+    assert [trips_of(journey) for journey in planner.plan(["A"], ["C"], 0, running)] == [["T4"]]
+
+
+def test_next_journeys_leave_later_each_time():
+    trips = {
+        **TRIPS,
+        "T5": [("A", "09:00"), ("B", "09:30")],
+        "T6": [("B", "09:40"), ("C", "10:10")],
+    }
+    planner = JourneyPlanner(make_timetable(trips))
+    journeys = planner.next_journeys(["A"], ["C"], parse_gtfs_time("07:55:00"), limit=5)
+    assert [trips_of(journey) for journey in journeys] == [["T1", "T3"], ["T5", "T6"]]
+
+
+def test_reachable_gives_earliest_arrivals_within_the_budget():
+    planner = JourneyPlanner(make_timetable(TRIPS))
+    start = parse_gtfs_time("07:45:00")
+    arrival, changes = planner.reachable(["A"], start, start + 90 * 60)
+    codes = planner.timetable.stop_codes
+    assert arrival[codes["B"]] == parse_gtfs_time("08:30:00") and changes[codes["B"]] == 0
+    assert arrival[codes["D"]] == parse_gtfs_time("08:20:00") and changes[codes["D"]] == 0
+    # The change at B beats the direct train to C
+    assert arrival[codes["C"]] == parse_gtfs_time("09:10:00") and changes[codes["C"]] == 1
+    assert arrival[codes["C"]] == planner.plan(["A"], ["C"], start)[-1].arrival
+    # A shorter budget or no changes leaves C to the slow direct train, or out of reach
+    tight, _ = planner.reachable(["A"], start, parse_gtfs_time("09:00:00"))
+    assert tight[codes["C"]] == UNREACHED and tight[codes["B"]] == parse_gtfs_time("08:30:00")
+    direct, changes = planner.reachable(["A"], start, start + 3 * 3600, max_transfers=0)
+    assert direct[codes["C"]] == parse_gtfs_time("09:30:00") and changes[codes["C"]] == 0
+
+
+def test_feed_journeys_chain_and_are_never_slower_than_direct_trains(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        pairs = session.execute(
+            text(
+                """
+                SELECT o.stop_name AS origin, d.stop_name AS destination
+                FROM stop_times_rail so
+                JOIN stop_times_rail sd ON sd.trip_id = so.trip_id AND sd.stop_sequence > so.stop_sequence
+                JOIN stops_rail o ON o.stop_id = so.stop_id
+                JOIN stops_rail d ON d.stop_id = sd.stop_id
+                WHERE o.stop_name <> d.stop_name
+                GROUP BY 1, 2
+                ORDER BY count(*) DESC, 1, 2
+                LIMIT 5
+                """
+            )
+        ).all()
+        travel_date = get_service_calendar(session).window_start
+        planner = get_journey_planner(session)
+        running = planner.timetable.running_on(travel_date, lambda: active_services(session, travel_date))
+        depart_after = parse_gtfs_time("07:00:00")
+        for pair in pairs:
+            origin = resolve_station(session, pair.origin)
+            destination = resolve_station(session, pair.destination)
+            journeys = planner.plan(origin.stop_ids, destination.stop_ids, depart_after, running)
+            tables = departures_between(session, pair.origin, pair.destination, travel_date, time(7), limit_rows=500)
+            direct = min((parse_gtfs_time(row["arrival"]) for row in tables[0].rows), default=None) if tables else None
+            if direct is not None:
+                assert journeys and journeys[-1].arrival <= direct
+            for journey in journeys:
+                assert journey.legs[0].from_stop_id in origin.stop_ids
+                assert journey.legs[-1].to_stop_id in destination.stop_ids
+                assert journey.departure >= depart_after
+                for leg, following in zip(journey.legs, journey.legs[1:]):
+                    assert leg.departure < leg.arrival <= following.departure
+
+
+def test_plan_journey_tool(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        pair = session.execute(
+            text(
+                """
+                SELECT o.stop_name AS origin, d.stop_name AS destination
+                FROM stop_times_rail so
+                JOIN stop_times_rail sd ON sd.trip_id = so.trip_id AND sd.stop_sequence > so.stop_sequence
+                JOIN stops_rail o ON o.stop_id = so.stop_id
+                JOIN stops_rail d ON d.stop_id = sd.stop_id
+                WHERE o.stop_name <> d.stop_name
+                GROUP BY 1, 2
+                ORDER BY count(*) DESC, 1, 2
+                LIMIT 1
+                """
+            )
+        ).one()
+        travel_date = get_service_calendar(session).window_start.isoformat()
+        context = SimpleNamespace(state={"session": session})
+        result = adk_tools.plan_journey(pair.origin, pair.destination, travel_date, "06:00", tool_context=context)
+        missing = adk_tools.plan_journey("Nowhere at all", pair.destination, tool_context=context)
+    assert 0 < result["count"] <= 3
+    departures = [journey["departure"] for journey in result["journeys"]]
+    assert departures == sorted(departures) and departures[0] >= "06:00:00"
+    assert all(journey["transfers"] == len(journey["legs"]) - 1 for journey in result["journeys"])
+    assert context.state["tool_results"][-1] is result
+    assert missing["journeys"] == [] and "not found" in missing["error"]
@@ -0,0 +1,124 @@
+from datetime import time
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.config import get_settings
+from app.gtfs_time import parse_gtfs_time
+from app.query_planner import _od_summary_sql, active_services, departures_between, od_matrix
+from app.service_calendar import get_service_calendar
+from app.timetable import get_timetable
+
+
+def busiest_stations(session: Session, limit: int = 6):
+    return session.execute(
+        text(
+            """
+            SELECT s.stop_name
+            FROM stop_times_rail st JOIN stops_rail s ON s.stop_id = st.stop_id
+            GROUP BY 1
+            ORDER BY count(*) DESC, 1
+            LIMIT :limit
+            """
+        ),
+        {"limit": limit},
+    ).scalars().all()
+
+
+def test_matrix_matches_across_engines_and_pairwise_queries(synthetic_engine, monkeypatch):
+    with Session(bind=synthetic_engine) as session:
+        names = busiest_stations(session)
+        travel_date = get_service_calendar(session).window_start
+        matrices = {}
+        for engine in ("sql", "memory"):
+            monkeypatch.setattr(get_settings(), "timetable_engine", engine)
+            matrices[engine] = od_matrix(session, names, names, travel_date, time(6), time(12))
+        monkeypatch.setattr(get_settings(), "timetable_engine", "sql")
+        cells = matrices["sql"]["cells"]
+        assert cells and cells == matrices["memory"]["cells"]
+        stations = {station.station_id: station.name for station in matrices["sql"]["origins"]}
+        for cell in cells:
+            assert cell["origin_id"] != cell["destination_id"]
+            assert cell["first_departure"] >= parse_gtfs_time("06:00:00")
+            assert cell["travel_seconds"] > 0 and cell["earliest_arrival"] > cell["first_departure"]
+            tables = departures_between(
+                session, stations[cell["origin_id"]], stations[cell["destination_id"]], travel_date, time(6), 500
+            )
+            rows = [row for row in tables[0].rows if parse_gtfs_time(row["departure"]) <= parse_gtfs_time("12:00:00")]
+            assert len({row["trip_id"] for row in rows}) == cell["trips"]
+            assert min(parse_gtfs_time(row["departure"]) for row in rows) == cell["first_departure"]
+
+
+def test_trip_serving_several_platforms_of_a_station_counts_once(synthetic_engine, monkeypatch):
+    with Session(bind=synthetic_engine) as session:
+        travel_date = get_service_calendar(session).window_start
+        running = set(active_services(session, travel_date))
+        rows = session.execute(
+            text(
+                """
+                SELECT st.trip_id, st.stop_id, st.departure_time, t.service_id
+                FROM stop_times_rail st JOIN trips_rail t ON t.trip_id = st.trip_id
+                ORDER BY st.trip_id, st.stop_sequence
+                """
+            )
+        ).all()
+        calls = {}
+        for trip_id, stop_id, departure, service_id in rows:
+            if service_id in running:
+                calls.setdefault(trip_id, []).append((stop_id, departure))
+        trip_stops = next(stops for stops in calls.values() if len(stops) >= 3)
+        # The trip's first two stops form one origin "station", its last stop the destination
+        origin_station = {trip_stops[0][0]: "X", trip_stops[1][0]: "X"}
+        dest_station = {trip_stops[-1][0]: "Y"}
+        expected = sum(
+            1
+            for stops in calls.values()
+            if any(
+                stop_id in origin_station and departure is not None and any(s in dest_station for s, _ in stops[i + 1:])
+                for i, (stop_id, departure) in enumerate(stops)
+            )
+        )
+
+        sql_rows = _od_summary_sql(session, origin_station, dest_station, travel_date, 0, 2 * 86400)
+        monkeypatch.setattr(get_settings(), "timetable_engine", "memory")
+        timetable = get_timetable(session)
+        memory_rows = timetable.od_summary(
+            origin_station, dest_station, timetable.running_on(travel_date, lambda: running), 0, 2 * 86400
+        )
+    assert [row[:2] for row in sql_rows] == [("X", "Y")]
+    assert sql_rows[0][5] == expected
+    assert memory_rows == sql_rows
+
+
+def test_unknown_names_are_reported(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        names = busiest_stations(session, 2)
+        travel_date = get_service_calendar(session).window_start
+        matrix = od_matrix(session, [*names, "Nowhere at all"], names, travel_date)
+        nothing = od_matrix(session, ["Nowhere at all"], names, travel_date)
+    assert matrix["unresolved"] == ["Nowhere at all"] and len(matrix["origins"]) == 2
+    assert nothing["cells"] == [] and nothing["origins"] == []
+
+
+def test_od_matrix_tool_and_endpoint(synthetic_engine, synthetic_client):
+    with Session(bind=synthetic_engine) as session:
+        names = busiest_stations(session, 4)
+        travel_date = get_service_calendar(session).window_start.isoformat()
+        context = SimpleNamespace(state={"session": session})
+        result = adk_tools.get_od_matrix(names, None, travel_date, "06:00", "12:00", tool_context=context)
+        invalid = adk_tools.get_od_matrix(names, travel_date="tomorrow", tool_context=context)
+    assert result["count"] == len(result["matrix"]) > 0
+    assert all(cell["first_departure"] >= "06:00:00" and cell["trips"] > 0 for cell in result["matrix"])
+    assert {cell["origin"] for cell in result["matrix"]} <= set(names)
+    assert context.state["tool_results"][-1] is result
+    assert "Invalid date" in invalid["error"]
+
+    payload = {"origins": names, "date": travel_date, "after": "06:00", "before": "12:00"}
+    resp = synthetic_client.post("/api/departures/matrix", json=payload)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body["cells"]) == result["count"] and body["unresolved"] == []
+    assert {body["stations"][cell["origin_id"]] for cell in body["cells"]} <= set(names)
+    assert synthetic_client.post("/api/departures/matrix", json={"origins": []}).status_code == 422
@@ -0,0 +1,75 @@
+import csv
+from datetime import date, time
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.gtfs_time import parse_gtfs_time
+from app.query_planner import active_services, departures_between, search_stops
+
+DAY_COLUMNS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def expected_services(feed_dir, day: date) -> set:
+    key = day.strftime("%Y%m%d")
+    with (feed_dir / "calendar.txt").open() as fh:
+        services = {
+            row["service_id"]
+            for row in csv.DictReader(fh)
+            if row["start_date"] <= key <= row["end_date"] and row[DAY_COLUMNS[day.weekday()]] == "1"
+        }
+    with (feed_dir / "calendar_dates.txt").open() as fh:
+        for row in csv.DictReader(fh):
+            if row["date"] == key:
+                (services.add if row["exception_type"] == "1" else services.discard)(row["service_id"])
+    return services
+
+
+def test_active_services_applies_calendar_exceptions(synthetic_engine, synthetic_feed_dir):
+    with (synthetic_feed_dir / "calendar_dates.txt").open() as fh:
+        exception_days = {row["date"] for row in csv.DictReader(fh)}
+    days = [date(2026, 1, 5), date(2026, 6, 20)] + [
+        date(int(d[:4]), int(d[4:6]), int(d[6:])) for d in sorted(exception_days)
+    ]
+    with Session(bind=synthetic_engine) as session:
+        for day in days:
+            assert set(active_services(session, day)) == expected_services(synthetic_feed_dir, day)
+
+
+def test_departures_between_sorted_and_formatted(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        origin, destination = session.execute(
+            text(
+                """
+                SELECT a.stop_name, b.stop_name
+                FROM stop_times_rail sa
+                JOIN stop_times_rail sb ON sa.trip_id = sb.trip_id AND sa.stop_sequence < sb.stop_sequence
+                JOIN stops_rail a ON a.stop_id = sa.stop_id
+                JOIN stops_rail b ON b.stop_id = sb.stop_id
+                ORDER BY sa.trip_id, sa.stop_sequence, sb.stop_sequence
+                LIMIT 1
+                """
+            )
+        ).one()
+        assert search_stops(session, origin)
+        tables = departures_between(session, origin, destination, None, time(0, 0))
+
+    rows = tables[0].rows
+    departures = [parse_gtfs_time(row["departure"]) for row in rows]
+    assert departures == sorted(departures)
+    assert all(parse_gtfs_time(row["arrival"]) > parse_gtfs_time(row["departure"]) for row in rows)
+    assert {row["origin_name"] for row in rows} == {origin}
+
+
+def test_get_route_stops_returns_trip_in_sequence(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        trip_id = session.execute(text("SELECT min(trip_id) FROM trips_rail")).scalar_one()
+        context = SimpleNamespace(state={"session": session})
+        result = adk_tools.get_route_stops(trip_id, tool_context=context)
+
+    sequences = [stop["stop_sequence"] for stop in result["stops"]]
+    assert result["count"] == len(sequences) > 1
+    assert sequences == sorted(sequences)
+    assert context.state["tool_results"] == [result]
@@ -0,0 +1,76 @@
+from datetime import time
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.gtfs_time import parse_gtfs_time
+from app.journey_planner import get_journey_planner
+from app.query_planner import active_services
+from app.reachability import reachable_stations
+from app.service_calendar import get_service_calendar
+from app.stop_index import get_stop_index
+
+
+def _busiest_station(session: Session) -> str:
+    return session.execute(
+        text(
+            """
+            SELECT s.stop_name
+            FROM stop_times_rail st JOIN stops_rail s ON s.stop_id = st.stop_id
+            GROUP BY 1 ORDER BY count(*) DESC, 1 LIMIT 1
+            """
+        )
+    ).scalar_one()
+
+
+def test_reachable_stations_match_planned_journeys(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        origin_name = _busiest_station(session)
+        travel_date = get_service_calendar(session).window_start
+        reachable = reachable_stations(session, origin_name, travel_date, time(6), 24 * 60)
+        shorter = reachable_stations(session, origin_name, travel_date, time(6), 90)
+        planner = get_journey_planner(session)
+        running = planner.timetable.running_on(travel_date, lambda: active_services(session, travel_date))
+        index = get_stop_index(session)
+        start = parse_gtfs_time("06:00:00")
+        for row in reachable["stations"]:
+            journeys = planner.plan(
+                reachable["origin"].stop_ids, index.station(row["station_id"]).stop_ids, start, running
+            )
+            assert journeys and journeys[-1].arrival == row["arrival"]
+            assert row["travel_minutes"] == (row["arrival"] - start) // 60
+        assert reachable_stations(session, "Nowhere at all", travel_date, time(6)) is None
+    assert reachable["stations"]
+    assert reachable["origin"].station_id not in {row["station_id"] for row in reachable["stations"]}
+    arrivals = [row["arrival"] for row in reachable["stations"]]
+    assert arrivals == sorted(arrivals)
+    # A smaller budget only cuts the list
+    assert shorter["stations"] == [row for row in reachable["stations"] if row["arrival"] - start <= 90 * 60]
+
+
+def test_reachable_stations_tool_and_endpoint(synthetic_engine, synthetic_client):
+    with Session(bind=synthetic_engine) as session:
+        origin_name = _busiest_station(session)
+        travel_date = get_service_calendar(session).window_start.isoformat()
+        context = SimpleNamespace(state={"session": session})
+        widest = adk_tools.get_reachable_stations(origin_name, 100_000, travel_date, "06:00", tool_context=context)
+        result = adk_tools.get_reachable_stations(origin_name, 600, travel_date, "06:00", limit=2, tool_context=context)
+        missing = adk_tools.get_reachable_stations("Nowhere at all", tool_context=context)
+        bad_time = adk_tools.get_reachable_stations(origin_name, after_time="seven", tool_context=context)
+    assert result["max_minutes"] == 600 and widest["max_minutes"] == 1440
+    assert result["count"] >= len(result["stations"]) and 0 < len(result["stations"]) <= 2
+    assert all(row["arrival"] >= "06:00:00" for row in result["stations"])
+    assert context.state["tool_results"][-1] is result
+    assert "not found" in missing["error"] and "Invalid time" in bad_time["error"]
+
+    params = {"station": origin_name, "date": travel_date, "after": "06:00", "within": 600}
+    resp = synthetic_client.get("/api/stations/reachable", params=params)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["origin"] == result["origin"] and len(body["stations"]) == result["count"]
+    assert body["stations"][:2] == result["stations"]
+    unknown = {**params, "station": "Nowhere at all"}
+    assert synthetic_client.get("/api/stations/reachable", params=unknown).status_code == 404
+    assert synthetic_client.get("/api/stations/reachable", params={**params, "within": 0}).status_code == 422
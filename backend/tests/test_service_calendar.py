@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import query_planner
+from app.service_calendar import expand_calendar, get_service_calendar
+
+WEEKDAYS = {"monday": 1, "tuesday": 1, "wednesday": 1, "thursday": 1, "friday": 1, "saturday": 0, "sunday": 0}
+
+
+def test_expand_calendar_applies_weekdays_and_exceptions():
+    calendar = expand_calendar(
+        [{"service_id": "S1", **WEEKDAYS, "start_date": date(2026, 10, 19), "end_date": date(2026, 11, 1)}],
+        [
+            {"service_id": "S1", "date": date(2026, 10, 21), "exception_type": 2},
+            {"service_id": "S2", "date": date(2026, 10, 24), "exception_type": 1},
+        ],
+    )
+
+    assert calendar.window_start == date(2026, 10, 19)
+    assert calendar.window_end == date(2026, 11, 1)
+    assert calendar.active_on(date(2026, 10, 20)) == ("S1",)
+    assert calendar.active_on(date(2026, 10, 21)) == ()
+    assert calendar.active_on(date(2026, 10, 24)) == ("S2",)
+    assert calendar.active_on(date(2027, 1, 1)) == ()
+    assert calendar.runs_on("S1", date(2026, 10, 26))
+    assert not calendar.runs_on("S1", date(2026, 10, 25))
+    assert calendar.dates("S1", start=date(2026, 10, 26)) == [date(2026, 10, 26) + timedelta(days=i) for i in range(5)]
+
+
+def test_service_calendar_matches_sql_fallback(synthetic_engine, monkeypatch):
+    with Session(bind=synthetic_engine) as session:
+        calendar = get_service_calendar(session)
+        rail_services = set(session.execute(text("SELECT service_id FROM trips_rail")).scalars())
+        days = [calendar.window_start + timedelta(days=i) for i in range(0, calendar.window_days, 3)]
+        from_bitmaps = {day: set(query_planner.active_services(session, day)) for day in days}
+
+        monkeypatch.setattr(query_planner, "get_service_calendar", lambda session: None)
+        for day in days:
+            assert from_bitmaps[day] == set(query_planner.active_services(session, day)) & rail_services
+
+
+def test_service_dates_rows_match_bitmaps(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        calendar = get_service_calendar(session)
+        rows = session.execute(text("SELECT service_date, service_id FROM service_dates")).all()
+
+    expected = {(day, service_id) for service_id in calendar.bitmaps for day in calendar.dates(service_id)}
+    assert {(row.service_date, row.service_id) for row in rows} == expected
+
+
+def test_join_and_in_list_filters_return_same_departures(synthetic_engine, monkeypatch):
+    with Session(bind=synthetic_engine) as session:
+        origin, destination, service_id = session.execute(
+            text(
+                """
+                SELECT a.stop_name, b.stop_name, t.service_id
+                FROM stop_times_rail sa
+                JOIN stop_times_rail sb ON sa.trip_id = sb.trip_id AND sa.stop_sequence < sb.stop_sequence
+                JOIN trips_rail t ON t.trip_id = sa.trip_id
+                JOIN stops_rail a ON a.stop_id = sa.stop_id
+                JOIN stops_rail b ON b.stop_id = sb.stop_id
+                ORDER BY sa.trip_id, sa.stop_sequence, sb.stop_sequence
+                LIMIT 1
+                """
+            )
+        ).one()
+        calendar = get_service_calendar(session)
+        running, idle = calendar.dates(service_id)[0], calendar.window_end + timedelta(days=1)
+
+        def departures(day):
+            tables = query_planner.departures_between(session, origin, destination, day, None)
+            return tables[0].rows if tables else []
+
+        joined = {day: departures(day) for day in (running, idle)}
+        monkeypatch.setattr(query_planner, "has_service_dates", lambda session: False)
+        assert joined == {day: departures(day) for day in (running, idle)}
+    assert joined[running] and not joined[idle]
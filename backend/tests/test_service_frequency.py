@@ -0,0 +1,77 @@
+from datetime import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.gtfs_time import parse_gtfs_time
+from app.query_planner import departures_between
+from app.service_frequency import frequency_days, od_frequency, resolve_day_type, station_frequency
+
+
+def busiest_pair(session: Session):
+    return session.execute(
+        text(
+            """
+            SELECT o.station_name AS origin, d.station_name AS destination, f.day_type
+            FROM od_frequency_rail f
+            JOIN station_stops_rail o ON o.station_id = f.origin_station_id
+            JOIN station_stops_rail d ON d.station_id = f.dest_station_id
+            ORDER BY f.trips DESC, 1, 2
+            LIMIT 1
+            """
+        )
+    ).one()
+
+
+def test_resolve_day_type():
+    assert resolve_day_type("Weekdays") == resolve_day_type("tuesday") == "weekday"
+    assert resolve_day_type("saturdays") == resolve_day_type("2026-10-17") == "saturday"
+    assert resolve_day_type(" Sunday ") == "sunday"
+    with pytest.raises(ValueError):
+        resolve_day_type("someday")
+
+
+def test_pair_frequency_counts_the_representative_day(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        pair = busiest_pair(session)
+        day = frequency_days(session)[pair.day_type]
+        found = od_frequency(session, pair.origin, pair.destination, pair.day_type)
+        tables = departures_between(session, pair.origin, pair.destination, day.service_date, time(0), 1000)
+        # The whole day as an explicit window recomputes the stored figures
+        windowed = od_frequency(session, pair.origin, pair.destination, pair.day_type, 0, 48 * 3600)
+        morning = od_frequency(session, pair.origin, pair.destination, pair.day_type, 6 * 3600, 10 * 3600)
+    departures = sorted({(row["trip_id"], parse_gtfs_time(row["departure"])) for row in tables[0].rows})
+    assert found["trips"] == len(departures) > 0
+    assert found["first_departure"] == min(departure for _, departure in departures)
+    assert sum(found["hourly"].values()) == found["trips"]
+    assert {key: windowed[key] for key in found} == found
+    assert morning["trips"] == sum(count for hour, count in found["hourly"].items() if 6 <= hour < 10)
+    assert found["headway_min"] <= found["headway_median"] <= found["headway_max"]
+
+
+def test_station_frequency_breaks_down_by_route_and_hour(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        pair = busiest_pair(session)
+        found = station_frequency(session, pair.origin, pair.day_type)
+        evening = station_frequency(session, pair.origin, pair.day_type, 17 * 3600, 20 * 3600)
+    assert found["departures"] == sum(found["hourly"].values()) == sum(r["departures"] for r in found["routes"]) > 0
+    assert all(route["busiest_hour_departures"] <= route["departures"] for route in found["routes"])
+    assert evening["hourly"] == {hour: count for hour, count in found["hourly"].items() if 17 <= hour <= 20}
+
+
+def test_service_frequency_tool(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        pair = busiest_pair(session)
+        context = SimpleNamespace(state={"session": session})
+        result = adk_tools.get_service_frequency(pair.origin, pair.destination, pair.day_type, tool_context=context)
+        station = adk_tools.get_service_frequency(pair.origin, day=pair.day_type, tool_context=context)
+        missing = adk_tools.get_service_frequency("Nowhere at all", pair.destination, tool_context=context)
+        bad_day = adk_tools.get_service_frequency(pair.origin, day="someday", tool_context=context)
+    assert result["trips"] > 0 and result["first_departure"] <= result["last_departure"]
+    assert sum(result["hourly"].values()) == result["trips"]
+    assert station["departures"] >= result["trips"] and station["routes"]
+    assert context.state["tool_results"][-1] is station
+    assert "not found" in missing["error"] and "Unknown day" in bad_day["error"]
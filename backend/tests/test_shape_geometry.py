@@ -0,0 +1,78 @@
+import math
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.shape_geometry import (
+    EARTH_RADIUS_M,
+    TOLERANCES_M,
+    decode_polyline,
+    encode_polyline,
+    split_distances,
+    trip_geometry,
+)
+
+
+def test_polyline_matches_the_reference_encoding():
+    # Example from Google's encoded polyline documentation
+    lats, lons = [38.5, 40.7, 43.252], [-120.2, -120.95, -126.453]
+    assert encode_polyline(lats, lons) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == list(zip(lats, lons))
+
+
+def test_every_point_stays_within_the_tolerance():
+    rng = np.random.default_rng(7)
+    n = 3000
+    lats = 59 + np.linspace(0, 0.5, n) + np.sin(np.linspace(0, 30, n)) * 0.01 + rng.normal(0, 1e-5, n)
+    lons = 18 + np.cos(np.linspace(0, 20, n)) * 0.02
+    significance = split_distances(lats, lons)
+    scale = EARTH_RADIUS_M * math.pi / 180
+    x, y = lons * scale * math.cos(math.radians(lats.mean())), lats * scale
+    previous = None
+    for tolerance in TOLERANCES_M:
+        kept = np.flatnonzero(significance > tolerance)
+        assert kept[0] == 0 and kept[-1] == n - 1
+        if previous is not None:
+            assert set(kept) <= set(previous)
+        previous = kept
+        for start, end in zip(kept, kept[1:]):
+            px, py = x[start:end], y[start:end]
+            dx, dy = x[end] - x[start], y[end] - y[start]
+            along = np.clip(((px - x[start]) * dx + (py - y[start]) * dy) / (dx * dx + dy * dy), 0, 1)
+            assert np.hypot(px - x[start] - along * dx, py - y[start] - along * dy).max() <= tolerance + 1e-6
+
+
+def test_trip_geometry_tool_and_endpoint(synthetic_engine, synthetic_client):
+    with Session(bind=synthetic_engine) as session:
+        trip_id = session.execute(
+            text(
+                """
+                SELECT t.trip_id
+                FROM trips_rail t JOIN shapes_rail s ON s.shape_id = t.shape_id
+                GROUP BY 1 ORDER BY count(*) DESC, 1 LIMIT 1
+                """
+            )
+        ).scalar_one()
+        levels = [trip_geometry(session, trip_id, zoom) for zoom in (4, 8, 12, 16)]
+        fitted = trip_geometry(session, trip_id)
+        context = SimpleNamespace(state={"session": session})
+        result = adk_tools.get_trip_geometry(trip_id, 16, tool_context=context)
+        missing = adk_tools.get_trip_geometry("no-such-trip", tool_context=context)
+    # Closer zooms get finer (never coarser) geometry
+    assert [level["tolerance_m"] for level in levels] == sorted((level["tolerance_m"] for level in levels), reverse=True)
+    assert [level["points"] for level in levels] == sorted(level["points"] for level in levels)
+    west, south, east, north = fitted["bbox"]
+    for geometry in levels + [fitted]:
+        points = decode_polyline(geometry["polyline"])
+        assert len(points) == geometry["points"] >= 2
+        assert all(south - 1e-5 <= lat <= north + 1e-5 and west - 1e-5 <= lon <= east + 1e-5 for lat, lon in points)
+    assert result == levels[-1] and context.state["tool_results"][-1] is result
+    assert "No geometry" in missing["error"]
+
+    resp = synthetic_client.get(f"/api/trips/{trip_id}/geometry", params={"zoom": 16})
+    assert resp.status_code == 200 and resp.json() == result
+    assert synthetic_client.get("/api/trips/no-such-trip/geometry").status_code == 404
+    assert synthetic_client.get(f"/api/trips/{trip_id}/geometry", params={"zoom": 40}).status_code == 422
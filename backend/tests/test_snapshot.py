@@ -0,0 +1,74 @@
+import json
+
+from sqlalchemy import create_engine, text
+
+from app.feed_versions import FeedStore
+from app.ingestion import snapshot
+from app.ingestion.gtfs_loader import load_csv_to_table, rail_tasks
+from app.ingestion.scheduler import Task, run_tasks
+
+FEED = {
+    "agency": "agency_id,agency_name,agency_url,agency_timezone\nA1,SJ,https://sj.se,Europe/Stockholm\n",
+    "routes": "route_id,agency_id,route_short_name,route_type\nR1,A1,10,102\nR2,A1,B,700\n",
+    "trips": "route_id,service_id,trip_id,shape_id\nR1,S1,T1,SH1\nR2,S1,T2,SH2\n",
+    "stop_times": (
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        "T1,08:00:00,08:00:00,P1,1\nT1,10:00:00,10:00:00,P2,2\nT2,08:00:00,08:00:00,P1,1\n"
+    ),
+    "stops": (
+        "stop_id,stop_name,stop_lat,stop_lon,location_type,parent_station\n"
+        "740000001,Stockholm Central,59.33,18.05,1,\nP1,Stockholm C,59.33,18.05,0,740000001\n"
+        "P2,Göteborg C,57.7,11.97,0,\n"
+    ),
+    "stop_areas": "area_id,stop_id\nA2,P2\n",
+    "areas": "area_id,area_name,area_type\nA2,Göteborg Centralstation,stop_area\n",
+    "calendar": (
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+        "S1,1,1,1,1,1,0,0,20260101,20261231\n"
+    ),
+    "calendar_dates": "service_id,date,exception_type\nS1,20261019,2\n",
+    "shapes": "shape_id,shape_pt_lat,shape_pt_lon,shape_pt_sequence\nSH1,59.33,18.05,1\nSH1,57.7,11.97,2\n",
+    "transfers": "from_stop_id,to_stop_id,transfer_type,min_transfer_time\nP1,P1,2,300\n",
+}
+
+
+def build_feed_db(tmp_path):
+    for table, content in FEED.items():
+        (tmp_path / f"{table}.txt").write_text(content)
+    eng = create_engine(f"duckdb:///{tmp_path / 'build.duckdb'}")
+    tasks = [
+        Task(f"load:{table}", lambda table=table: load_csv_to_table(tmp_path / f"{table}.txt", table, bind=eng))
+        for table in FEED
+    ]
+    run_tasks(tasks + rail_tasks(bind=eng, source_prefix="load:"), max_workers=2)
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE feed_version AS SELECT 'v1' AS version"))
+    return eng
+
+
+def test_export_then_import_round_trip(tmp_path, monkeypatch):
+    build_engine = build_feed_db(tmp_path)
+    snapshot_dir = snapshot.export_snapshot(tmp_path / "snapshots", bind=build_engine)
+    build_engine.dispose()
+
+    manifest = json.loads((snapshot_dir / "manifest.json").read_text())
+    assert snapshot_dir.name == "v1"
+    assert manifest["tables"]["stop_times_rail"]["rows"] == 2
+    assert "stops" not in manifest["tables"]
+    assert manifest["tables"]["station_stops_rail"]["rows"] == 2
+    assert any("idx_stop_times_rail_departure" in idx for idx in manifest["indexes"])
+
+    store = FeedStore(tmp_path / "replica")
+    monkeypatch.setattr(snapshot, "feed_store", lambda: store)
+    assert snapshot.import_snapshot(snapshot_dir) == "v1"
+    assert store.active_version() == "v1"
+
+    replica = create_engine(store.version_url("v1"), connect_args={"read_only": True})
+    with replica.connect() as conn:
+        assert conn.execute(text("SELECT agency_name FROM routes_rail_with_agency")).scalar_one() == "SJ"
+        assert conn.execute(text("SELECT max(departure_time) FROM stop_times_rail")).scalar_one() == 36000
+        stations = conn.execute(text("SELECT stop_id, station_id, station_name FROM station_stops_rail ORDER BY 1"))
+        assert stations.all() == [("P1", "740000001", "Stockholm Central"), ("P2", "A2", "Göteborg Centralstation")]
+        indexes = {row[0] for row in conn.execute(text("SELECT index_name FROM duckdb_indexes()"))}
+    replica.dispose()
+    assert "idx_stop_times_rail_trip" in indexes
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.spatial_index import SCAN_ALL_BELOW, SpatialIndex, get_spatial_index, haversine_km
+from app.stop_index import Station
+
+
+def _random_index(n: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    # Roughly Sweden, with a dense cluster like a city
+    lats = np.r_[rng.uniform(55.3, 68.5, n - 200), rng.normal(59.33, 0.05, 200)]
+    lons = np.r_[rng.uniform(11.0, 24.0, n - 200), rng.normal(18.06, 0.08, 200)]
+    stations = [
+        Station(f"s{i}", f"Station {i}", (f"p{i}",), int(rng.integers(0, 300)), (), frozenset(), f"station {i}")
+        for i in range(n)
+    ]
+    return SpatialIndex(stations, lats, lons), lats, lons, stations
+
+
+@pytest.mark.parametrize("n", [500, SCAN_ALL_BELOW])
+def test_nearest_matches_brute_force(n):
+    # Small indexes scan every station, larger ones walk the grid
+    index, lats, lons, stations = _random_index(n)
+    rng = np.random.default_rng(11)
+    # Includes queries well outside the grid
+    queries = np.c_[rng.uniform(50, 72, 300), rng.uniform(5, 30, 300)]
+    for lat, lon in queries.tolist():
+        distances = haversine_km(lat, lon, lats, lons)
+        expected = np.lexsort((np.arange(len(lats)), distances))
+        got = index.nearest(lat, lon, k=5)
+        assert [placed.station.station_id for placed in got] == [stations[i].station_id for i in expected[:5]]
+        assert np.allclose([placed.distance_km for placed in got], distances[expected[:5]])
+
+        within_50 = [stations[i].station_id for i in expected if distances[i] <= 50][:8]
+        assert [placed.station.station_id for placed in index.nearest(lat, lon, k=8, max_km=50)] == within_50
+
+
+def test_bounding_box_matches_brute_force():
+    index, lats, lons, stations = _random_index(2000)
+    south, west, north, east = 59.0, 17.5, 59.6, 18.4
+    inside = (lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)
+    expected = sorted(
+        (stations[i] for i in np.flatnonzero(inside)), key=lambda station: (-station.departures, station.station_id)
+    )
+    got = index.within(south, west, north, east)
+    assert [placed.station for placed in got] == expected
+    assert [placed.station for placed in index.within(south, west, north, east, limit=10)] == expected[:10]
+    assert index.within(10, 10, 11, 11) == []
+    assert SpatialIndex([], [], []).nearest(59, 18) == []
+
+
+def test_nearest_stations_tool_and_endpoints(synthetic_engine, synthetic_client):
+    with Session(bind=synthetic_engine) as session:
+        lat, lon = session.execute(
+            text("SELECT stop_lat, stop_lon FROM stops_rail WHERE stop_lat IS NOT NULL ORDER BY stop_id LIMIT 1")
+        ).one()
+        index = get_spatial_index(session)
+        context = SimpleNamespace(state={"session": session})
+        result = adk_tools.find_nearest_stations(lat + 0.001, lon, limit=3, tool_context=context)
+        invalid = adk_tools.find_nearest_stations(123.0, lon, tool_context=context)
+    assert len(index) > 0
+    assert 1 <= len(result["stations"]) <= 3 and result["stations"][0]["distance_km"] < 5
+    distances = [station["distance_km"] for station in result["stations"]]
+    assert distances == sorted(distances)
+    assert context.state["tool_results"][-1] is result
+    assert "Invalid coordinate" in invalid["error"]
+
+    resp = synthetic_client.get("/api/stations/nearest", params={"lat": lat + 0.001, "lon": lon, "limit": 3})
+    assert resp.status_code == 200
+    assert [s["station_id"] for s in resp.json()["stations"]] == [s["station_id"] for s in result["stations"]]
+
+    bbox = f"{lon - 0.01},{lat - 0.01},{lon + 0.01},{lat + 0.01}"
+    within = synthetic_client.get("/api/stations/within", params={"bbox": bbox}).json()["stations"]
+    assert result["stations"][0]["station_id"] in [s["station_id"] for s in within]
+    assert all(s["distance_km"] is None for s in within)
+    assert synthetic_client.get("/api/stations/within", params={"bbox": "1,2,3"}).status_code == 400
+    assert synthetic_client.get("/api/stations/within", params={"bbox": "18,60,17,59"}).status_code == 400
+    assert synthetic_client.get("/api/stations/nearest", params={"lat": 95, "lon": 18}).status_code == 422
@@ -0,0 +1,140 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.query_planner import departures_between, resolve_station, search_stops
+from app.stop_index import StopIndex, normalize_tokens, query_terms
+
+# (station_id, station_name, stop_id, stop_name, departures)
+STOPS = [
+    ("S1", "Göteborg Centralstation", "P1", "Göteborg Centralstation", 900),
+    ("S1", "Göteborg Centralstation", "P2", "Göteborg C spår 2", 700),
+    ("S2", "Göteborg Gamlestads torg", "P3", "Göteborg Gamlestads torg", 50),
+    ("S3", "Stockholm Centralstation", "P4", "Stockholm Centralstation", 1200),
+    ("S4", "Stockholm Södra station", "P5", "Stockholm Södra station", 300),
+    ("S5", "Stockholms Östra station", "P6", "Stockholms Östra station", 80),
+    ("S6", "Älvängen station", "P7", "Älvängen station", 40),
+    ("S7", "Helsingborg C", "P8", "Helsingborg C", 400),
+]
+
+
+def test_normalize_folds_diacritics_and_abbreviations():
+    assert normalize_tokens("Göteborg C") == ("goteborg", "central")
+    assert normalize_tokens("GÖTEBORG Centralstation") == ("goteborg", "central")
+    assert normalize_tokens("Älvängen station") == ("alvangen",)
+    assert normalize_tokens("St Eriksplan") == normalize_tokens("Sankt Eriksplan") == ("sankt", "eriksplan")
+
+
+def test_search_is_accent_and_abbreviation_insensitive():
+    index = StopIndex(STOPS)
+    assert index.search("Goteborg C", limit=3) == [{"stop_id": "S1", "stop_name": "Göteborg Centralstation"}]
+    assert index.search("alvangen")[0]["stop_name"] == "Älvängen station"
+    assert index.search("Helsingborg Central")[0]["stop_id"] == "S7"
+    # Platform names find their station too
+    assert index.search("spår")[0]["stop_id"] == "S1"
+
+
+def test_search_ranks_whole_words_and_busy_stations_first():
+    index = StopIndex(STOPS)
+    assert [station.name for station in index.search_stations("stockholm")] == [
+        "Stockholm Centralstation",
+        "Stockholm Södra station",
+        "Stockholms Östra station",
+    ]
+    assert index.search_stations("gamle")[0].name == "Göteborg Gamlestads torg"
+    # No token prefix matches: fall back to substring, like the old ILIKE
+    assert [station.name for station in index.search_stations("borg c")] == [
+        "Göteborg Centralstation",
+        "Helsingborg C",
+    ]
+    assert index.search("nowhere") == []
+
+
+def test_trailing_token_matches_as_typed_and_expanded():
+    assert query_terms("Göteborg St") == (("goteborg",), ("sankt", "st"))
+    assert query_terms("St Eriksplan") == (("sankt",), ("eriksplan",))
+    index = StopIndex(
+        STOPS
+        + [
+            ("S8", "St Eriksplan", "P9", "St Eriksplan", 20),
+            ("S9", "Charlottenberg station", "P10", "Charlottenberg station", 30),
+        ]
+    )
+    # "St" may be the start of "Stockholm": the whole-word Sankt match ranks first, then the prefix matches
+    names = [station.name for station in index.search_stations("St")]
+    assert names[:3] == ["St Eriksplan", "Stockholm Centralstation", "Stockholm Södra station"]
+    assert index.search_stations("St Eriksplan")[0].name == "St Eriksplan"
+    assert index.search_stations("Sankt")[0].name == "St Eriksplan"
+    # "C" may be the start of "Charlottenberg" as well as Central
+    names = [station.name for station in index.search_stations("C")]
+    assert "Charlottenberg station" in names and "Stockholm Centralstation" in names
+    assert index.search_stations("Göteborg C", limit=1)[0].name == "Göteborg Centralstation"
+
+
+def test_resolve_expands_station_to_its_platforms():
+    station = StopIndex(STOPS).resolve("Göteborg C")
+    assert station.station_id == "S1"
+    assert station.stop_ids == ("P1", "P2")
+    assert station.departures == 1600
+
+
+def test_feed_stations_group_platforms(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        rows = search_stops(session, "goteborg", limit=3)
+        station = resolve_station(session, "Göteborg C")
+        platforms = session.execute(
+            text(
+                """
+                SELECT s.stop_id FROM stops_rail s
+                JOIN stops p ON p.stop_id = s.parent_station
+                WHERE p.stop_name = 'Göteborg Centralstation'
+                """
+            )
+        ).scalars().all()
+    assert [row["stop_name"] for row in rows] == ["Göteborg Centralstation"]
+    assert rows[0]["stop_id"] == station.station_id
+    assert len(platforms) > 1 and set(station.stop_ids) == set(platforms)
+
+
+def test_departures_match_every_platform_of_the_station(synthetic_engine):
+    with Session(bind=synthetic_engine) as session:
+        origin = session.execute(
+            text(
+                """
+                SELECT p.stop_name FROM stop_times_rail st
+                JOIN stops_rail s ON s.stop_id = st.stop_id
+                JOIN stops p ON p.stop_id = s.parent_station
+                GROUP BY p.stop_name
+                HAVING count(DISTINCT st.stop_id) > 1
+                ORDER BY count(*) DESC, p.stop_name
+                LIMIT 1
+                """
+            )
+        ).scalar_one()
+        station = resolve_station(session, origin)
+        destinations = session.execute(
+            text(
+                """
+                SELECT p.stop_name, count(DISTINCT o.stop_id) AS platforms
+                FROM stop_times_rail o
+                JOIN stop_times_rail d ON d.trip_id = o.trip_id AND d.stop_sequence > o.stop_sequence
+                JOIN stops_rail s ON s.stop_id = d.stop_id
+                JOIN stops p ON p.stop_id = s.parent_station
+                WHERE o.stop_id IN :origin_ids
+                GROUP BY p.stop_name
+                ORDER BY platforms DESC, p.stop_name
+                LIMIT 1
+                """
+            ),
+            {"origin_ids": station.stop_ids},
+        ).first()
+        tables = departures_between(session, origin, destinations.stop_name, None, None, limit_rows=1000)
+    assert destinations.platforms > 1
+    # One station name covers trains leaving from any of its platforms
+    trips = {row["trip_id"] for row in tables[0].rows}
+    assert trips
+    with Session(bind=synthetic_engine) as session:
+        used = session.execute(
+            text("SELECT count(DISTINCT stop_id) FROM stop_times_rail WHERE trip_id IN :trips AND stop_id IN :ids"),
+            {"trips": tuple(trips), "ids": station.stop_ids},
+        ).scalar_one()
+    assert used > 1
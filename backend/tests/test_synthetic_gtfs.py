@@ -0,0 +1,16 @@
+from benchmarks.synthetic_gtfs import PRESETS, generate_feed
+
+
+def test_same_seed_gives_identical_feed(tmp_path):
+    first = generate_feed(PRESETS["toy"], tmp_path / "a")
+    second = generate_feed(PRESETS["toy"], tmp_path / "b")
+
+    assert first == second
+    for path in (tmp_path / "a").iterdir():
+        assert path.read_bytes() == (tmp_path / "b" / path.name).read_bytes()
+
+
+def test_feed_has_rail_trips_past_midnight(tmp_path):
+    generate_feed(PRESETS["small"], tmp_path)
+    lines = (tmp_path / "stop_times.txt").read_text().splitlines()[1:]
+    assert any(int(line.split(",")[1][:2]) >= 24 for line in lines)
@@ -0,0 +1,131 @@
+import csv
+from datetime import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import adk_tools
+from app.config import get_settings
+from app.ingestion.gtfs_loader import load_feed
+from app.query_planner import departures_between, next_departures
+from app.service_calendar import get_service_calendar
+from app.timetable import get_timetable
+
+
+@pytest.fixture
+def engine_setting(monkeypatch):
+    def use(name: str) -> None:
+        monkeypatch.setattr(get_settings(), "timetable_engine", name)
+
+    return use
+
+
+def test_timetable_is_only_loaded_for_the_memory_engine(synthetic_engine, engine_setting):
+    with Session(bind=synthetic_engine) as session:
+        engine_setting("sql")
+        assert get_timetable(session) is None
+        engine_setting("memory")
+        timetable = get_timetable(session)
+        rows = session.execute(text("SELECT count(*) FROM stop_times_rail")).scalar_one()
+    assert len(timetable) == rows
+    assert timetable.trip_ptr[-1] == timetable.stop_ptr[-1] == rows
+
+
+def test_memory_engine_matches_sql(synthetic_engine, engine_setting):
+    with Session(bind=synthetic_engine) as session:
+        pairs = session.execute(
+            text(
+                """
+                SELECT o.stop_name AS origin, d.stop_name AS destination, min(so.trip_id) AS trip_id
+                FROM stop_times_rail so
+                JOIN stop_times_rail sd ON sd.trip_id = so.trip_id AND sd.stop_sequence > so.stop_sequence
+                JOIN stops_rail o ON o.stop_id = so.stop_id
+                JOIN stops_rail d ON d.stop_id = sd.stop_id
+                WHERE o.stop_name <> d.stop_name
+                GROUP BY 1, 2
+                ORDER BY count(*) DESC, 1, 2
+                LIMIT 5
+                """
+            )
+        ).all()
+        travel_date = get_service_calendar(session).window_start
+        context = SimpleNamespace(state={"session": session})
+
+        def answers(engine: str, pair) -> list:
+            engine_setting(engine)
+            return [
+                departures_between(session, pair.origin, pair.destination, None, None, limit_rows=200),
+                departures_between(session, pair.origin, pair.destination, travel_date, time(7, 30)),
+                adk_tools.get_next_departures(pair.origin, tool_context=context),
+                adk_tools.get_next_departures(pair.origin, travel_date.isoformat(), "16:45", tool_context=context),
+                adk_tools.get_route_stops(pair.trip_id, tool_context=context),
+            ]
+
+        for pair in pairs:
+            memory = answers("memory", pair)
+            assert memory[0] and memory[2]["departures"] and memory[4]["stops"]
+            assert memory == answers("sql", pair)
+        assert adk_tools.get_route_stops("no-such-trip", tool_context=context)["stops"] == []
+
+
+@pytest.fixture
+def untimed_engine(synthetic_feed_dir, tmp_path):
+    """The toy feed with the second stop of every trip left without times (a non-timepoint)."""
+    feed_dir = tmp_path / "feed"
+    feed_dir.mkdir()
+    for path in synthetic_feed_dir.glob("*.txt"):
+        (feed_dir / path.name).write_text(path.read_text())
+    with (synthetic_feed_dir / "stop_times.txt").open(newline="") as source:
+        rows = list(csv.DictReader(source))
+    for row in rows:
+        if row["stop_sequence"] == "2":
+            row["arrival_time"] = row["departure_time"] = ""
+    with (feed_dir / "stop_times.txt").open("w", newline="") as target:
+        writer = csv.DictWriter(target, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    eng = create_engine(f"duckdb:///{tmp_path / 'gtfs.duckdb'}")
+    load_feed({path.stem: path for path in feed_dir.glob("*.txt")}, bind=eng, max_workers=2)
+    yield eng
+    eng.dispose()
+
+
+def test_memory_engine_matches_sql_on_missing_times(untimed_engine, engine_setting):
+    with Session(bind=untimed_engine) as session:
+        untimed = session.execute(
+            text(
+                """
+                SELECT s.stop_id, s.stop_name, d.stop_name AS destination
+                FROM stop_times_rail st
+                JOIN stops_rail s ON s.stop_id = st.stop_id
+                JOIN stop_times_rail later ON later.trip_id = st.trip_id AND later.stop_sequence > st.stop_sequence
+                JOIN stops_rail d ON d.stop_id = later.stop_id
+                WHERE st.departure_time IS NULL AND d.stop_name <> s.stop_name
+                ORDER BY s.stop_id, d.stop_name
+                LIMIT 1
+                """
+            )
+        ).one()
+
+        def answers(engine: str) -> list:
+            engine_setting(engine)
+            return [
+                next_departures(session, [untimed.stop_id], None, None, 200),
+                departures_between(session, untimed.stop_name, untimed.destination, None, None, limit_rows=200),
+            ]
+
+        memory = answers("memory")
+        # Rows without a departure time are kept and listed last, as SQL lists NULLs
+        assert memory[0][-1]["departure"] is None
+        assert memory == answers("sql")
+
+        for engine in ("memory", "sql"):
+            engine_setting(engine)
+            with pytest.raises(ValueError):
+                next_departures(session, [untimed.stop_id], None, None, 0)
+            with pytest.raises(ValueError):
+                departures_between(session, untimed.stop_name, untimed.destination, None, None, limit_rows=-1)
+        context = SimpleNamespace(state={"session": session})
+        assert adk_tools.get_next_departures(untimed.stop_name, limit_rows=-1, tool_context=context)["count"] == 1
@@ -0,0 +1,108 @@
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from google.adk.tools.function_tool import FunctionTool
+from sqlalchemy.orm import Session
+
+from app import adk_tools, tool_executor
+from app.service_calendar import get_service_calendar
+from app.tool_executor import offloaded
+
+
+class FakeSession:
+    pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(tool_executor, "_executor", executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_offloaded_tools_keep_their_adk_declaration():
+    for tool in (adk_tools.get_departures, adk_tools.plan_journey, adk_tools.get_reachable_stations):
+        wrapped = offloaded(tool)
+        assert inspect.iscoroutinefunction(wrapped) and wrapped.__name__ == tool.__name__
+        assert FunctionTool(wrapped)._get_declaration() == FunctionTool(tool)._get_declaration()
+
+
+def test_tools_run_off_the_event_loop_within_the_pool_bound(pool):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow(value, tool_context=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+        return value
+
+    async def scenario():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        results = await asyncio.gather(*(offloaded(slow)(i) for i in range(8)))
+        elapsed = time.perf_counter() - started
+        beat.cancel()
+        return results, elapsed, ticks
+
+    results, elapsed, ticks = asyncio.run(scenario())
+    assert results == list(range(8))
+    # Two waves of four threads, with the loop free meanwhile
+    assert peak[0] == 4 and 0.2 <= elapsed < 0.4
+    assert ticks >= 10
+
+
+def test_calls_sharing_a_session_run_one_at_a_time(pool):
+    shared, other = FakeSession(), FakeSession()
+    active = {}
+    overlaps = []
+
+    def uses_session(tool_context=None):
+        session = tool_context.state["session"]
+        active[session] = active.get(session, 0) + 1
+        overlaps.append(active[session])
+        time.sleep(0.05)
+        active[session] -= 1
+
+    async def scenario():
+        shared_context = SimpleNamespace(state={"session": shared})
+        other_context = SimpleNamespace(state={"session": other})
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(offloaded(uses_session)(tool_context=shared_context) for _ in range(3)),
+            offloaded(uses_session)(tool_context=other_context),
+        )
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(scenario())
+    assert max(overlaps) == 1
+    assert elapsed < 0.2
+
+
+def test_offloaded_tool_answers_like_the_plain_one(synthetic_engine, pool):
+    with Session(bind=synthetic_engine) as session:
+        travel_date = get_service_calendar(session).window_start.isoformat()
+        context = SimpleNamespace(state={"session": session})
+        direct = adk_tools.search_rail_stops("Stockholm", tool_context=context)
+        threaded = asyncio.run(offloaded(adk_tools.search_rail_stops)("Stockholm", tool_context=context))
+        board = asyncio.run(
+            offloaded(adk_tools.get_departure_board)("Stockholm C", travel_date, "07:00", tool_context=context)
+        )
+    assert threaded == direct
+    assert "departures" in board and context.state["tool_results"][-1] is board
@@ -0,0 +1,144 @@
+from datetime import time
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import query_planner
+from app.ingestion.gtfs_loader import rail_steps, run_rail_step
+from app.trip_times import TripTimes, get_trip_times
+
+
+def test_trips_share_patterns_with_identical_stop_sequences(synthetic_engine):
+    with synthetic_engine.connect() as conn:
+        trips, patterns = conn.execute(
+            text("SELECT count(*), count(DISTINCT pattern_id) FROM trip_patterns_rail")
+        ).one()
+        assert trips == conn.execute(text("SELECT count(DISTINCT trip_id) FROM stop_times_rail")).scalar_one()
+        assert patterns < trips
+        # Every trip visits exactly its pattern's stops, with its own times at each position
+        mismatched = conn.execute(
+            text(
+                """
+                SELECT count(*)
+                FROM stop_times_rail st
+                JOIN trip_patterns_rail tp ON tp.trip_id = st.trip_id
+                LEFT JOIN pattern_stops_rail ps
+                  ON ps.pattern_id = tp.pattern_id AND ps.stop_pos = st.stop_pos AND ps.stop_id = st.stop_id
+                WHERE ps.stop_id IS NULL
+                   OR tp.departure_times[st.stop_pos + 1] <> st.departure_time
+                   OR tp.arrival_times[st.stop_pos + 1] <> st.arrival_time
+                """
+            )
+        ).scalar_one()
+    assert mismatched == 0
+
+
+def test_pattern_index_matches_self_join(synthetic_engine, monkeypatch):
+    with Session(bind=synthetic_engine) as session:
+        pairs = session.execute(
+            text(
+                """
+                SELECT o.stop_name AS origin, d.stop_name AS destination, count(*) AS trips
+                FROM stop_times_rail so
+                JOIN stop_times_rail sd ON sd.trip_id = so.trip_id AND sd.stop_sequence > so.stop_sequence
+                JOIN stops_rail o ON o.stop_id = so.stop_id
+                JOIN stops_rail d ON d.stop_id = sd.stop_id
+                WHERE o.stop_name <> d.stop_name
+                GROUP BY 1, 2
+                ORDER BY trips DESC, 1, 2
+                LIMIT 5
+                """
+            )
+        ).all()
+        travel_date = query_planner.get_service_calendar(session).window_start
+
+        def departures(patterns: bool, pair, **kwargs):
+            monkeypatch.setattr(query_planner, "has_trip_patterns", lambda session: patterns)
+            tables = query_planner.departures_between(session, pair.origin, pair.destination, limit_rows=500, **kwargs)
+            return tables[0].rows if tables else []
+
+        for pair in pairs:
+            unfiltered = departures(True, pair, travel_date=None, after_time=None)
+            assert unfiltered and unfiltered == departures(False, pair, travel_date=None, after_time=None)
+            filtered = departures(True, pair, travel_date=travel_date, after_time=time(7))
+            assert filtered == departures(False, pair, travel_date=travel_date, after_time=time(7))
+
+
+def test_route_stops_from_time_profiles_match_stop_times(synthetic_engine, monkeypatch):
+    with Session(bind=synthetic_engine) as session:
+        trip_times = get_trip_times(session)
+        trip_ids = session.execute(text("SELECT trip_id FROM trips_rail ORDER BY trip_id")).scalars().all()
+        profiled = {trip_id: query_planner.route_stops.uncached(session, trip_id) for trip_id in trip_ids}
+        monkeypatch.setattr(query_planner, "get_trip_times", lambda session: None)
+        for trip_id in trip_ids:
+            assert profiled[trip_id] == [dict(row) for row in query_planner.route_stops.uncached(session, trip_id)]
+        assert query_planner.route_stops.uncached(session, "no-such-trip") == []
+    # Trips of a line share their stop pattern and time profile
+    assert len(trip_times) == len(trip_ids) and trip_times.profile_count < len(trip_ids)
+
+
+def column(values, dtype=np.int64):
+    return np.array(values, dtype=dtype)
+
+
+def test_time_profiles_keep_missing_and_negative_offsets():
+    trip_times = TripTimes(
+        stops={"stop_id": column(["A", "B", "C"], object), "stop_name": column(["Aby", "Bro", "Cim"], object)},
+        pattern_stops={"pattern_id": column([0, 0, 0]), "stop_id": column(["A", "B", "C"], object)},
+        profiles={
+            "profile_id": column([0, 0, 0]),
+            "pattern_id": column([0, 0, 0]),
+            "stop_sequence": column([1, 5, 9]),
+            # Arrives a minute before leaving A; no times at B
+            "arrival_offset": column([-60, np.iinfo(np.int32).min, 1800]),
+            "departure_offset": column([0, np.iinfo(np.int32).min, 1800]),
+        },
+        trips={
+            "trip_id": column(["T1", "T2"], object),
+            "profile_id": column([0, 0]),
+            "start_time": column([100, 90000]),
+        },
+    )
+    rows = trip_times.route_stops("T2")
+    assert [(row["stop_sequence"], row["arrival_time"], row["departure_time"]) for row in rows] == [
+        (1, 89940, 90000),
+        (5, None, None),
+        (9, 91800, 91800),
+    ]
+    assert [row["stop_name"] for row in trip_times.route_stops("T1")] == ["Aby", "Bro", "Cim"]
+
+
+def test_time_profiles_start_at_the_first_timed_stop(tmp_path):
+    eng = create_engine(f"duckdb:///{tmp_path / 'gtfs.duckdb'}")
+    with eng.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE stops_rail AS "
+                "SELECT * FROM (VALUES ('A', 'Aby'), ('B', 'Bro'), ('C', 'Cim')) s(stop_id, stop_name)"
+            )
+        )
+        conn.execute(
+            text(
+                """
+                CREATE TABLE stop_times_rail AS
+                SELECT * FROM (VALUES
+                    -- No times at the first stop
+                    ('T1', 'A', 1, NULL, NULL, 0), ('T1', 'B', 2, 100, 110, 1), ('T1', 'C', 3, 200, 200, 2),
+                    -- No times at all
+                    ('T2', 'A', 1, NULL, NULL, 0), ('T2', 'B', 2, NULL, NULL, 1), ('T2', 'C', 3, NULL, NULL, 2),
+                    ('T3', 'A', 1, 1000, 1000, 0), ('T3', 'B', 2, 1100, 1110, 1), ('T3', 'C', 3, 1200, 1200, 2)
+                ) st(trip_id, stop_id, stop_sequence, arrival_time, departure_time, stop_pos)
+                """
+            )
+        )
+    steps = {step.name: step for step in rail_steps()}
+    for name in ("trip_patterns_rail", "pattern_stops_rail", "time_profiles_rail", "trip_times_rail"):
+        run_rail_step(steps[name], eng)
+    with Session(bind=eng) as session:
+        trip_times = get_trip_times(session)
+        for trip_id in ("T1", "T2", "T3"):
+            rows = query_planner._route_stops_sql(session, trip_id)
+            assert trip_times.route_stops(trip_id) == [dict(row) for row in rows]
+    assert [row["departure_time"] for row in trip_times.route_stops("T1")] == [None, 110, 200]
+    eng.dispose()